@@ -0,0 +1,81 @@
+"""
+Benchmark du démarrage à froid de main.py : pour chaque sous-commande, temps d'un interpréteur neuf qui charge
+main.py puis les modules importés par l'étape (sans exécuter l'étape elle-même). La référence « eager »
+importe tous les modules de scripts/, comme le faisait l'ancien main.py interactif.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_cli_startup --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules importés par chaque sous-commande de main.py
+SUBCOMMAND_IMPORTS = {
+    'help': [],
+    'clean': ['scripts.cleanig_data_script', 'scripts.visualisation_script'],
+    'split': ['scripts.cleanig_data_script'],
+    'train': ['scripts.ML_model_training_script'],
+    'predict': ['scripts.prediction_script'],
+    'eager (ancien main.py)': [
+        'scripts.ML_model_training_script',
+        'scripts.cleanig_data_script',
+        'scripts.visualisation_script',
+        'scripts.prediction_script',
+    ],
+}
+
+
+def _statement(modules):
+    return '; '.join(['import main', 'main.build_parser()'] + [f'import {module}' for module in modules])
+
+
+def time_startup(modules, repeat):
+    """
+    Temps médian (en secondes) d'un interpréteur neuf qui importe main.py et les modules donnés.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', _statement(modules)], check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def import_time(modules):
+    """
+    Temps d'import cumulé (en secondes) des modules de premier niveau, mesuré avec `python -X importtime`.
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', _statement(modules)],
+                             check=True, capture_output=True, text=True)
+    total = 0
+    for line in process.stderr.splitlines():
+        # Format : "import time: self [us] | cumulative | imported package", niveau 0 sans indentation
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def run(repeat):
+    baseline = time_startup([], repeat)
+    results = []
+    for name, modules in SUBCOMMAND_IMPORTS.items():
+        wall = time_startup(modules, repeat)
+        imports = import_time(modules)
+        results.append({'subcommand': name, 'wall_ms': wall * 1000, 'import_ms': imports * 1000})
+        print(f"{name:<24} démarrage : {wall * 1000:8.1f} ms | imports : {imports * 1000:8.1f} ms")
+    print(f"(interpréteur + main.py seul : {baseline * 1000:.1f} ms)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.repeat)
@@ -0,0 +1,85 @@
+"""
+Benchmark du temps par essai Optuna : `XGBClassifier.fit` sur DataFrame (avant) contre `xgb.train` sur les
+matrices quantifiées en cache de `TrainingMatrices` (après), sur le dataset fourni répliqué N fois.
+
+Usage (depuis la racine du projet, après l'étape 1 de main.py) :
+    python -m benchmarks.bench_dmatrix_cache --scales 1 10 100 --trials 5
+"""
+import argparse
+import time
+
+import numpy as np
+import optuna
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from scripts.ML_model_training_script import TrainingMatrices, _suggest_params
+from scripts.storage_script import read_table
+
+
+def replicate(data, scale, random_state=42):
+    """
+    Réplique le dataset `scale` fois en bruitant légèrement les mesures pour éviter les doublons exacts.
+    """
+    if scale == 1:
+        return data
+    rng = np.random.default_rng(random_state)
+    data = pd.concat([data] * scale, ignore_index=True)
+    for column in data.select_dtypes(include=[np.floating]).columns:
+        data[column] = data[column] * (1 + rng.normal(0, 0.01, len(data)))
+    return data
+
+
+def sample_params(n_trials, random_state=42):
+    """
+    Tire des jeux d'hyperparamètres dans l'espace de recherche de `train_ml_model` (identiques pour les deux modes).
+    """
+    study = optuna.create_study(sampler=optuna.samplers.RandomSampler(seed=random_state))
+    return [_suggest_params(study.ask()) for _ in range(n_trials)]
+
+
+def run(data_file, scales, n_trials, target_column='catastrophe'):
+    data = read_table(data_file).drop(columns=['date'], errors='ignore')
+    params_list = sample_params(n_trials)
+    results = []
+
+    for scale in scales:
+        scaled = replicate(data, scale)
+        X = scaled.drop(columns=[target_column])
+        y = scaled[target_column]
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+        start = time.perf_counter()
+        for params in params_list:
+            model = xgb.XGBClassifier(**params, random_state=42)
+            model.fit(X_train, y_train)
+            accuracy_score(y_test, model.predict(X_test))
+        before = (time.perf_counter() - start) / n_trials
+
+        start = time.perf_counter()
+        matrices = TrainingMatrices(X_train, y_train, X_test, y_test)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        for params in params_list:
+            matrices.validation_accuracy(matrices.train({**params, 'random_state': 42}))
+        after = (time.perf_counter() - start) / n_trials
+
+        results.append({'scale': scale, 'rows': len(scaled), 'before_s': before, 'after_s': after,
+                        'matrix_build_s': build})
+        print(f"x{scale:<4} {len(scaled):>9} lignes | avant : {before:.3f} s/essai | après : {after:.3f} s/essai "
+              f"(+ {build:.3f} s de construction unique des matrices)")
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='data/reformed_catastrophes_naturelles_data.parquet')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--trials', type=int, default=5)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    run(args.data, args.scales, args.trials)
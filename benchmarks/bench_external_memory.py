@@ -0,0 +1,122 @@
+"""
+Benchmark de l'entraînement hors mémoire : pic mémoire, temps réel et accuracy de `train_ml_model` en mémoire
+(chargement du dataset préparé, matrices quantifiées des plis) face à `external_memory=True` (lecture par blocs,
+matrice XGBoost sur disque, échantillon de validation en mémoire), à des tailles croissantes du dataset.
+
+Le dataset préparé fourni est répliqué (avec un léger bruit sur les mesures) jusqu'à chaque taille et écrit en
+Parquet par groupes de lignes. Chaque entraînement tourne dans un processus neuf pour que le pic mémoire mesuré
+soit le sien.
+
+Usage (depuis la racine du projet, après l'étape 2 de main.py) :
+    python -m benchmarks.bench_external_memory --rows 100000 1000000 5000000 --trials 3
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scripts.model_io_script import load_metadata
+from scripts.storage_script import read_table
+
+MODES = ['in_memory', 'external_memory']
+
+
+def generate_prepared_data(source_file, output_file, n_rows, chunksize=500_000, noise=0.01, random_state=42):
+    """
+    Écrit `n_rows` lignes préparées en répliquant `source_file`, par groupes de `chunksize` lignes (mémoire
+    bornée quelle que soit la taille).
+    """
+    rng = np.random.default_rng(random_state)
+    source = read_table(source_file)
+    measures = [column for column in source.columns if column not in ('date', 'catastrophe', 'quartier')]
+    writer = None
+    try:
+        for start in range(0, n_rows, chunksize):
+            positions = np.arange(start, min(start + chunksize, n_rows)) % len(source)
+            chunk = source.iloc[positions].reset_index(drop=True)
+            chunk[measures] = chunk[measures] * (1 + rng.normal(0, noise, (len(chunk), len(measures)))).astype('float32')
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_file, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return output_file
+
+
+def _measure(mode, data_file, workdir, options):
+    """
+    Entraîne un modèle dans le processus courant (neuf) et mesure temps réel et pic mémoire.
+    """
+    from scripts.ML_model_training_script import train_ml_model
+
+    model_file = os.path.join(workdir, f'{mode}.ubj')
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(None if options['verbose'] else devnull):
+        train_ml_model(data_file, *(os.path.join(workdir, f'{mode}_{name}.png') for name in ('roc', 'lc', 'cm')),
+                       output_model_file=model_file, n_trials=options['trials'], n_jobs=options['jobs'],
+                       resume=False, render=False, external_memory=mode == 'external_memory',
+                       chunksize=options['chunksize'], validation_rows=options['validation_rows'])
+    wall = time.perf_counter() - start
+    # ru_maxrss est en Kio sous Linux
+    return {
+        'wall_s': wall,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'accuracy': load_metadata(model_file)['metrics']['accuracy'],
+    }
+
+
+def run_benchmark(mode, data_file, workdir, options):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_measure, mode, data_file, workdir, options).result()
+
+
+def run(source_file, sizes, trials=3, jobs=None, chunksize=100_000, validation_rows=50_000, modes=MODES,
+        verbose=False):
+    options = dict(trials=trials, jobs=jobs, chunksize=chunksize, validation_rows=validation_rows, verbose=verbose)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_rows in sizes:
+            data_file = generate_prepared_data(source_file, os.path.join(workdir, f'prepared_{n_rows}.parquet'),
+                                               n_rows)
+            size_mb = os.path.getsize(data_file) / 2 ** 20
+            for mode in modes:
+                try:
+                    result = run_benchmark(mode, data_file, workdir, options)
+                except Exception as error:  # ex : processus tué faute de mémoire
+                    result = {'error': f'{type(error).__name__}: {error}'}
+                results.append({'rows': n_rows, 'file_mb': size_mb, 'mode': mode, **result})
+                line = results[-1]
+                if 'error' in line:
+                    print(f"{n_rows:>10}{mode:>17}  échec : {line['error']}")
+                else:
+                    print(f"{n_rows:>10}{mode:>17}{size_mb:>10.1f}{line['peak_rss_mb']:>12.0f}{line['wall_s']:>10.1f}"
+                          f"{line['accuracy']:>10.4f}")
+            os.remove(data_file)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='data/reformed_catastrophes_naturelles_data.parquet')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--trials', type=int, default=3, help="Essais Optuna par entraînement")
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--validation-rows', type=int, default=50_000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10}{'mode':>17}{'Parquet (Mo)':>10}{'pic RSS (Mo)':>12}{'réel (s)':>10}{'accuracy':>10}")
+    run(args.data, args.rows, trials=args.trials, jobs=args.jobs, chunksize=args.chunksize,
+        validation_rows=args.validation_rows, modes=args.modes, verbose=args.verbose)
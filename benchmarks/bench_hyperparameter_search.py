@@ -0,0 +1,93 @@
+"""
+Benchmark de la recherche des hyperparamètres : recherche Optuna actuelle (`--trials` essais sur les plis
+complets, arrêt des essais peu prometteurs) face au successive halving (configurations évaluées d'abord sur des
+sous-échantillons stratifiés, seules les meilleures atteignant les plis complets).
+
+Pour chaque mode : calcul dépensé (lignes d'entraînement × itérations de boosting, équivalent en essais
+complets), temps réel et temps CPU (processus de recherche compris), accuracy moyenne des plis du meilleur essai,
+puis accuracy du modèle final (meilleurs paramètres, entraîné avant le pli le plus récent et évalué sur ce pli).
+
+Usage (depuis la racine du projet, après l'étape 2 de main.py) :
+    python -m benchmarks.bench_hyperparameter_search --data data/reformed_catastrophes_naturelles_data.parquet
+    python -m benchmarks.bench_hyperparameter_search --trials 30 --configs 27 --jobs 4
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from scripts.ML_model_training_script import (
+    CrossValidationMatrices,
+    search_compute,
+    successive_halving_search,
+    tune_hyperparameters,
+)
+from scripts.storage_script import read_table
+from scripts.validation_script import make_validation_splits
+
+
+def _cpu_seconds():
+    """
+    Temps CPU du processus et de ses processus enfants terminés (les processus de recherche Optuna).
+    """
+    usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+    return sum(item.ru_utime + item.ru_stime for item in usage)
+
+
+def _final_accuracy(matrices, params, n_jobs):
+    fold = matrices.folds[-1]
+    booster = fold.train({**params, 'random_state': 42}, n_threads=n_jobs)
+    return float(fold.validation_accuracy(booster))
+
+
+def run(data_file, target_column='catastrophe', n_trials=100, n_configs=81, eta=3, n_jobs=None, n_splits=4):
+    data = read_table(data_file)
+    X, y = data.drop(columns=[target_column, 'date'], errors='ignore'), data[target_column]
+    splits = make_validation_splits(data, n_splits=n_splits)
+    matrices = CrossValidationMatrices(X, y, splits)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        searches = {
+            'optuna': lambda: tune_hyperparameters(X, y, splits, 'benchmark', f"sqlite:///{directory}/optuna.db",
+                                                   n_trials=n_trials, n_jobs=n_jobs, resume=False, matrices=matrices),
+            'halving': lambda: successive_halving_search(X, y, splits, n_configs=n_configs, eta=eta, n_jobs=n_jobs,
+                                                         matrices=matrices),
+        }
+        for name, search in searches.items():
+            start, start_cpu = time.perf_counter(), _cpu_seconds()
+            study = search()
+            wall, cpu = time.perf_counter() - start, _cpu_seconds() - start_cpu
+            results[name] = {
+                **search_compute(study, matrices.train_rows),
+                'wall_seconds': wall,
+                'cpu_seconds': cpu,
+                'cv_accuracy': float(study.best_value),
+                'final_accuracy': _final_accuracy(matrices, study.best_params, n_jobs),
+                'best_params': study.best_params,
+            }
+
+    print(f"\n{'mode':<10}{'essais':>8}{'lignes×itér.':>16}{'éq. essais':>12}{'réel (s)':>10}{'CPU (s)':>10}"
+          f"{'acc. plis':>11}{'acc. finale':>13}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['trials']:>8}{result['row_rounds']:>16.3g}{result['full_trial_equivalents']:>12.1f}"
+              f"{result['wall_seconds']:>10.1f}{result['cpu_seconds']:>10.1f}{result['cv_accuracy']:>11.4f}"
+              f"{result['final_accuracy']:>13.4f}")
+    optuna_result, halving_result = results['optuna'], results['halving']
+    print(f"Successive halving : {optuna_result['row_rounds'] / max(1, halving_result['row_rounds']):.1f}× moins de "
+          f"calcul, {optuna_result['wall_seconds'] / max(1e-9, halving_result['wall_seconds']):.1f}× plus rapide, "
+          f"écart d'accuracy finale {halving_result['final_accuracy'] - optuna_result['final_accuracy']:+.4f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', default='data/reformed_catastrophes_naturelles_data.parquet')
+    parser.add_argument('--trials', type=int, default=100, help="Essais de la recherche Optuna")
+    parser.add_argument('--configs', type=int, default=81, help="Configurations initiales du successive halving")
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    run(args.data, n_trials=args.trials, n_configs=args.configs, eta=args.eta, n_jobs=args.jobs)
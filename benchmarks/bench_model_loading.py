@@ -0,0 +1,63 @@
+"""
+Benchmark du temps de chargement d'un modèle selon son format : pickle joblib, JSON et UBJSON natifs XGBoost,
+ainsi que le modèle JSON fourni (model/xgboost_model.json). Mesure un chargement à froid (sans cache) et un
+chargement depuis le cache de `load_model`.
+
+Usage (depuis la racine du projet, après l'étape 3 de main.py) :
+    python -m benchmarks.bench_model_loading --model models/ml_model.ubj --repeat 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import joblib
+
+from scripts.model_io_script import load_model
+
+
+def time_load(path, repeat, use_cache):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_model(path, use_cache=use_cache)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def run(model_file, reference_file, repeat):
+    model = load_model(model_file, use_cache=False)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            'joblib': os.path.join(tmp, 'model.joblib'),
+            'json': os.path.join(tmp, 'model.json'),
+            'ubj': os.path.join(tmp, 'model.ubj'),
+        }
+        joblib.dump(model, files['joblib'])
+        model.save_model(files['json'])
+        model.save_model(files['ubj'])
+        if reference_file and os.path.exists(reference_file):
+            files['json (model/xgboost_model.json)'] = reference_file
+
+        for name, path in files.items():
+            load_model(path)  # remplit le cache
+            cold = time_load(path, repeat, use_cache=False)
+            cached = time_load(path, repeat, use_cache=True)
+            size = os.path.getsize(path)
+            results.append({'format': name, 'size_bytes': size, 'cold_ms': cold * 1000, 'cached_ms': cached * 1000})
+            print(f"{name:<34} {size / 1024:>9.1f} Kio | à froid : {cold * 1000:8.2f} ms | cache : {cached * 1000:6.3f} ms")
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='models/ml_model.ubj')
+    parser.add_argument('--reference', default='model/xgboost_model.json')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    run(args.model, args.reference, args.repeat)
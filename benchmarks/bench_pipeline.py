@@ -0,0 +1,200 @@
+"""
+Benchmark des étapes 1 à 4 de main.py sur des données synthétiques de taille croissante
+(voir benchmarks/synthetic_data.py) : temps réel, temps CPU et pic mémoire de chaque fonction, mesurés
+chacun dans un processus neuf. Les résultats sont écrits dans un fichier JSON (un par commit par défaut)
+comparable d'un commit à l'autre avec --compare.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_pipeline --scales 10000 1000000 --trials 5
+    python -m benchmarks.bench_pipeline --scales 10000000 --skip train_ml_model
+    python -m benchmarks.bench_pipeline --compare benchmarks/results/<ancien commit>.json
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_data import generate_csv
+
+BENCHMARKS = ['debug_ligne', 'column_mapping', 'compute_statistics', 'correlation_matrix', 'train_ml_model',
+              'perform_prediction']
+
+
+def _paths(workdir):
+    return {
+        'raw': os.path.join(workdir, 'raw.csv'),
+        'cleaned': os.path.join(workdir, 'cleaned.csv'),
+        'mapped': os.path.join(workdir, 'mapped.parquet'),
+        'statistics': os.path.join(workdir, 'statistics.parquet'),
+        'reduced': os.path.join(workdir, 'reduced.parquet'),
+        'model': os.path.join(workdir, 'model.ubj'),
+        'figure': os.path.join(workdir, 'figure.png'),
+    }
+
+
+def _debug_ligne(paths, options):
+    from scripts.cleanig_data_script import debug_ligne
+
+    debug_ligne(paths['raw'], paths['cleaned'])
+
+
+def _column_mapping(paths, options):
+    from main import mapping_cata, mapping_zone
+    from scripts.cleanig_data_script import column_mapping
+
+    column_mapping(paths['cleaned'], paths['mapped'], mapping_cata, 'catastrophe')
+    column_mapping(paths['mapped'], paths['mapped'], mapping_zone, 'quartier')
+
+
+def _compute_statistics(paths, options):
+    from scripts.cleanig_data_script import compute_statistics
+
+    compute_statistics(paths['mapped'], paths['statistics'])
+
+
+def _correlation_matrix(paths, options):
+    from scripts.cleanig_data_script import correlation_matrix
+
+    correlation_matrix(paths['mapped'], paths['reduced'])
+
+
+def _train_ml_model(paths, options):
+    from scripts.ML_model_training_script import train_ml_model
+
+    train_ml_model(paths['reduced'], paths['figure'], paths['figure'], paths['figure'],
+                   output_model_file=paths['model'], n_trials=options['trials'], resume=False, render=False)
+
+
+def _perform_prediction(paths, options):
+    from scripts.prediction_script import perform_prediction
+    from scripts.storage_script import read_table
+
+    batch = read_table(paths['reduced']).head(options['batch_rows'])
+    # Le chargement des données ne fait pas partie de la mesure de débit
+    start = time.perf_counter()
+    perform_prediction(batch, batch, paths['model'], paths['model'])
+    return {'rows_predicted': 2 * len(batch), 'predict_s': time.perf_counter() - start}
+
+
+_FUNCTIONS = {name: globals()[f'_{name}'] for name in BENCHMARKS}
+
+
+def _measure(name, paths, options):
+    """
+    Exécute un benchmark dans le processus courant (neuf) et mesure temps réel, temps CPU et pic mémoire.
+    """
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    before_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(None if options['verbose'] else devnull):
+        extra = _FUNCTIONS[name](paths, options) or {}
+    wall = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    after_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    cpu_children = (after_children.ru_utime - before_children.ru_utime) \
+        + (after_children.ru_stime - before_children.ru_stime)
+    # ru_maxrss est en Kio sous Linux
+    return {
+        'wall_s': wall,
+        'cpu_s': cpu + cpu_children,
+        'peak_rss_mb': after.ru_maxrss / 1024,
+        'peak_rss_children_mb': after_children.ru_maxrss / 1024,
+        **extra,
+    }
+
+
+def run_benchmark(name, paths, options):
+    """
+    Exécute un benchmark dans un processus neuf, pour que le pic mémoire mesuré soit le sien.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_measure, name, paths, options).result()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(scales, trials, batch_rows, skip=(), verbose=False):
+    options = {'trials': trials, 'batch_rows': batch_rows, 'verbose': verbose}
+    results = []
+    for n_rows in scales:
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = _paths(workdir)
+            start = time.perf_counter()
+            generate_csv(paths['raw'], n_rows)
+            print(f"\n{n_rows} lignes générées en {time.perf_counter() - start:.1f} s "
+                  f"({os.path.getsize(paths['raw']) / 2 ** 20:.0f} Mio)")
+
+            for name in BENCHMARKS:
+                if name in skip:
+                    continue
+                measures = run_benchmark(name, paths, options)
+                rows = measures.get('rows_predicted', n_rows)
+                throughput = rows / measures.get('predict_s', measures['wall_s'])
+                results.append({'benchmark': name, 'rows': n_rows, **measures, 'rows_per_s': throughput})
+                print(f"{name:<20} {measures['wall_s']:9.2f} s | CPU {measures['cpu_s']:9.2f} s | "
+                      f"pic {measures['peak_rss_mb']:8.0f} Mio | {throughput:12.0f} lignes/s")
+    return results
+
+
+def compare(results, reference_file):
+    """
+    Affiche le rapport des temps entre ces résultats et un fichier de résultats précédent.
+    """
+    with open(reference_file, 'r', encoding='utf-8') as f:
+        reference = json.load(f)
+    previous = {(entry['benchmark'], entry['rows']): entry for entry in reference['results']}
+    print(f"\nComparaison avec {reference_file} (commit {reference.get('commit')}) :")
+    for entry in results:
+        old = previous.get((entry['benchmark'], entry['rows']))
+        if old is None:
+            continue
+        print(f"{entry['benchmark']:<20} {entry['rows']:>10} lignes | temps x{entry['wall_s'] / old['wall_s']:.2f} | "
+              f"pic mémoire x{entry['peak_rss_mb'] / old['peak_rss_mb']:.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--trials', type=int, default=5, help="Nombre d'essais Optuna fixe pour train_ml_model")
+    parser.add_argument('--batch-rows', type=int, default=100_000, help="Taille du lot de perform_prediction")
+    parser.add_argument('--skip', nargs='*', default=[], choices=BENCHMARKS)
+    parser.add_argument('--output', default=None, help="Fichier de résultats (benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', default=None, help="Fichier de résultats d'un autre commit à comparer")
+    parser.add_argument('--verbose', action='store_true', help="Afficher la sortie des fonctions mesurées")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    results = run(args.scales, args.trials, args.batch_rows, skip=args.skip, verbose=args.verbose)
+
+    output = args.output or os.path.join('benchmarks', 'results', f'{commit}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'trials': args.trials,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nRésultats sauvegardés sous : {output}")
+
+    if args.compare:
+        compare(results, args.compare)
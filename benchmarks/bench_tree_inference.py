@@ -0,0 +1,105 @@
+"""
+Benchmark de l'inférence compilée (scripts/tree_inference_script.py) face à `XGBClassifier.predict_proba` :
+latence d'une ligne seule (tableau NumPy et dictionnaire, et chemin pandas de `perform_prediction`), débit
+sur un lot, et vérification que les probabilités sont les mêmes (écart maximal, classes prédites identiques).
+
+Sans fichier de données (ex : model/xgboost_model.json), des lignes aléatoires avec valeurs manquantes sont
+utilisées.
+
+Usage (depuis la racine du projet, après l'étape 3 de main.py) :
+    python -m benchmarks.bench_tree_inference --model models/ml_model.ubj \\
+        --data data/reformed_catastrophes_naturelles_data.parquet
+    python -m benchmarks.bench_tree_inference --model model/xgboost_model.json
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from scripts.feature_schema_script import load_feature_transformer
+from scripts.model_io_script import load_model
+from scripts.storage_script import read_table
+from scripts.tree_inference_script import CompiledForest
+
+
+def _median_seconds(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def _features(model_file, model, forest, data_file, n_rows, random_state=42):
+    if data_file:
+        data = read_table(data_file)
+        data = data.sample(n=n_rows, replace=len(data) < n_rows, random_state=random_state).reset_index(drop=True)
+        transformer = load_feature_transformer(model_file, model)
+        return data, transformer.transform(data, keep_rejected=True).features
+    rng = np.random.default_rng(random_state)
+    n_features = int(model.get_booster().num_features())
+    features = rng.normal(0, 50, (n_rows, n_features)).astype(np.float32)
+    features[rng.random(features.shape) < 0.1] = np.nan
+    return None, features
+
+
+def run(model_file, data_file, batch_rows, repeat):
+    model = load_model(model_file)
+    forest = CompiledForest.load(model_file)
+    data, features = _features(model_file, model, forest, data_file, batch_rows)
+    print(f"{model_file} : {len(forest.roots)} arbres, profondeur {forest.max_depth}, "
+          f"{len(forest.feature)} nœuds, {features.shape[1]} caractéristiques")
+
+    # Mêmes sorties
+    expected = model.predict_proba(features)
+    compiled = forest.predict_proba(features)
+    max_diff = float(np.abs(expected - compiled).max())
+    same_classes = bool((expected.argmax(axis=1) == compiled.argmax(axis=1)).all())
+    single = np.array([forest.predict_proba_row(row) for row in features[:100]])
+    max_diff_single = float(np.abs(expected[:100] - single).max())
+    print(f"Écart maximal des probabilités : lot {max_diff:.2e}, ligne seule {max_diff_single:.2e} | "
+          f"classes identiques : {same_classes}")
+
+    row = features[:1]
+    results = {
+        'max_abs_diff': max(max_diff, max_diff_single),
+        'same_classes': same_classes,
+        'single_row_us': {
+            'xgboost_predict_proba': _median_seconds(lambda: model.predict_proba(row), repeat) * 1e6,
+            'compiled_array': _median_seconds(lambda: forest.predict_proba_row(row[0]), repeat) * 1e6,
+        },
+    }
+    if data is not None:
+        transformer = load_feature_transformer(model_file, model)
+        row_frame = data.iloc[:1]
+        row_dict = {column: value.item() if hasattr(value, 'item') else value
+                    for column, value in row_frame.iloc[0].items()}
+        results['single_row_us']['pandas_transform_and_predict_proba'] = _median_seconds(
+            lambda: model.predict_proba(transformer.transform(row_frame).features), repeat) * 1e6
+        results['single_row_us']['compiled_dict'] = _median_seconds(
+            lambda: forest.predict_proba_row(row_dict), repeat) * 1e6
+
+    for name, microseconds in results['single_row_us'].items():
+        print(f"Ligne seule, {name:<36} {microseconds:10.1f} µs")
+
+    batch_repeat = max(1, repeat // 20)
+    results['batch_rows_per_s'] = {
+        'xgboost_predict_proba': len(features) / _median_seconds(lambda: model.predict_proba(features), batch_repeat),
+        'compiled': len(features) / _median_seconds(lambda: forest.predict_proba(features), batch_repeat),
+    }
+    for name, throughput in results['batch_rows_per_s'].items():
+        print(f"Lot de {len(features)} lignes, {name:<25} {throughput:12.0f} lignes/s")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='models/ml_model.ubj')
+    parser.add_argument('--data', default=None, help="Données préparées du modèle (lignes aléatoires si absent)")
+    parser.add_argument('--batch-rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    run(args.model, args.data, args.batch_rows, args.repeat)
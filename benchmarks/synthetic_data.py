@@ -0,0 +1,77 @@
+"""
+Générateur de données synthétiques au format de data/catastrophes_naturelles.csv (mêmes colonnes, mêmes zones,
+mêmes étiquettes de catastrophes, listes entre guillemets et valeurs manquantes), à n'importe quelle taille.
+
+Les catastrophes dépendent des mesures (inondations avec la pluie, séismes avec la sismicité) pour que
+l'entraînement ait un signal à apprendre. Les dates couvrent au plus `max_days` jours : au-delà, les mêmes
+jours sont répétés (plusieurs lignes par jour et par zone).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.synthetic_data --rows 1000000 --output /tmp/catastrophes_1M.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+ZONES = ['Zone 1', 'Zone 2', 'Zone 3', 'Zone 4', 'Zone 5']
+COLUMNS = ['temperature', 'humidite', 'force_moyenne_du_vecteur_de_vent', 'force_du_vecteur_de_vent_max',
+           'pluie_intensite_max', 'date', 'quartier', 'sismicite', 'concentration_gaz', 'pluie_totale',
+           'catastrophe']
+LABELS = np.array(['aucun', "['seisme']", "['innondation']", "['innondation', 'seisme']"], dtype=object)
+
+
+def generate_chunk(start, n_rows, rng, max_days=7300, missing_rate=0.05, start_date='2170-01-01'):
+    """
+    Génère `n_rows` lignes brutes à partir de la ligne numéro `start`.
+
+    Returns:
+        pd.DataFrame: Lignes au format du CSV brut (index = numéro de ligne).
+    """
+    row_numbers = np.arange(start, start + n_rows)
+    days = (row_numbers // len(ZONES)) % max_days
+    season = np.sin(2 * np.pi * days / 365.25)
+
+    data = pd.DataFrame({
+        'temperature': np.round(23 + 10 * season + rng.normal(0, 4, n_rows), 1),
+        'humidite': np.round(np.clip(56 + 8 * season + rng.normal(0, 11, n_rows), 10, 90), 1),
+        'force_moyenne_du_vecteur_de_vent': np.round(rng.gamma(3, 2, n_rows), 1),
+        'force_du_vecteur_de_vent_max': np.round(rng.gamma(3, 4, n_rows), 1),
+        'pluie_intensite_max': np.round(np.where(rng.random(n_rows) < 0.9, 0, rng.uniform(0, 0.3, n_rows)), 1),
+        'date': (pd.Timestamp(start_date) + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d'),
+        'quartier': np.array(ZONES)[row_numbers % len(ZONES)],
+        'sismicite': np.round(rng.uniform(0.3, 1.0, n_rows), 2),
+        'concentration_gaz': np.round(rng.uniform(100, 300, n_rows), 2),
+        'pluie_totale': np.round(rng.uniform(0.1, 1000, n_rows), 2),
+    }, index=row_numbers)
+
+    flood = rng.random(n_rows) < 0.15 + 0.5 * data['pluie_totale'].to_numpy() / 1000
+    quake = rng.random(n_rows) < 0.6 * (data['sismicite'].to_numpy() - 0.3) ** 2
+    data['catastrophe'] = LABELS[flood * 2 + quake]
+
+    # Valeurs manquantes dans les mesures, comme dans les données réelles
+    measures = [column for column in COLUMNS if column not in ('date', 'quartier', 'catastrophe')]
+    data[measures] = data[measures].mask(rng.random((n_rows, len(measures))) < missing_rate)
+    return data[COLUMNS]
+
+
+def generate_csv(output_file, n_rows, chunksize=1_000_000, random_state=42, **kwargs):
+    """
+    Écrit un CSV brut synthétique de `n_rows` lignes, par blocs (mémoire bornée même à 10 millions de lignes).
+    """
+    rng = np.random.default_rng(random_state)
+    for start in range(0, n_rows, chunksize):
+        chunk = generate_chunk(start, min(chunksize, n_rows - start), rng, **kwargs)
+        chunk.to_csv(output_file, mode='w' if start == 0 else 'a', header=start == 0)
+    return output_file
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate_csv(args.output, args.rows, random_state=args.seed)
+    print(f"{args.rows} lignes écrites dans {args.output}")
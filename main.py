@@ -1,15 +1,11 @@
-import os
-from random import random
+import argparse
 
-import pandas as pd
-
-from scripts.ML_model_training_script import train_ml_model
-from scripts.cleanig_data_script import debug_ligne, column_mapping, normalize_data, compute_statistics, \
-    correlation_matrix, isolate_random_row, drop_column, normalize_humidity
-from scripts.visualisation_script import visualisation_correlation_matrix
-from scripts.prediction_script import perform_prediction
 from colorama import Fore, Style
 
+# Les modules de scripts/ (pandas, xgboost, optuna, matplotlib...) sont importés dans chaque étape :
+# une sous-commande ne paie que le temps d'import de ce qu'elle utilise.
+
+
 def display_message(message):
     """
     Affiche un message en vert avec un style particulier pour attirer l'attention.
@@ -19,26 +15,40 @@ def display_message(message):
     """
     print(Fore.GREEN + message.upper() + Style.RESET_ALL)
 
+# Format des fichiers intermédiaires : '.parquet' (colonnes typées), '.arrow' (Arrow IPC lu par memory-map) ou '.csv'
+intermediate_format = '.parquet'
+
 # Définir les chemins des fichiers
 catastrophes_naturelles_data = 'data/catastrophes_naturelles.csv'
-clean_catastrophes_naturelles_data = 'data/clean_catastrophes_naturelles.csv'
-clean_catastrophes_naturelles_data_iot = 'data/clean_catastrophes_naturelles_iot.csv'
-statistics_data = 'data/statistics_data.csv'
-random_row = 'data/random_row.csv'
-reformed_catastrophes_naturelles_data = 'data/reformed_catastrophes_naturelles_data.csv'
+validated_catastrophes_naturelles_data = 'data/validated_catastrophes_naturelles.csv'
+quarantine_catastrophes_naturelles_data = 'data/quarantine_catastrophes_naturelles.csv'
+validation_report = 'data/validation_report.json'
+clean_catastrophes_naturelles_data = f'data/clean_catastrophes_naturelles{intermediate_format}'
+clean_catastrophes_naturelles_data_iot = f'data/clean_catastrophes_naturelles_iot{intermediate_format}'
+featured_catastrophes_naturelles_data = f'data/featured_catastrophes_naturelles{intermediate_format}'
+featured_catastrophes_naturelles_data_iot = f'data/featured_catastrophes_naturelles_iot{intermediate_format}'
+temporal_features_file = 'data/temporal_features.json'
+temporal_features_file_iot = 'data/temporal_features_iot.json'
+statistics_data = f'data/statistics_data{intermediate_format}'
+selected_features_file = 'data/selected_features.json'
+random_row = f'data/random_row{intermediate_format}'
+reformed_catastrophes_naturelles_data = f'data/reformed_catastrophes_naturelles_data{intermediate_format}'
 output_roc_curve = 'docs/output_roc_curve.png'
 output_learning_curve = 'docs/learning_curve.png'
-statistics_data_iot = 'data/statistics_data_iot.csv'
-random_row_iot = 'data/random_row_iot.csv'
-reformed_catastrophes_naturelles_data_iot = 'data/reformed_catastrophes_naturelles_data_iot.csv'
+statistics_data_iot = f'data/statistics_data_iot{intermediate_format}'
+random_row_iot = f'data/random_row_iot{intermediate_format}'
+reformed_catastrophes_naturelles_data_iot = f'data/reformed_catastrophes_naturelles_data_iot{intermediate_format}'
 output_roc_curve_iot = 'docs/output_roc_curve_iot.png'
 output_learning_curve_iot = 'docs/learning_curve_iot.png'
-ml_model_file = 'models/ml_model.joblib'
-ml_model_file_iot = 'models/ml_model_iot.joblib'
+ml_model_file = 'models/ml_model.ubj'
+ml_model_file_iot = 'models/ml_model_iot.ubj'
+ensemble_file = 'models/ensemble.json'
 visu_corr_before = 'docs/visu_corr_before.png'
 visu_corr_after = 'docs/visu_corr_after.png'
 output_matrice_conf = 'docs/output_matrice_conf.png'
 output_matrice_conf_iot = 'docs/output_matrice_conf_iot.png'
+batch_manifest = 'data/batch_manifest.json'
+forecast_data = f'data/forecast{intermediate_format}'
 
 # Définir le mapping des colonnes
 mapping_cata = {
@@ -64,65 +74,506 @@ important_features = [
     'catastrophe'
 ]
 
-def main():
+# Proportion maximale de lignes brutes rejetées par la validation (au-delà, le pipeline s'arrête avant l'étape 1)
+max_rejected_fraction = 0.05
+
+# Seuil de corrélation avec la cible pour conserver une colonne, et score utilisé
+# ('pearson', 'spearman' ou 'mutual_info')
+correlation_threshold = 0.05
+correlation_score = 'pearson'
+
+# Caractéristiques temporelles par quartier : décalages et fenêtres glissantes (en jours)
+temporal_lags = (1, 2, 3)
+temporal_windows = (3, 7, 14)
+temporal_aggregations = ('sum', 'mean', 'max')
+
+# Dossier du cache des étapes (sorties réutilisées quand les entrées, les paramètres et le code n'ont pas changé)
+cache_dir = '.cache'
+
+
+def _stage_cache(args):
+    from scripts.stage_cache_script import StageCache
+
+    return StageCache(cache_dir, enabled=not args.no_cache)
+
+def run_validate(args):
+    """
+    Étape 0 : validation du fichier brut (schéma, plages de valeurs, libellés absents des mappings, doublons
+    date × quartier). Les lignes rejetées sont mises en quarantaine avant les étapes coûteuses.
+    """
+    def validate():
+        from scripts.data_quality_script import RawDataSchema, validate_raw_data
+
+        validate_raw_data(catastrophes_naturelles_data, validated_catastrophes_naturelles_data,
+                          quarantine_catastrophes_naturelles_data, validation_report,
+                          RawDataSchema.from_mappings(mapping_cata, mapping_zone),
+                          max_rejected_fraction=max_rejected_fraction)
+
+    display_message("\nÉtape 0 : Validation des données brutes...")
+    _stage_cache(args).run(
+        'validate', validate,
+        inputs=[catastrophes_naturelles_data],
+        outputs=[validated_catastrophes_naturelles_data, quarantine_catastrophes_naturelles_data, validation_report],
+        params=dict(mapping_cata=mapping_cata, mapping_zone=mapping_zone, max_rejected_fraction=max_rejected_fraction),
+        code_files=['scripts/data_quality_script.py', 'scripts/cleanig_data_script.py'],
+    )
+    display_message(f"Données validées : {validated_catastrophes_naturelles_data} "
+                    f"(lignes rejetées : {quarantine_catastrophes_naturelles_data}, rapport : {validation_report})")
+
+
+def run_clean(args):
+    """
+    Étape 1 : nettoyage et réduction des données (après la validation du fichier brut).
+    """
+    run_validate(args)
+
+    def clean():
+        from scripts.cleanig_data_script import CleaningPipeline
+        from scripts.report_script import ReportRenderer, correlation_figure
+
+        # Toutes les transformations sont faites en mémoire, les fichiers ne sont écrits qu'à la fin
+        pipeline = CleaningPipeline.from_raw_csv(validated_catastrophes_naturelles_data)
+        pipeline.map_column(mapping_cata, "catastrophe").map_column(mapping_zone, "quartier").normalize_humidity()
+        pipeline_iot = pipeline.branch().keep_columns(important_features)
+
+        # La matrice de corrélation est calculée une fois et sert aux deux heatmaps et à la sélection ;
+        # les heatmaps sont dessinées en arrière-plan pendant la sauvegarde des données
+        renderer = ReportRenderer(n_jobs=2)
+        renderer.submit(correlation_figure(pipeline.correlations().matrix, visu_corr_before))
+        pipeline.reduce_by_correlation(threshold=correlation_threshold, score=correlation_score)
+        renderer.submit(correlation_figure(pipeline.correlations().matrix, visu_corr_after))
+
+        pipeline.save(clean_catastrophes_naturelles_data, statistics_file=statistics_data,
+                      selection_file=selected_features_file)
+        pipeline_iot.save(clean_catastrophes_naturelles_data_iot, statistics_file=statistics_data_iot)
+        renderer.close()
+
+    display_message("\nÉtape 1 : Nettoyage et réduction des données...")
+    _stage_cache(args).run(
+        'clean', clean,
+        inputs=[validated_catastrophes_naturelles_data],
+        outputs=[clean_catastrophes_naturelles_data, statistics_data, selected_features_file,
+                 clean_catastrophes_naturelles_data_iot, statistics_data_iot, visu_corr_before, visu_corr_after],
+        params=dict(mapping_cata=mapping_cata, mapping_zone=mapping_zone, important_features=important_features,
+                    correlation_threshold=correlation_threshold, correlation_score=correlation_score),
+        code_files=['scripts/cleanig_data_script.py', 'scripts/correlation_script.py', 'scripts/storage_script.py',
+                    'scripts/report_script.py'],
+    )
+    display_message(f"Réduction et nettoyage des données terminés avec succès, deux datasets créés : {clean_catastrophes_naturelles_data_iot} et {clean_catastrophes_naturelles_data}")
+
+
+def run_features(args):
+    """
+    Étape 1 bis : ajout des caractéristiques temporelles par quartier (lags, fenêtres glissantes, jours depuis
+    la dernière catastrophe).
+    """
+    def features():
+        from scripts.feature_engineering_script import TemporalFeatures
+        from scripts.storage_script import read_table, write_table
+
+        for input_file, output_file, features_file in [
+            (clean_catastrophes_naturelles_data, featured_catastrophes_naturelles_data, temporal_features_file),
+            (clean_catastrophes_naturelles_data_iot, featured_catastrophes_naturelles_data_iot,
+             temporal_features_file_iot),
+        ]:
+            data = read_table(input_file)
+            temporal_features = TemporalFeatures(lags=temporal_lags, windows=temporal_windows,
+                                                 aggregations=temporal_aggregations)
+            write_table(temporal_features.transform(data), output_file)
+            # L'état glissant (derniers jours de chaque quartier) sert à calculer les caractéristiques des
+            # nouvelles lignes
+            temporal_features.fit(data).save(features_file)
+            print(f"{len(temporal_features.feature_names())} caractéristiques temporelles ajoutées : {output_file}")
+
+    display_message("\nÉtape 1 bis : Caractéristiques temporelles par quartier")
+    _stage_cache(args).run(
+        'features', features,
+        inputs=[clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data_iot],
+        outputs=[featured_catastrophes_naturelles_data, temporal_features_file,
+                 featured_catastrophes_naturelles_data_iot, temporal_features_file_iot],
+        params=dict(lags=temporal_lags, windows=temporal_windows, aggregations=temporal_aggregations),
+        code_files=['scripts/feature_engineering_script.py', 'scripts/storage_script.py'],
+    )
+
+
+def run_split(args):
+    """
+    Étape 2 : séparation d'une ligne aléatoire.
+    """
+    def split():
+        from scripts.cleanig_data_script import isolate_random_row
+
+        isolate_random_row(featured_catastrophes_naturelles_data, reformed_catastrophes_naturelles_data, random_row)
+        isolate_random_row(featured_catastrophes_naturelles_data_iot, reformed_catastrophes_naturelles_data_iot,
+                           random_row_iot)
+
+    display_message("\nÉtape 2 : Séparation d'une ligne aléatoire")
+    _stage_cache(args).run(
+        'split', split,
+        inputs=[featured_catastrophes_naturelles_data, featured_catastrophes_naturelles_data_iot],
+        outputs=[reformed_catastrophes_naturelles_data, random_row, reformed_catastrophes_naturelles_data_iot,
+                 random_row_iot],
+        code_files=['scripts/cleanig_data_script.py', 'scripts/storage_script.py'],
+    )
+    display_message("Séparation de la ligne terminée avec succès !")
+
+
+def run_train(args):
+    """
+    Étape 3 : entraînement des modèles de base et IoT.
+    """
+    from scripts.feature_schema_script import features_file_for
+    from scripts.model_io_script import holdout_file_for, metadata_file_for
+
+    display_message("\nÉtape 3 : Entrainement d'un modèle ML")
+    options = dict(n_trials=args.trials, resume=not args.no_resume, class_names=mapping_cata, search=args.search,
+                   external_memory=args.external_memory, chunksize=args.chunksize)
+    jobs = [
+        dict(prepared_data_file=reformed_catastrophes_naturelles_data, output_roc_curve=output_roc_curve,
+             output_learning_curve=output_learning_curve, output_matrice_conf=output_matrice_conf,
+             output_model_file=ml_model_file, **options),
+        dict(prepared_data_file=reformed_catastrophes_naturelles_data_iot, output_roc_curve=output_roc_curve_iot,
+             output_learning_curve=output_learning_curve_iot, output_matrice_conf=output_matrice_conf_iot,
+             output_model_file=ml_model_file_iot, **options),
+    ]
+
+    def train():
+        from scripts.ensemble_script import fit_ensemble
+        from scripts.ML_model_training_script import train_ml_model, train_ml_models
+        from scripts.report_script import ReportRenderer
+
+        if args.sequential:
+            # Les figures d'un modèle sont rendues en arrière-plan pendant l'entraînement du suivant
+            renderer = ReportRenderer(html_file=args.html_report)
+            for job in jobs:
+                renderer.submit_all(train_ml_model(**job, n_jobs=args.jobs, render=False))
+            renderer.close()
+        else:
+            # Les deux modèles sont entraînés en parallèle, les cœurs étant répartis entre eux
+            train_ml_models(jobs, n_jobs=args.jobs, html_file=args.html_report)
+
+        # Couche de stacking apprise sur les prédictions des deux modèles sur leur pli de validation
+        fit_ensemble({'base': ml_model_file, 'iot': ml_model_file_iot}, ensemble_file)
+
+    outputs = [args.html_report, ensemble_file] if args.html_report else [ensemble_file]
+    for job in jobs:
+        model_file = job['output_model_file']
+        outputs += [model_file, metadata_file_for(model_file), features_file_for(model_file),
+                    holdout_file_for(model_file)]
+        if not args.html_report:
+            outputs += [job['output_roc_curve'], job['output_learning_curve'], job['output_matrice_conf']]
+    # L'espace de recherche des hyperparamètres fait partie du code du script d'entraînement
+    _stage_cache(args).run(
+        'train', train,
+        inputs=[job['prepared_data_file'] for job in jobs],
+        outputs=outputs,
+        params=dict(n_trials=args.trials, class_names=mapping_cata, html_report=args.html_report, search=args.search,
+                    external_memory=args.external_memory, chunksize=args.chunksize),
+        code_files=['scripts/ML_model_training_script.py', 'scripts/external_memory_training_script.py',
+                    'scripts/feature_schema_script.py',
+                    'scripts/model_io_script.py', 'scripts/validation_script.py', 'scripts/report_script.py',
+                    'scripts/visualisation_script.py', 'scripts/storage_script.py', 'scripts/ensemble_script.py'],
+    )
+    display_message(f"Modèles ML sauvegardés sous : {ml_model_file} et {ml_model_file_iot}")
+
+
+def run_predict(args):
+    """
+    Étape 4 : prédiction avec les modèles entraînés.
+    """
+    import os
+
+    from scripts.prediction_script import perform_ensemble_prediction, perform_prediction
+
+    display_message("\nÉtape 4 : Prédiction avec un modèle ML")
+    # Les lignes brutes (mesures du jour) reçoivent leurs caractéristiques temporelles à partir de l'état glissant
+    perform_prediction(args.row, args.row_iot, ml_model_file, ml_model_file_iot, temporal_features_file,
+                       temporal_features_file_iot)
+    if os.path.exists(ensemble_file):
+        weights = {'base': args.weights[0], 'iot': args.weights[1]} if args.weights else None
+        perform_ensemble_prediction(args.row, args.row_iot, ensemble_file, weights=weights,
+                                    temporal_files={'base': temporal_features_file, 'iot': temporal_features_file_iot})
+
+
+def run_forecast(args):
+    """
+    Prévision : probabilités de chaque catastrophe pour chaque quartier et chaque jour d'une plage de dates.
+    """
+    import pandas as pd
+    from scripts.forecast_script import forecast_grid
+    from scripts.storage_script import read_table
+
+    start = args.start
+    if start is None:
+        # Par défaut, à partir du lendemain du dernier jour observé
+        last_day = pd.to_datetime(read_table(reformed_catastrophes_naturelles_data, columns=['date'])['date']).max()
+        start = (last_day + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    end = args.end or (pd.Timestamp(start) + pd.Timedelta(days=args.days - 1)).strftime('%Y-%m-%d')
+
+    display_message(f"\nPrévision par quartier du {start} au {end}")
+    forecast_grid({
+        'base': (ml_model_file, reformed_catastrophes_naturelles_data, temporal_features_file),
+        'iot': (ml_model_file_iot, reformed_catastrophes_naturelles_data_iot, temporal_features_file_iot),
+    }, start, end, zones=list(mapping_zone.values()), output_file=args.output)
+
+
+def run_update(args):
+    """
+    Mise à jour incrémentale des modèles avec de nouveaux jours de données (fichier brut, même format que
+    catastrophes_naturelles.csv).
+    """
+    import os
+
+    from scripts.cleanig_data_script import CleaningPipeline
+    from scripts.data_quality_script import RawDataSchema, validate_raw_data
+    from scripts.feature_engineering_script import TemporalFeatures
+    from scripts.ML_model_training_script import update_ml_model
+    from scripts.storage_script import read_table
+
+    display_message(f"\nMise à jour des modèles avec les nouvelles lignes de {args.new_rows}")
+    # Les nouvelles lignes sont validées avant tout réentraînement ; les rejets restent dans data/
+    name = os.path.basename(args.new_rows)
+    validated_rows = f'data/validated_{name}'
+    validate_raw_data(args.new_rows, validated_rows, f'data/quarantine_{name}',
+                      f'data/validation_report_{os.path.splitext(name)[0]}.json',
+                      RawDataSchema.from_mappings(mapping_cata, mapping_zone), max_rejected_fraction=max_rejected_fraction)
+    pipeline = CleaningPipeline.from_raw_csv(validated_rows)
+    pipeline.map_column(mapping_cata, "catastrophe").map_column(mapping_zone, "quartier").normalize_humidity()
+
+    models = [
+        (reformed_catastrophes_naturelles_data, temporal_features_file, ml_model_file, output_roc_curve,
+         output_learning_curve, output_matrice_conf),
+        (reformed_catastrophes_naturelles_data_iot, temporal_features_file_iot, ml_model_file_iot,
+         output_roc_curve_iot, output_learning_curve_iot, output_matrice_conf_iot),
+    ]
+    for prepared_data_file, features_file, model_file, roc_curve, learning_curve, matrice_conf in models:
+        # Caractéristiques temporelles des nouvelles lignes calculées à partir de l'état glissant sauvegardé
+        temporal_features = TemporalFeatures.load(features_file)
+        new_rows = temporal_features.transform(pipeline.data)
+        status = update_ml_model(new_rows, prepared_data_file, model_file, roc_curve, learning_curve,
+                                 matrice_conf, n_rounds=args.rounds, drift_tolerance=args.drift_tolerance,
+                                 n_trials=args.trials, n_jobs=args.jobs, class_names=mapping_cata,
+                                 search=args.search)
+        temporal_features.fit(read_table(prepared_data_file)).save(features_file)
+        display_message(f"{model_file} : {status}")
+    _refit_ensemble()
+
+
+def run_rollback(args):
+    """
+    Remet en place une version archivée d'un modèle.
+    """
+    from scripts.model_io_script import list_model_versions, rollback_model
+
+    model_file = ml_model_file_iot if args.model == 'iot' else ml_model_file
+    if args.list:
+        for entry in list_model_versions(model_file):
+            print(f"v{entry['version']:04d}  {entry['created_at']}  accuracy : {entry['accuracy']}")
+        return
+    version = rollback_model(model_file, args.version)
+    display_message(f"{model_file} : version {version} restaurée")
+    _refit_ensemble()
+
+
+def _refit_ensemble():
+    """
+    Réapprend la couche de stacking après le remplacement d'un modèle (mise à jour, retour arrière).
+    """
+    import os
+
+    from scripts.ensemble_script import fit_ensemble
+    from scripts.model_io_script import holdout_file_for
+
+    model_files = {'base': ml_model_file, 'iot': ml_model_file_iot}
+    if all(os.path.exists(holdout_file_for(path)) for path in model_files.values()):
+        fit_ensemble(model_files, ensemble_file)
+
+
+def run_batch(args):
+    """
+    Entraîne tous les datasets d'un manifeste (villes, sous-ensembles de capteurs), chacun dans son dossier.
+    """
+    from scripts.orchestrator_script import BatchOrchestrator
+
+    display_message(f"\nEntraînement en lot des datasets de {args.manifest}")
+    # Les mappings et paramètres de main.py servent de valeurs par défaut aux datasets du manifeste
+    defaults = dict(mapping_cata=mapping_cata, mapping_zone=mapping_zone, correlation_threshold=correlation_threshold,
+                    correlation_score=correlation_score,
+                    temporal=dict(lags=temporal_lags, windows=temporal_windows, aggregations=temporal_aggregations))
+    orchestrator = BatchOrchestrator.from_file(args.manifest, defaults=defaults, output_dir=args.output_dir,
+                                               concurrency=args.concurrency, cores=args.cores, n_trials=args.trials)
+    summary = orchestrator.run()
+    failed = [name for name, entry in summary.items() if entry['status'] != 'done']
+    if failed:
+        display_message(f"Tâches en échec ou ignorées : {', '.join(failed)}")
+    display_message(f"Modèles et métriques sauvegardés dans {orchestrator.output_dir}/")
+
+
+def run_all(args):
+    """
+    Exécute toutes les étapes dans l'ordre.
+    """
+    from scripts.instrumentation_script import Measurement
+
+    for step in (run_clean, run_features, run_split, run_train, run_predict):
+        with Measurement(step.__name__.removeprefix('run_'), kind='step'):
+            step(args)
+
+
+def _add_train_arguments(parser):
+    parser.add_argument('--trials', type=int, default=100, help="Nombre d'essais Optuna par modèle (défaut : 100)")
+    parser.add_argument('--jobs', type=int, default=None, help="Nombre de cœurs à utiliser (défaut : tous)")
+    parser.add_argument('--sequential', action='store_true', help="Entraîner les modèles l'un après l'autre")
+    parser.add_argument('--no-resume', action='store_true', help="Relancer la recherche Optuna depuis zéro")
+    parser.add_argument('--search', choices=['optuna', 'halving'], default='optuna',
+                        help="Recherche des hyperparamètres : 'optuna' (--trials essais sur les plis complets) ou "
+                             "'halving' (--trials configurations évaluées d'abord sur des sous-échantillons)")
+    parser.add_argument('--external-memory', action='store_true',
+                        help="Entraîner sans charger le dataset préparé en mémoire (lecture par blocs, matrice "
+                             "XGBoost sur disque), pour les données plus grosses que la RAM")
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help="Nombre de lignes lues par bloc avec --external-memory (défaut : 100000)")
+    parser.add_argument('--html-report', default=None,
+                        help="Regrouper les figures des modèles dans ce rapport HTML au lieu des PNG de docs/")
+
+
+def _add_predict_arguments(parser):
+    parser.add_argument('--row', default=random_row, help=f"Lignes à prédire, modèle de base (défaut : {random_row})")
+    parser.add_argument('--row-iot', default=random_row_iot,
+                        help=f"Lignes à prédire, modèle IoT (défaut : {random_row_iot})")
+    parser.add_argument('--weights', type=float, nargs=2, metavar=('BASE', 'IOT'), default=None,
+                        help="Combiner les modèles par moyenne pondérée au lieu de la couche de stacking")
+
+
+def _run_with_metrics(args):
+    """
+    Exécute la sous-commande en mesurant chaque étape et chaque fonction de scripts/ (voir
+    scripts/instrumentation_script.py).
+    """
+    import os
+    import tempfile
+    from scripts.instrumentation_script import Measurement, disable, enable, read_metrics, write_prometheus
+
+    # Pour Prometheus, les mesures brutes (y compris celles des processus enfants) sont agrégées à la fin
+    prometheus = args.metrics.endswith('.prom')
+    if prometheus:
+        descriptor, events_file = tempfile.mkstemp(suffix='.jsonl')
+        os.close(descriptor)
+    else:
+        events_file = args.metrics
+
+    enable(events_file)
+    try:
+        with Measurement(args.command, kind='step'):
+            args.func(args)
+    finally:
+        disable()
+        if prometheus:
+            write_prometheus(read_metrics(events_file), args.metrics)
+            os.remove(events_file)
+    print(f"Mesures sauvegardées sous : {args.metrics}")
+
+
+def build_parser():
+    """
+    Construit l'interface en ligne de commande (une sous-commande par étape).
+    """
+    parser = argparse.ArgumentParser(description="Traitement des données et entraînement des modèles de prédiction "
+                                                 "des catastrophes naturelles.")
+    subparsers = parser.add_subparsers(dest='command')
+
+    metrics = argparse.ArgumentParser(add_help=False)
+    metrics.add_argument('--metrics', default=None,
+                         help="Mesurer temps, CPU, mémoire, lignes et octets de chaque étape et fonction : lignes JSON "
+                              "dans ce fichier, ou format texte Prometheus si son extension est .prom")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[metrics])
+    common.add_argument('--no-cache', action='store_true',
+                        help=f"Exécuter les étapes même si leurs entrées n'ont pas changé (cache : {cache_dir}/)")
+
+    subparsers.add_parser('validate', parents=[common], help="Étape 0 : valider le fichier brut") \
+        .set_defaults(func=run_validate)
+    subparsers.add_parser('clean', parents=[common], help="Étape 1 : réduire les données").set_defaults(func=run_clean)
+    subparsers.add_parser('features', parents=[common], help="Étape 1 bis : ajouter les caractéristiques temporelles") \
+        .set_defaults(func=run_features)
+    subparsers.add_parser('split', parents=[common], help="Étape 2 : séparer une ligne du dataset") \
+        .set_defaults(func=run_split)
+
+    train_parser = subparsers.add_parser('train', parents=[common], help="Étape 3 : entraîner les modèles ML")
+    _add_train_arguments(train_parser)
+    train_parser.set_defaults(func=run_train)
+
+    predict_parser = subparsers.add_parser('predict', parents=[common], help="Étape 4 : prédire avec les modèles ML")
+    _add_predict_arguments(predict_parser)
+    predict_parser.set_defaults(func=run_predict)
+
+    forecast_parser = subparsers.add_parser('forecast', parents=[metrics],
+                                            help="Probabilités par quartier et par jour sur une plage de dates")
+    forecast_parser.add_argument('--start', default=None,
+                                 help="Première date (défaut : lendemain du dernier jour des données)")
+    forecast_parser.add_argument('--end', default=None, help="Dernière date (défaut : --days jours après --start)")
+    forecast_parser.add_argument('--days', type=int, default=30, help="Nombre de jours si --end est absent")
+    forecast_parser.add_argument('--output', default=forecast_data,
+                                 help=f"Table des probabilités (défaut : {forecast_data})")
+    forecast_parser.set_defaults(func=run_forecast)
+
+    update_parser = subparsers.add_parser('update', parents=[metrics], help="Mettre à jour les modèles avec de nouveaux jours")
+    update_parser.add_argument('new_rows', help="Fichier brut des nouvelles lignes (même format que les données)")
+    update_parser.add_argument('--rounds', type=int, default=20,
+                               help="Itérations de boosting ajoutées sur les nouvelles lignes (défaut : 20)")
+    update_parser.add_argument('--drift-tolerance', type=float, default=0.02,
+                               help="Baisse d'accuracy déclenchant une nouvelle recherche (défaut : 0.02)")
+    update_parser.add_argument('--trials', type=int, default=100, help="Nombre d'essais Optuna en cas de dérive")
+    update_parser.add_argument('--jobs', type=int, default=None, help="Nombre de cœurs à utiliser (défaut : tous)")
+    update_parser.add_argument('--search', choices=['optuna', 'halving'], default='optuna',
+                               help="Recherche des hyperparamètres en cas de dérive")
+    update_parser.set_defaults(func=run_update)
+
+    rollback_parser = subparsers.add_parser('rollback', parents=[metrics], help="Restaurer une version archivée d'un modèle")
+    rollback_parser.add_argument('--model', choices=['base', 'iot'], default='base')
+    rollback_parser.add_argument('--version', type=int, default=None, help="Version à restaurer (défaut : la dernière)")
+    rollback_parser.add_argument('--list', action='store_true', help="Lister les versions archivées")
+    rollback_parser.set_defaults(func=run_rollback)
+
+    batch_parser = subparsers.add_parser('batch', parents=[metrics], help="Entraîner les datasets d'un manifeste")
+    batch_parser.add_argument('manifest', nargs='?', default=batch_manifest,
+                              help=f"Manifeste JSON des datasets (défaut : {batch_manifest})")
+    batch_parser.add_argument('--output-dir', default=None, help="Dossier de sortie (défaut : celui du manifeste)")
+    batch_parser.add_argument('--concurrency', type=int, default=None,
+                              help="Nombre de tâches simultanées (défaut : un quart des cœurs)")
+    batch_parser.add_argument('--cores', type=int, default=None,
+                              help="Nombre total de cœurs répartis entre les tâches (défaut : tous)")
+    batch_parser.add_argument('--trials', type=int, default=None,
+                              help="Nombre d'essais Optuna par dataset (défaut : celui du manifeste)")
+    batch_parser.set_defaults(func=run_batch)
+
+    all_parser = subparsers.add_parser('all', parents=[common], help="Exécuter toutes les étapes (par défaut)")
+    _add_train_arguments(all_parser)
+    _add_predict_arguments(all_parser)
+    all_parser.set_defaults(func=run_all)
+
+    return parser
+
+
+def main(argv=None):
     """
     Programme principal pour gérer le traitement des données et l'entraînement des modèles.
+
+    Parameters:
+        argv (list): Arguments de la ligne de commande (sys.argv par défaut). Sans sous-commande,
+            toutes les étapes sont exécutées.
     """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(['all', *(argv or [])])
+
     display_message("Bienvenue dans le programme de traitement des données et d'entraînement de modèle")
-    options = {
-        "1": "Réduire les données",
-        "2": "Séparer une ligne du dataset",
-        "3": "Entrainement d'un modèle ML",
-        "4": "Prédiction avec un modèle ML"
-    }
-
-    # Afficher les options disponibles
-    for key, value in options.items():
-        print(f"{key}. {value}")
-
-    # Demander à l'utilisateur de choisir une option ou de tout exécuter
-    choice = input(Fore.CYAN + "\nEntrez les numéros des étapes à exécuter (séparés par des virgules) ou appuyez sur Entrée pour tout exécuter : " + Style.RESET_ALL)
-
-    if not choice.strip():
-        choice = list(map(int, options.keys()))  # Exécuter toutes les étapes
+    if args.metrics:
+        _run_with_metrics(args)
     else:
-        choice = list(map(int, choice.split(',')))
-
-    # Étape 1 : Réduction des données
-    if 1 in choice:
-        display_message("\nÉtape 1 : Nettoyage et réduction des données...")
-        debug_ligne(catastrophes_naturelles_data, clean_catastrophes_naturelles_data)
-        column_mapping(clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data, mapping_cata, "catastrophe")
-        column_mapping(clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data, mapping_zone, "quartier")
-        normalize_humidity(clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data)
-        drop_column(clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data_iot, important_features)
-
-        visualisation_correlation_matrix(clean_catastrophes_naturelles_data, visu_corr_before)
-        correlation_matrix(clean_catastrophes_naturelles_data, clean_catastrophes_naturelles_data)
-        visualisation_correlation_matrix(clean_catastrophes_naturelles_data, visu_corr_after)
-
-        compute_statistics(clean_catastrophes_naturelles_data, statistics_data)
-        compute_statistics(clean_catastrophes_naturelles_data_iot, statistics_data_iot)
-        display_message(f"Réduction et nettoyage des données terminés avec succès, deux datasets créés : {clean_catastrophes_naturelles_data_iot} et {clean_catastrophes_naturelles_data}")
-
-    # Étape 2 : Séparation d'une ligne
-    if 2 in choice:
-        display_message("\nÉtape 2 : Séparation d'une ligne aléatoire")
-        isolate_random_row(clean_catastrophes_naturelles_data, reformed_catastrophes_naturelles_data, random_row)
-        isolate_random_row(clean_catastrophes_naturelles_data_iot, reformed_catastrophes_naturelles_data_iot, random_row_iot)
-        display_message("Séparation de la ligne terminée avec succès !")
-
-    # Étape 3 : Entraînement d'un modèle ML
-    if 3 in choice:
-        display_message("\nÉtape 3 : Entrainement d'un modèle ML")
-        train_ml_model(reformed_catastrophes_naturelles_data, output_roc_curve, output_learning_curve, output_matrice_conf, output_model_file=ml_model_file)
-        train_ml_model(reformed_catastrophes_naturelles_data_iot, output_roc_curve_iot, output_learning_curve_iot, output_matrice_conf_iot, output_model_file=ml_model_file_iot)
-        display_message(f"Modèles ML sauvegardés sous : {ml_model_file} et {ml_model_file_iot}")
-
-    # Étape 4 : Prédiction avec un modèle ML
-    if 4 in choice:
-        display_message("\nÉtape 4 : Prédiction avec un modèle ML")
-        perform_prediction(random_row, random_row_iot, ml_model_file, ml_model_file_iot)
+        args.func(args)
+
 
 if __name__ == '__main__':
     main()
@@ -1,23 +1,469 @@
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
 import optuna
 import pandas as pd
-from matplotlib import pyplot as plt
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     accuracy_score,
     classification_report,
     confusion_matrix,
-    ConfusionMatrixDisplay,
-    roc_curve,
-    roc_auc_score
 )
-from sklearn.preprocessing import label_binarize
-from scripts.visualisation_script import plot_learning_curve
+from scripts.report_script import (
+    ReportRenderer,
+    confusion_matrix_figure,
+    learning_curve_figure,
+    render_figures,
+    roc_figure,
+)
+from scripts.visualisation_script import compute_learning_curve, learning_curve_from_history
+from scripts.storage_script import read_table, write_table, table_columns
+from scripts.feature_schema_script import FeatureTransformer, features_file_for, load_feature_transformer
+from scripts.model_io_script import save_model, load_model, load_metadata, archive_model, file_sha256, holdout_file_for
+from scripts.validation_script import make_validation_splits, accuracy_by_group, stratified_subsample
+from scripts.instrumentation_script import instrumented, record_trials
 import xgboost as xgb
-import joblib
 
 
+def _suggest_params(trial):
+    """
+    Espace de recherche des hyperparamètres XGBoost.
+    """
+    return {
+        'n_estimators': trial.suggest_int('n_estimators', 50, 200),
+        'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2),
+        'max_depth': trial.suggest_int('max_depth', 3, 10),
+        'subsample': trial.suggest_float('subsample', 0.6, 1.0),
+        'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
+        'gamma': trial.suggest_float('gamma', 0, 10),
+        'min_child_weight': trial.suggest_int('min_child_weight', 1, 10),
+        'reg_alpha': trial.suggest_float('reg_alpha', 0, 1),
+        'reg_lambda': trial.suggest_float('reg_lambda', 0, 1),
+    }
+
+
+def _booster_params(params, n_classes, n_threads=None):
+    """
+    Convertit les paramètres de `XGBClassifier` en paramètres de `xgb.train` (sans 'n_estimators').
+
+    Returns:
+        tuple: (paramètres du booster, nombre d'itérations de boosting)
+    """
+    params = dict(params)
+    num_boost_round = params.pop('n_estimators', 100)
+    params.update({
+        'objective': 'multi:softprob',
+        'num_class': n_classes,
+        'tree_method': 'hist',
+        'eval_metric': 'merror',
+        'seed': params.pop('random_state', 42),
+    })
+    if n_threads:
+        params['nthread'] = n_threads
+    return params, num_boost_round
+
+
+class TrainingMatrices:
+    """
+    Matrices XGBoost construites une seule fois et réutilisées par tous les essais Optuna et le réentraînement
+    final (dont l'historique sert de courbe d'apprentissage), au lieu de reconvertir et requantifier les
+    DataFrames à chaque `fit`.
+
+    Parameters:
+        X_train, y_train: Données d'entraînement. X_train peut être un `xgb.DataIter` qui fournit les lignes par
+            blocs (étiquettes comprises, y_train None) : la matrice est alors construite hors mémoire, pages sur
+            disque (voir `scripts.external_memory_training_script`), et `n_classes` doit être renseigné.
+        X_test, y_test: Données de validation.
+        max_bin (int): Nombre de bins de la quantification 'hist'.
+        n_classes (int): Nombre de classes (déduit des étiquettes si None).
+    """
+
+    def __init__(self, X_train, y_train, X_test, y_test, max_bin=256, n_classes=None):
+        self.y_test = np.asarray(y_test)
+        self.n_classes = n_classes or int(max(np.max(y_train), np.max(y_test))) + 1
+        if isinstance(X_train, xgb.DataIter):
+            self.dtrain = xgb.ExtMemQuantileDMatrix(X_train, max_bin=max_bin)
+        else:
+            self.dtrain = xgb.QuantileDMatrix(X_train, y_train, max_bin=max_bin)
+        self.dvalid = xgb.QuantileDMatrix(X_test, y_test, ref=self.dtrain, max_bin=max_bin)
+        self.train_rows = [int(self.dtrain.num_row())]
+
+    def train(self, params, n_threads=None, callbacks=None, evals_result=None):
+        """
+        Entraîne un booster avec des paramètres au format `XGBClassifier`.
+
+        Parameters:
+            params (dict): Hyperparamètres (format `XGBClassifier`).
+            n_threads (int): Nombre de threads XGBoost.
+            callbacks (list): Callbacks XGBoost (évalués sur les données de validation).
+            evals_result (dict): Si renseigné, reçoit l'historique par itération de l'erreur sur les données
+                d'entraînement ('train') et de validation ('validation').
+
+        Returns:
+            xgb.Booster: Booster entraîné.
+        """
+        booster_params, num_boost_round = _booster_params(params, self.n_classes, n_threads)
+        # L'évaluation à chaque itération n'est faite que si elle est utilisée (pruning, courbe d'apprentissage)
+        evals = []
+        if evals_result is not None:
+            evals.append((self.dtrain, 'train'))
+        if callbacks or evals_result is not None:
+            evals.append((self.dvalid, 'validation'))
+        return xgb.train(booster_params, self.dtrain, num_boost_round=num_boost_round, evals=evals,
+                         evals_result=evals_result, callbacks=callbacks, verbose_eval=False)
+
+    def validation_accuracy(self, booster):
+        """
+        Accuracy d'un booster sur les données de validation.
+        """
+        y_pred = booster.predict(self.dvalid).argmax(axis=1)
+        return accuracy_score(self.y_test, y_pred)
+
+    def evaluate(self, params, n_threads=None, trial=None):
+        """
+        Accuracy de validation pour un jeu d'hyperparamètres, au format de `CrossValidationMatrices.evaluate`
+        (un seul pli), pour que `tune_hyperparameters` puisse chercher sur ces matrices.
+
+        Returns:
+            list: Accuracy du pli.
+        """
+        callbacks = [_PruningCallback(trial)] if trial is not None else None
+        booster = self.train(params, n_threads=n_threads, callbacks=callbacks)
+        if callbacks and callbacks[0].pruned:
+            raise optuna.TrialPruned()
+        return [self.validation_accuracy(booster)]
+
+
+class _PruningCallback(xgb.callback.TrainingCallback):
+    """
+    Callback XGBoost qui rapporte l'accuracy de validation à Optuna après chaque itération de boosting
+    et arrête l'entraînement si le pruner juge l'essai peu prometteur.
+
+    Parameters:
+        stop_event (threading.Event): Signalé quand l'essai est arrêté, pour interrompre les autres plis.
+    """
+
+    def __init__(self, trial, dataset='validation', metric='merror', stop_event=None):
+        self.trial = trial
+        self.dataset = dataset
+        self.metric = metric
+        self.stop_event = stop_event
+        self.pruned = False
+
+    def after_iteration(self, model, epoch, evals_log):
+        error = evals_log[self.dataset][self.metric][-1]
+        self.trial.report(1 - error, epoch)
+        if self.trial.should_prune():
+            self.pruned = True
+            if self.stop_event is not None:
+                self.stop_event.set()
+            return True
+        return False
+
+
+class _StopCallback(xgb.callback.TrainingCallback):
+    """
+    Callback XGBoost qui arrête l'entraînement d'un pli dès que l'essai a été arrêté sur un autre pli.
+    """
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+
+    def after_iteration(self, model, epoch, evals_log):
+        return self.stop_event.is_set()
+
+
+class CrossValidationMatrices:
+    """
+    Matrices XGBoost de chaque pli de validation (une `TrainingMatrices` par pli), construites une seule fois
+    et réutilisées par tous les essais. Les plis d'un essai sont entraînés en parallèle dans des threads
+    (XGBoost libère le GIL).
+
+    Parameters:
+        X, y: Dataset complet.
+        splits (list): Plis (indices d'entraînement, indices de validation), du plus ancien au plus récent.
+        max_bin (int): Nombre de bins de la quantification 'hist'.
+        fraction (float): Proportion des lignes d'entraînement de chaque pli gardée (sous-échantillon stratifié
+            par classe) ; les données de validation sont toujours complètes.
+        random_state (int): Graine du sous-échantillonnage.
+    """
+
+    def __init__(self, X, y, splits, max_bin=256, fraction=1.0, random_state=42):
+        y = np.asarray(y)
+        n_classes = int(np.max(y)) + 1
+        if fraction < 1:
+            splits = [(stratified_subsample(train, y[train], fraction, random_state), test) for train, test in splits]
+        self.train_rows = [len(train) for train, _ in splits]
+        self.folds = [
+            TrainingMatrices(X.iloc[train], y[train], X.iloc[test], y[test], max_bin=max_bin, n_classes=n_classes)
+            for train, test in splits
+        ]
+
+    def evaluate(self, params, n_threads=None, trial=None):
+        """
+        Accuracy de validation de chaque pli pour un jeu d'hyperparamètres.
+
+        Si `trial` est renseigné, l'accuracy du pli le plus récent est rapportée à Optuna à chaque itération ;
+        si le pruner arrête l'essai, les autres plis sont interrompus et `optuna.TrialPruned` est levée.
+
+        Returns:
+            list: Accuracy de chaque pli.
+        """
+        n_folds = len(self.folds)
+        threads_per_fold = max(1, (n_threads or os.cpu_count() or 1) // n_folds)
+        stop_event = threading.Event()
+
+        def run_fold(fold):
+            callbacks = None
+            if trial is not None:
+                callbacks = [_PruningCallback(trial, stop_event=stop_event) if fold == n_folds - 1
+                             else _StopCallback(stop_event)]
+            booster = self.folds[fold].train(params, n_threads=threads_per_fold, callbacks=callbacks)
+            return self.folds[fold].validation_accuracy(booster)
+
+        with ThreadPoolExecutor(max_workers=n_folds) as executor:
+            accuracies = list(executor.map(run_fold, range(n_folds)))
+
+        if stop_event.is_set():
+            raise optuna.TrialPruned()
+        return accuracies
+
+
+def _objective(trial, cv_matrices, n_threads):
+    """
+    Fonction d'optimisation Optuna : entraîne un XGBoost sur chaque pli avec les paramètres proposés et renvoie
+    l'accuracy moyenne des plis.
+    """
+    params = _suggest_params(trial)
+    fold_accuracies = cv_matrices.evaluate(params, n_threads=n_threads, trial=trial)
+    trial.set_user_attr('fold_accuracies', fold_accuracies)
+    return float(np.mean(fold_accuracies))
+
+
+def _load_study(study_name, storage):
+    """
+    Crée ou recharge l'étude Optuna stockée dans la base SQLite (reprise d'une recherche interrompue).
+    """
+    storage = optuna.storages.RDBStorage(storage, engine_kwargs={'connect_args': {'timeout': 60}})
+    return optuna.create_study(study_name=study_name, storage=storage, direction='maximize',
+                               pruner=optuna.pruners.MedianPruner(n_warmup_steps=10), load_if_exists=True)
+
+
+def _optimize_worker(study_name, storage, n_trials, data, n_threads):
+    """
+    Processus de recherche : exécute des essais sur l'étude partagée jusqu'à atteindre `n_trials` essais terminés.
+    """
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    # Les matrices sont construites une fois par processus puis partagées par tous ses essais
+    matrices = CrossValidationMatrices(*data) if isinstance(data, tuple) else data
+    study = _load_study(study_name, storage)
+    max_trials = optuna.study.MaxTrialsCallback(
+        n_trials, states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED))
+    study.optimize(lambda trial: _objective(trial, matrices, n_threads), n_trials=n_trials, callbacks=[max_trials])
+
+
+@instrumented
+def successive_halving_search(X, y, splits, n_configs=81, eta=3, min_fraction=1 / 27, min_rounds=10, n_jobs=None,
+                              matrices=None, random_state=42):
+    """
+    Recherche multi-fidélité des hyperparamètres (successive halving) : `n_configs` configurations tirées au
+    hasard sont d'abord évaluées sur un petit sous-échantillon stratifié des données d'entraînement de chaque pli,
+    avec un nombre d'itérations de boosting réduit dans la même proportion. Seul le meilleur tiers (1 / `eta`)
+    passe au palier suivant, où les données et les itérations sont multipliées par `eta`, jusqu'au dernier palier
+    évalué sur les plis complets avec tous les `n_estimators`. L'accuracy de validation est toujours calculée sur
+    les plis de validation complets.
+
+    Parameters:
+        X, y: Dataset complet.
+        splits (list): Plis de validation (voir `make_validation_splits`).
+        n_configs (int): Nombre de configurations évaluées au premier palier.
+        eta (int): Facteur de réduction entre deux paliers.
+        min_fraction (float): Proportion des données (et des itérations) du premier palier.
+        min_rounds (int): Nombre minimal d'itérations de boosting d'une évaluation.
+        n_jobs (int): Nombre de cœurs à utiliser (tous par défaut).
+        matrices (CrossValidationMatrices): Matrices complètes déjà construites, réutilisées au dernier palier.
+        random_state (int): Graine du tirage des configurations et des sous-échantillons.
+
+    Returns:
+        optuna.Study: Étude en mémoire. Les configurations éliminées sont des essais arrêtés tôt, avec l'accuracy
+            de chaque palier comme valeur intermédiaire ; les finalistes sont des essais terminés. Le calcul
+            dépensé est enregistré dans `study.user_attrs['compute']`.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_rungs = max(1, int(round(np.log(1 / min_fraction) / np.log(eta)))) + 1
+    fractions = [min(1.0, min_fraction * eta ** rung) for rung in range(n_rungs - 1)] + [1.0]
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.create_study(direction='maximize', sampler=optuna.samplers.RandomSampler(seed=random_state))
+    candidates = []
+    for _ in range(n_configs):
+        trial = study.ask()
+        candidates.append((trial, _suggest_params(trial)))
+
+    started_at, started_cpu = time.perf_counter(), time.process_time()
+    row_rounds, fold_trainings = 0, 0
+    print(f"Successive halving : {n_configs} configurations, {n_rungs} paliers "
+          f"({', '.join(f'{fraction:.1%}' for fraction in fractions)} des données)...")
+    for rung, fraction in enumerate(fractions):
+        last = rung == n_rungs - 1
+        cv_matrices = (matrices if last and matrices is not None
+                       else CrossValidationMatrices(X, y, splits, fraction=fraction, random_state=random_state))
+        # Les configurations d'un palier sont évaluées en parallèle dans des threads (XGBoost libère le GIL)
+        n_workers = max(1, min(len(candidates), n_jobs // len(splits)))
+        n_threads = max(1, n_jobs // n_workers)
+
+        def evaluate(params):
+            rounds = max(min_rounds, int(np.ceil(params['n_estimators'] * fraction)))
+            return rounds, cv_matrices.evaluate({**params, 'n_estimators': rounds}, n_threads=n_threads)
+
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(evaluate, [params for _, params in candidates]))
+
+        scores = []
+        for (trial, _), (rounds, fold_accuracies) in zip(candidates, results):
+            score = float(np.mean(fold_accuracies))
+            cost = rounds * sum(cv_matrices.train_rows)
+            trial.report(score, rung)
+            trial.set_user_attr('fold_accuracies', fold_accuracies)
+            trial.set_user_attr('row_rounds', trial.user_attrs.get('row_rounds', 0) + cost)
+            row_rounds += cost
+            fold_trainings += len(fold_accuracies)
+            scores.append(score)
+
+        ranking = np.argsort(-np.asarray(scores), kind='stable')
+        print(f"Palier {rung + 1}/{n_rungs} : {len(candidates)} configurations sur {fraction:.1%} des données, "
+              f"meilleure accuracy {scores[ranking[0]]:.4f}")
+        if last:
+            for (trial, _), score in zip(candidates, scores):
+                study.tell(trial, score)
+        else:
+            kept = set(ranking[:max(1, len(candidates) // eta)].tolist())
+            for index, (trial, _) in enumerate(candidates):
+                if index not in kept:
+                    study.tell(trial, state=optuna.trial.TrialState.PRUNED)
+            candidates = [candidate for index, candidate in enumerate(candidates) if index in kept]
+
+    study.set_user_attr('compute', {
+        'row_rounds': int(row_rounds),
+        'fold_trainings': fold_trainings,
+        'wall_seconds': time.perf_counter() - started_at,
+        'cpu_seconds': time.process_time() - started_cpu,
+    })
+    return study
+
+
+def search_compute(study, train_rows):
+    """
+    Calcul dépensé par une recherche, en lignes d'entraînement × itérations de boosting sommées sur les plis, et
+    son équivalent en essais complets (tous les plis, toutes les lignes, `n_estimators` moyen des essais).
+
+    Pour un essai Optuna arrêté tôt, le nombre d'itérations est celui des valeurs rapportées avant l'arrêt ; les
+    essais de `successive_halving_search` enregistrent leur calcul exact ('row_rounds').
+
+    Parameters:
+        study (optuna.Study): Étude terminée.
+        train_rows (list): Nombre de lignes d'entraînement de chaque pli complet.
+
+    Returns:
+        dict: 'trials', 'row_rounds', 'full_trial_equivalents' et 'wall_seconds' (durée des essais ou de la
+            recherche).
+    """
+    trials = study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,
+                                                      optuna.trial.TrialState.PRUNED))
+    row_rounds = 0
+    for trial in trials:
+        if 'row_rounds' in trial.user_attrs:
+            row_rounds += trial.user_attrs['row_rounds']
+        elif trial.state == optuna.trial.TrialState.PRUNED:
+            row_rounds += len(trial.intermediate_values) * sum(train_rows)
+        else:
+            row_rounds += trial.params['n_estimators'] * sum(train_rows)
+    mean_rounds = np.mean([trial.params['n_estimators'] for trial in trials]) if trials else 0
+    compute = study.user_attrs.get('compute', {})
+    return {
+        'trials': len(trials),
+        'row_rounds': int(row_rounds),
+        'full_trial_equivalents': float(row_rounds / (mean_rounds * sum(train_rows))) if mean_rounds else 0.0,
+        'wall_seconds': compute.get('wall_seconds', sum(
+            trial.duration.total_seconds() for trial in trials if trial.duration is not None)),
+    }
+
+
+@instrumented
+def tune_hyperparameters(X, y, splits, study_name, storage, n_trials=100, n_jobs=None, resume=True, matrices=None,
+                         n_workers=None):
+    """
+    Recherche les meilleurs hyperparamètres XGBoost avec Optuna, en parallèle sur plusieurs processus.
+
+    Chaque essai est évalué sur tous les plis de validation (accuracy moyenne). L'étude est stockée dans une
+    base SQLite : une recherche interrompue reprend là où elle s'était arrêtée. Les essais peu prometteurs sont
+    arrêtés tôt à partir de l'accuracy du pli le plus récent, calculée à chaque itération.
+
+    Parameters:
+        X, y: Dataset complet.
+        splits (list): Plis de validation (voir `make_validation_splits`).
+        study_name (str): Nom de l'étude dans la base.
+        storage (str): URL de la base Optuna (ex : 'sqlite:///models/ml_model_optuna.db').
+        n_trials (int): Nombre total d'essais (terminés ou arrêtés tôt) à atteindre.
+        n_jobs (int): Nombre de cœurs à utiliser (tous par défaut).
+        resume (bool): Reprendre l'étude existante ; sinon elle est supprimée et la recherche repart de zéro.
+        matrices (CrossValidationMatrices): Matrices déjà construites, réutilisées si la recherche tourne dans ce
+            processus (ou `TrainingMatrices`, un seul pli).
+        n_workers (int): Nombre de processus de recherche (déduit de `n_jobs` par défaut). Avec 1, la recherche
+            tourne dans ce processus sur `matrices` (X, y et splits peuvent alors être None), ce qu'exige une
+            matrice hors mémoire.
+
+    Returns:
+        optuna.Study: L'étude terminée.
+    """
+    if not resume:
+        try:
+            optuna.delete_study(study_name=study_name, storage=storage)
+        except KeyError:
+            pass
+
+    study = _load_study(study_name, storage)
+    done = len(study.get_trials(states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)))
+    remaining = n_trials - done
+    if remaining <= 0:
+        print(f"Étude '{study_name}' déjà terminée ({done} essais), reprise des résultats.")
+        return study
+    if done:
+        print(f"Reprise de l'étude '{study_name}' : {done} essais déjà effectués, {remaining} restants.")
+
+    # Les cœurs sont répartis entre les processus de recherche, puis entre les plis et les threads XGBoost
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_workers is None:
+        n_workers = max(1, min(n_jobs // len(splits), remaining))
+    started_at = datetime.datetime.now()
+    n_threads = max(1, n_jobs // n_workers)
+    data = (X, y, splits)
+
+    print(f"Recherche Optuna : {remaining} essais sur {n_workers} processus ({n_threads} thread(s) XGBoost chacun)...")
+    if n_workers == 1:
+        _optimize_worker(study_name, storage, n_trials, matrices or data, n_threads)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(_optimize_worker, study_name, storage, n_trials, data, n_threads)
+                       for _ in range(n_workers)]
+            for future in futures:
+                future.result()
+
+    study = _load_study(study_name, storage)
+    # Durée de chaque essai de cette recherche, pour les mesures du pipeline
+    record_trials(study, since=started_at)
+    return study
+
+
+@instrumented
 def train_ml_model(prepared_data_file, output_roc_curve, output_learning_curve, output_matrice_conf,
-                   target_column='catastrophe', output_model_file='best_model_ML.joblib'):
+                   target_column='catastrophe', output_model_file='best_model_ML.ubj', n_trials=100, n_jobs=None,
+                   storage=None, resume=True, learning_curve='history', feature_columns=None, class_names=None,
+                   n_splits=4, render=True, html_file=None, search='optuna', external_memory=False,
+                   chunksize=100_000, validation_rows=50_000):
     """
     Train a Machine Learning model with XGBoost and evaluate its performance.
 
@@ -27,105 +473,402 @@ def train_ml_model(prepared_data_file, output_roc_curve, output_learning_curve,
         output_learning_curve (str): Path to save the learning curve plot.
         output_matrice_conf (str): Path to save the confusion matrix plot.
         target_column (str): Name of the target column.
-        output_model_file (str): Path to save the trained model.
+        output_model_file (str): Path to save the trained model ('.ubj' native binary format, '.json', or
+            '.joblib' pickle). A '<model>.meta.json' sidecar is written next to it.
+        n_trials (int): Number of Optuna trials.
+        n_jobs (int): Number of CPU cores used by the search (all cores by default).
+        storage (str): Optuna storage URL. Defaults to a SQLite file next to the model so an interrupted
+            search resumes.
+        resume (bool): Resume the stored study instead of starting a new search.
+        learning_curve (str): 'history' plots the per-iteration accuracy recorded during the final fit (no extra
+            training); 'sizes' fits cloned models on growing training subsets in parallel.
+        feature_columns (list): Feature columns to load and train on (all columns except the target and 'date'
+            by default).
+        class_names (dict): Label -> class code mapping (e.g. `mapping_cata`), recorded in the metadata.
+        n_splits (int): Number of rolling-origin validation folds over 'date'. The search maximizes the mean
+            accuracy over the folds; the final model is evaluated by training it before the most recent fold,
+            then refit on all rows with the same number of rounds (see `refit_on_all_rows`).
+        render (bool): Render the report figures once the model is saved (in a background process pool). If
+            False, the figures are only returned, e.g. to be rendered together with other models.
+        html_file (str): Write the figures to a single HTML report instead of the separate PNG files.
+        search (str): 'optuna' runs `n_trials` trials on the full folds (TPE sampler, median pruning);
+            'halving' runs `successive_halving_search`, which tunes on stratified subsamples first and trains
+            only the best configurations on the full folds (`n_trials` is then the number of initial
+            configurations).
+        external_memory (bool): Stream the dataset in chunks of `chunksize` rows into an XGBoost external-memory
+            matrix instead of loading it, for datasets larger than RAM (see
+            `scripts.external_memory_training_script`). Validation then uses the most recent days, sampled down
+            to `validation_rows` rows; `search` and `learning_curve` are ignored.
+        chunksize (int): Rows read per chunk with `external_memory`.
+        validation_rows (int): Size of the in-memory validation sample with `external_memory`.
 
     Returns:
-        None
+        list: Report figures (see `scripts.report_script`).
     """
+    if external_memory:
+        from scripts.external_memory_training_script import train_ml_model_external_memory
+        return train_ml_model_external_memory(
+            prepared_data_file, output_roc_curve, output_learning_curve, output_matrice_conf,
+            target_column=target_column, output_model_file=output_model_file, n_trials=n_trials, n_jobs=n_jobs,
+            storage=storage, resume=resume, feature_columns=feature_columns, class_names=class_names,
+            n_splits=n_splits, chunksize=chunksize, validation_rows=validation_rows, render=render,
+            html_file=html_file)
+
     print("Chargement des données...")
-    data = pd.read_csv(prepared_data_file)
+    # 'date' n'est pas une caractéristique du modèle : elle sert seulement à enregistrer l'origine des dates
+    available_columns = table_columns(prepared_data_file)
+    if feature_columns is None:
+        feature_columns = [column for column in available_columns if column not in (target_column, 'date')]
+    date_columns = ['date'] if 'date' in available_columns else []
+    data = read_table(prepared_data_file, columns=[*feature_columns, target_column, *date_columns])
 
     # Séparation des caractéristiques et de la cible
-    X = data.drop(columns=[target_column, 'date'])
+    X = data[feature_columns]
     y = data[target_column]
+    transformer = FeatureTransformer().fit(X, dates=data['date'] if date_columns else None)
+
+    # Plis de validation temporels : on valide toujours sur des jours postérieurs aux données d'entraînement
+    print("Découpage temporel des données en plis de validation...")
+    splits = make_validation_splits(data, n_splits=n_splits)
+    cv_matrices = CrossValidationMatrices(X, y, splits)
 
-    # Division des données en ensembles d'entraînement et de test
-    print("Division des données en ensembles d'entraînement et de test...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Fonction d'optimisation avec Optuna pour XGBoost
-    def objective(trial):
-        params = {
-            'n_estimators': trial.suggest_int('n_estimators', 50, 200),
-            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.2),
-            'max_depth': trial.suggest_int('max_depth', 3, 10),
-            'subsample': trial.suggest_float('subsample', 0.6, 1.0),
-            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
-            'gamma': trial.suggest_float('gamma', 0, 10),
-            'min_child_weight': trial.suggest_int('min_child_weight', 1, 10),
-            'reg_alpha': trial.suggest_float('reg_alpha', 0, 1),
-            'reg_lambda': trial.suggest_float('reg_lambda', 0, 1),
-            'random_state': 42
-        }
-
-        model = xgb.XGBClassifier(**params)
-        model.fit(X_train, y_train)
-
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-
-        return accuracy
-
-    # Optimisation avec Optuna
-    study = optuna.create_study(direction='maximize')
-    study.optimize(objective, n_trials=100)
+    # Optimisation avec Optuna (parallèle et reprenable) ; l'étude est distincte de celles évaluées sur une
+    # découpe aléatoire, dont les scores ne sont pas comparables
+    if search == 'halving':
+        study = successive_halving_search(X, y, splits, n_configs=n_trials, n_jobs=n_jobs, matrices=cv_matrices)
+    else:
+        study_name = f"{os.path.splitext(os.path.basename(output_model_file))[0]}_cv{len(splits)}"
+        # La base SQLite par défaut est créée à côté du modèle : le dossier doit exister
+        os.makedirs(os.path.dirname(output_model_file) or '.', exist_ok=True)
+        if storage is None:
+            storage = f"sqlite:///{os.path.splitext(output_model_file)[0]}_optuna.db"
+        study = tune_hyperparameters(X, y, splits, study_name, storage, n_trials=n_trials, n_jobs=n_jobs,
+                                     resume=resume, matrices=cv_matrices)
+    compute = search_compute(study, cv_matrices.train_rows)
+    print(f"Calcul de la recherche ({search}) : {compute['trials']} essais, {compute['row_rounds']:.3g} lignes × "
+          f"itérations (≈ {compute['full_trial_equivalents']:.1f} essais complets), {compute['wall_seconds']:.1f} s")
 
+    fold_accuracies = study.best_trial.user_attrs.get('fold_accuracies', [])
     print("Meilleur essai: score {},\nparamètres {}".format(study.best_trial.value, study.best_trial.params))
+    print("Accuracy par pli : {}".format(', '.join(f"{accuracy:.4f}" for accuracy in fold_accuracies)))
+
+    # Le modèle est évalué en l'entraînant sur tout ce qui précède le pli le plus récent, puis réentraîné sur
+    # toutes les lignes pour la production
+    train_index, test_index = splits[-1]
+    X_train, y_train = X.iloc[train_index], y.iloc[train_index]
+    X_test, y_test = X.iloc[test_index], y.iloc[test_index]
+    matrices = cv_matrices.folds[-1]
 
     best_params = study.best_trial.params
-    best_xgb_model = xgb.XGBClassifier(**best_params, random_state=42)
+    best_xgb_model = xgb.XGBClassifier(**best_params, random_state=42, n_jobs=n_jobs)
 
-    # Entraînement du modèle avec les meilleurs paramètres
+    # Entraînement du modèle avec les meilleurs paramètres, sur les matrices déjà quantifiées
     print("Entraînement du modèle XGBoost avec les meilleurs paramètres...")
-    best_xgb_model.fit(X_train, y_train)
+    evals_history = {}
+    booster = matrices.train({**best_params, 'random_state': 42}, n_threads=n_jobs, evals_result=evals_history)
+    best_xgb_model.load_model(bytearray(booster.save_raw('ubj')))
+
+    # Courbe d'apprentissage
+    print("Génération des courbes d'apprentissage...")
+    if learning_curve == 'history':
+        print("Calcul des scores à partir de l'historique d'entraînement...")
+        curve = (*learning_curve_from_history(evals_history), "Boosting Iterations")
+    else:
+        print("Calcul des scores pour différentes tailles d'entraînement...")
+        curve = (*compute_learning_curve(best_xgb_model, X_train, y_train, X_test, y_test, n_jobs=n_jobs),
+                 "Training Set Size")
+
+    # Le modèle de production voit aussi les jours les plus récents (ceux que `forecast` et `update` prolongent),
+    # avec le même nombre d'itérations ; métriques et probabilités de validation restent celles de l'évaluation
+    print("Réentraînement du modèle final sur toutes les données...")
+    production_model = refit_on_all_rows(xgb.QuantileDMatrix(X, y), best_params, matrices.n_classes, n_jobs=n_jobs)
+
+    key_columns = [column for column in ('date', 'quartier') if column in data.columns]
+    return save_evaluated_model(
+        best_xgb_model, production_model, X_test, y_test, data[key_columns].iloc[test_index], transformer,
+        output_model_file, output_roc_curve, output_learning_curve, output_matrice_conf, curve,
+        target_column=target_column, class_names=class_names,
+        metrics={'best_trial_accuracy': study.best_trial.value, 'cv_fold_accuracies': fold_accuracies},
+        metadata={
+            'validation': {
+                'scheme': 'rolling_origin' if date_columns else 'random',
+                'n_splits': len(splits),
+                'holdout': [str(pd.Timestamp(data['date'].iloc[test_index].min()).date()),
+                            str(pd.Timestamp(data['date'].iloc[test_index].max()).date())] if date_columns else None,
+                'final_fit': 'all_rows',
+            },
+            'params': best_params,
+            'search': {'method': search, **compute},
+            'training_data': {'file': prepared_data_file, 'sha256': file_sha256(prepared_data_file),
+                              'rows': len(data)},
+        },
+        render=render, html_file=html_file)
+
+
+@instrumented
+def save_evaluated_model(evaluated_model, production_model, X_test, y_test, keys, transformer, output_model_file,
+                         output_roc_curve, output_learning_curve, output_matrice_conf, learning_curve,
+                         target_column='catastrophe', class_names=None, metrics=None, metadata=None, render=True,
+                         html_file=None):
+    """
+    Évalue un modèle sur ses données de validation, sauvegarde le modèle de production (métadonnées, schéma des
+    caractéristiques, probabilités de validation) et construit les figures du rapport. Étape finale commune à
+    `train_ml_model` et à l'entraînement hors mémoire.
 
-    # Prédictions et évaluation
+    Parameters:
+        evaluated_model (xgb.XGBClassifier): Modèle entraîné sans les données de validation.
+        production_model (xgb.XGBClassifier): Modèle sauvegardé (réentraîné sur toutes les lignes).
+        X_test, y_test: Données de validation.
+        keys (pd.DataFrame): Clé des lignes de validation ('date', 'quartier' si disponibles), dans l'ordre de
+            y_test ; écrite avec les probabilités pour apprendre la combinaison des modèles.
+        transformer (FeatureTransformer): Schéma des caractéristiques, sauvegardé avec le modèle.
+        output_model_file (str): Chemin du modèle (le modèle précédent est archivé comme version).
+        output_roc_curve, output_learning_curve, output_matrice_conf (str): Chemins des figures.
+        learning_curve (tuple): (abscisses, scores d'entraînement, scores de validation, titre de l'axe x).
+        target_column (str): Colonne cible du fichier des probabilités de validation.
+        class_names (dict): Libellé -> code des classes, enregistré dans les métadonnées.
+        metrics (dict): Métriques ajoutées à celles calculées ici (ex : 'best_trial_accuracy').
+        metadata (dict): Autres métadonnées ('validation', 'params', 'search', 'training_data'...).
+        render (bool): Rendre les figures (sinon elles sont seulement renvoyées).
+        html_file (str): Rapport HTML unique au lieu des PNG.
+
+    Returns:
+        list: Figures du rapport (voir `scripts.report_script`).
+    """
     print("Évaluation des performances...")
-    y_pred = best_xgb_model.predict(X_test)
+    y_test = np.asarray(y_test)
+    classes = evaluated_model.classes_
+    y_proba = evaluated_model.predict_proba(X_test)
+    y_pred = classes[y_proba.argmax(axis=1)]
     accuracy = accuracy_score(y_test, y_pred)
     print(f"Accuracy: {accuracy}")
     print(classification_report(y_test, y_pred))
 
+    accuracy_by_quartier = {}
+    if 'quartier' in keys.columns:
+        accuracy_by_quartier = accuracy_by_group(y_test, y_pred, keys['quartier'])
+        print(f"Accuracy par quartier : {accuracy_by_quartier}")
+
     # Matrice de confusion
-    cm = confusion_matrix(y_test, y_pred)
+    cm = confusion_matrix(y_test, y_pred, labels=classes)
     print("\nMatrice de confusion :")
     print(cm)
 
-    disp = ConfusionMatrixDisplay(cm, display_labels=best_xgb_model.classes_)
-    disp.plot()
-    plt.title('Matrice de confusion')
-    plt.savefig(output_matrice_conf)
-    plt.show()
-
-    # Sauvegarde du modèle
-    joblib.dump(best_xgb_model, output_model_file)
+    # Sauvegarde du modèle et de ses métadonnées (le modèle précédent est archivé comme version)
+    archive_model(output_model_file)
+    save_model(production_model, output_model_file, metadata={
+        'features': transformer.feature_columns,
+        'classes': {int(code): name for name, code in (class_names or {}).items()}
+        or {int(code): str(code) for code in classes},
+        'metrics': {
+            'accuracy': accuracy,
+            **(metrics or {}),
+            'accuracy_by_quartier': accuracy_by_quartier,
+            'classification_report': classification_report(y_test, y_pred, output_dict=True),
+        },
+        **(metadata or {}),
+    })
+    transformer.save(features_file_for(output_model_file))
     print(f"Modèle sauvegardé sous : {output_model_file}")
 
-    # Calcul des courbes ROC pour chaque classe
-    print("Calcul des courbes ROC pour chaque classe...")
-    y_test_bin = label_binarize(y_test, classes=best_xgb_model.classes_)
-    y_pred_proba = best_xgb_model.predict_proba(X_test)
-
-    plt.figure()
-    for i, class_label in enumerate(best_xgb_model.classes_):
-        fpr, tpr, _ = roc_curve(y_test_bin[:, i], y_pred_proba[:, i])
-        auc_score = roc_auc_score(y_test_bin[:, i], y_pred_proba[:, i])
-        plt.plot(fpr, tpr, label=f"Classe {class_label} (AUC={auc_score:.2f})")
-
-    # Moyenne micro
-    fpr_micro, tpr_micro, _ = roc_curve(y_test_bin.ravel(), y_pred_proba.ravel())
-    auc_micro = roc_auc_score(y_test_bin, y_pred_proba, average='micro')
-    plt.plot(fpr_micro, tpr_micro, linestyle='--', label=f"Micro-average (AUC={auc_micro:.2f})")
-
-    plt.plot([0, 1], [0, 1], 'k--', label="Random Guess")
-    plt.xlabel("False Positive Rate")
-    plt.ylabel("True Positive Rate")
-    plt.title("ROC Curve (One-vs-Rest)")
-    plt.legend()
-    plt.grid()
-    plt.savefig(output_roc_curve)
-    plt.close()
+    # Probabilités sur les données de validation, avec la clé des lignes, pour apprendre la combinaison des modèles
+    holdout = keys.reset_index(drop=True).assign(**{target_column: y_test})
+    for code, column in zip(classes, y_proba.T):
+        holdout[f'proba_{code}'] = column
+    write_table(holdout, holdout_file_for(output_model_file))
 
-    # Courbe d'apprentissage
-    print("Génération des courbes d'apprentissage...")
-    plot_learning_curve(best_xgb_model, X_train, y_train, "Courbe d'apprentissage", output_learning_curve)
+    # Les figures sont dessinées hors du processus d'entraînement, une fois le modèle sauvegardé
+    section = os.path.splitext(os.path.basename(output_model_file))[0]
+    x_values, train_scores, valid_scores, x_label = learning_curve
+    figures = [
+        confusion_matrix_figure(cm, classes, output_matrice_conf, section=section),
+        roc_figure(y_test, y_proba, classes, output_roc_curve, section=section),
+        learning_curve_figure(x_values, train_scores, valid_scores, output_learning_curve, x_label=x_label,
+                              section=section),
+    ]
+    if render:
+        render_figures(figures, html_file=html_file)
+    return figures
+
+
+@instrumented
+def refit_on_all_rows(dtrain, params, n_classes, n_jobs=None):
+    """
+    Réentraîne le modèle de production sur toutes les lignes avec les hyperparamètres retenus (même nombre
+    d'itérations que le modèle évalué).
+
+    Parameters:
+        dtrain (xgb.DMatrix): Toutes les lignes (ex : `xgb.QuantileDMatrix(X, y)`).
+        params (dict): Hyperparamètres (format `XGBClassifier`).
+        n_classes (int): Nombre de classes.
+        n_jobs (int): Nombre de threads XGBoost.
+
+    Returns:
+        xgb.XGBClassifier: Modèle entraîné.
+    """
+    booster_params, num_boost_round = _booster_params({**params, 'random_state': 42}, n_classes, n_jobs)
+    booster = xgb.train(booster_params, dtrain, num_boost_round=num_boost_round)
+    model = xgb.XGBClassifier(**params, random_state=42, n_jobs=n_jobs)
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
+
+
+def append_new_days(prepared_data_file, new_data, key_columns=('date', 'quartier')):
+    """
+    Ajoute au dataset préparé les lignes dont le couple (date, quartier) n'y figure pas encore.
+
+    Parameters:
+        prepared_data_file (str): Chemin du dataset préparé (mis à jour sur place).
+        new_data (pd.DataFrame): Nouvelles lignes, nettoyées comme à l'étape 1 (colonnes supplémentaires ignorées).
+        key_columns (tuple): Colonnes identifiant une ligne.
+
+    Returns:
+        pd.DataFrame: Lignes effectivement ajoutées.
+    """
+    data = read_table(prepared_data_file)
+    missing = [column for column in data.columns if column not in new_data.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans les nouvelles lignes : {', '.join(missing)}")
+
+    new_data = new_data[list(data.columns)]
+    keys = [column for column in key_columns if column in data.columns]
+    existing = pd.MultiIndex.from_frame(data[keys].astype(str))
+    is_new = ~pd.MultiIndex.from_frame(new_data[keys].astype(str)).isin(existing)
+    new_rows = new_data[is_new].drop_duplicates(subset=keys)
+
+    if not new_rows.empty:
+        write_table(pd.concat([data, new_rows.astype(data.dtypes.to_dict())], ignore_index=True), prepared_data_file)
+    return new_rows
+
+
+@instrumented
+def update_ml_model(new_data, prepared_data_file, model_file, output_roc_curve, output_learning_curve,
+                    output_matrice_conf, target_column='catastrophe', n_rounds=20, drift_tolerance=0.02,
+                    n_trials=100, n_jobs=None, class_names=None, search='optuna'):
+    """
+    Incrementally update a trained model with new days of data.
+
+    The new rows are appended to the prepared dataset. The current model is first scored on them: if its
+    accuracy dropped by more than `drift_tolerance` compared to the accuracy recorded at the last full training,
+    a full training with a new Optuna search is run on the updated dataset. Otherwise boosting continues from
+    the existing booster on the new rows only, with the previous best hyperparameters, and the previous model's
+    probabilities on the new rows are appended to its holdout file (see `scripts.ensemble_script.fit_ensemble`).
+    The replaced model is archived as a version (see `rollback_model`).
+
+    Parameters:
+        new_data (pd.DataFrame): New rows, cleaned like step 1.
+        prepared_data_file (str): Path to the prepared dataset the model was trained on (updated in place).
+        model_file (str): Path to the trained model.
+        output_roc_curve, output_learning_curve, output_matrice_conf (str): Plot paths, used if a full training
+            is triggered.
+        target_column (str): Name of the target column.
+        n_rounds (int): Number of boosting rounds added on the new rows.
+        drift_tolerance (float): Accuracy drop on the new rows that triggers a new search.
+        n_trials (int): Number of Optuna trials for a new search.
+        n_jobs (int): Number of CPU cores.
+        class_names (dict): Label -> class code mapping, recorded in the metadata.
+        search (str): Search mode of a new full training ('optuna' or 'halving', see `train_ml_model`).
+
+    Returns:
+        str: 'unchanged' (no new rows), 'updated' (boosting continued) or 'retrained' (new search).
+    """
+    print(f"Ajout des nouvelles lignes à {prepared_data_file}...")
+    new_rows = append_new_days(prepared_data_file, new_data)
+    if new_rows.empty:
+        print("Aucun nouveau jour à ajouter, le modèle est inchangé.")
+        return 'unchanged'
+    print(f"{len(new_rows)} nouvelles lignes ajoutées.")
+
+    model = load_model(model_file, use_cache=False)
+    transformer = load_feature_transformer(model_file, model)
+    metadata = load_metadata(model_file)
+
+    # Contrôle de dérive : accuracy du modèle actuel sur des jours qu'il n'a jamais vus
+    result = transformer.transform(new_rows)
+    y_new = new_rows.loc[result.index, target_column].to_numpy()
+    accuracy_new = accuracy_score(y_new, model.predict(result.features))
+    reference = metadata.get('metrics', {}).get('accuracy')
+    print(f"Accuracy sur les nouvelles lignes : {accuracy_new} (référence : {reference})")
+
+    if reference is None or reference - accuracy_new > drift_tolerance:
+        print("Dérive détectée : nouvel entraînement complet avec une nouvelle recherche Optuna...")
+        train_ml_model(prepared_data_file, output_roc_curve, output_learning_curve, output_matrice_conf,
+                       target_column=target_column, output_model_file=model_file, n_trials=n_trials, n_jobs=n_jobs,
+                       resume=False, feature_columns=transformer.feature_columns, class_names=class_names,
+                       search=search)
+        return 'retrained'
+
+    print(f"Poursuite du boosting sur les nouvelles lignes ({n_rounds} itérations)...")
+    params, _ = _booster_params({**metadata.get('params', {}), 'random_state': 42}, len(model.classes_), n_jobs)
+    dnew = xgb.DMatrix(result.features, label=y_new, feature_names=transformer.feature_columns)
+    booster = xgb.train(params, dnew, num_boost_round=n_rounds, xgb_model=model.get_booster())
+
+    updated_model = xgb.XGBClassifier()
+    updated_model.load_model(bytearray(booster.save_raw('ubj')))
+
+    dates = pd.to_datetime(new_rows[transformer.date_column]) if transformer.date_column in new_rows else None
+    metadata['updates'] = metadata.get('updates', []) + [{
+        'rows': len(new_rows),
+        'dates': [dates.min().strftime('%Y-%m-%d'), dates.max().strftime('%Y-%m-%d')] if dates is not None else None,
+        'accuracy_before_update': accuracy_new,
+        'n_rounds': n_rounds,
+    }]
+    metadata['training_data'] = {'file': prepared_data_file, 'sha256': file_sha256(prepared_data_file),
+                                 'rows': metadata.get('training_data', {}).get('rows', 0) + len(new_rows)}
+    for key in ('model_file', 'xgboost_version', 'created_at'):
+        metadata.pop(key, None)
+
+    # Les probabilités du modèle précédent sur les nouvelles lignes, qu'il n'a jamais vues, complètent ses
+    # prédictions de validation pour réapprendre la combinaison des modèles
+    holdout_file = holdout_file_for(model_file)
+    holdout = None
+    if os.path.exists(holdout_file):
+        holdout = read_table(holdout_file)
+        scored = new_rows.loc[result.index, [column for column in holdout.columns if column in new_rows.columns]]
+        for code, column in zip(model.classes_, model.predict_proba(result.features).T):
+            scored[f'proba_{code}'] = column
+        holdout = pd.concat([holdout, scored[holdout.columns].astype(holdout.dtypes.to_dict())], ignore_index=True)
+
+    archive_model(model_file)
+    save_model(updated_model, model_file, metadata=metadata)
+    if holdout is not None:
+        write_table(holdout, holdout_file)
+    print(f"Modèle mis à jour sauvegardé sous : {model_file}")
+    return 'updated'
+
+
+def _train_job(kwargs):
+    """
+    Exécute `train_ml_model` dans un processus séparé ; les figures sont renvoyées pour être rendues par
+    le processus principal.
+    """
+    figures = train_ml_model(**kwargs, render=False)
+    return kwargs.get('output_model_file'), figures
+
+
+@instrumented
+def train_ml_models(jobs, n_jobs=None, html_file=None):
+    """
+    Entraîne plusieurs modèles en même temps (ex : modèle de base et modèle IoT), chacun dans son processus,
+    en répartissant les cœurs disponibles entre les entraînements. Les figures d'un modèle sont rendues en
+    arrière-plan dès qu'il est sauvegardé, pendant que les autres s'entraînent encore.
+
+    Parameters:
+        jobs (list): Liste de dictionnaires d'arguments pour `train_ml_model`.
+        n_jobs (int): Nombre total de cœurs à utiliser (tous par défaut).
+        html_file (str): Regrouper les figures de tous les modèles dans ce rapport HTML au lieu de PNG séparés.
+
+    Returns:
+        list: Chemins des modèles sauvegardés.
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    cores_per_job = max(1, n_jobs // len(jobs))
+    jobs = [{**job, 'n_jobs': cores_per_job} for job in jobs]
+
+    renderer = ReportRenderer(html_file=html_file)
+    with ProcessPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = [executor.submit(_train_job, job) for job in jobs]
+        for future in as_completed(futures):
+            renderer.submit_all(future.result()[1])
+    renderer.close()
+    return [future.result()[0] for future in futures]
@@ -1,12 +1,28 @@
-from operator import index
+import os
+from io import StringIO
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import csv
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
+from scripts.storage_script import read_table, write_table, iter_table, numeric_columns
+from scripts.correlation_script import CorrelationEngine
+from scripts.instrumentation_script import instrumented
 
 
+def clean_line(line):
+    """
+    Nettoie une ligne brute du CSV : supprime les guillemets et remplace les virgules des listes par des points-virgules.
+
+    Parameters:
+        line (str): Ligne brute du fichier CSV.
+
+    Returns:
+        str: Ligne nettoyée.
+    """
+    if '[' in line and ']' in line:
+        line = line.replace(', ', '; ')
+    return line.replace('"', '').replace("'", '')
+
+
+@instrumented
 def debug_ligne(input_file, output_file):
     """
     Fonction pour nettoyer les lignes d'un fichier CSV :
@@ -18,24 +34,16 @@ def debug_ligne(input_file, output_file):
         output_file (str): Chemin du fichier de sortie.
     """
     print("Lecture du fichier d'entrée...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        raw_data = f.readlines()
-
     print("Traitement des lignes pour supprimer les guillemets et ajuster les séparateurs...")
-    processed_data = []
-    for line in raw_data:
-        if '[' in line and ']' in line:
-            line = line.replace(', ', '; ')
-        line = line.replace('"', '').replace("'", '')
-        processed_data.append(line)
-
     print("Écriture des données nettoyées dans le fichier de sortie...")
-    with open(output_file, 'w', encoding='utf-8', newline='') as f:
-        f.writelines(processed_data)
+    # Les lignes sont traitées au fil de l'eau : la mémoire utilisée ne dépend pas de la taille du fichier
+    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8', newline='') as f_out:
+        f_out.writelines(clean_line(line) for line in f_in)
 
     print(f"Nettoyage terminé. Les données ont été sauvegardées dans : {output_file}")
 
 
+@instrumented
 def column_mapping(input_file, output_file, mapping, column_name):
     """
     Applique un mapping à une colonne spécifique d'un fichier CSV.
@@ -47,15 +55,16 @@ def column_mapping(input_file, output_file, mapping, column_name):
         column_name (str): Nom de la colonne à mapper.
     """
     print(f"Lecture des données depuis {input_file}...")
-    input_data = pd.read_csv(input_file)
+    input_data = read_table(input_file)
 
     print(f"Application du mapping sur la colonne '{column_name}'...")
-    input_data[column_name] = input_data[column_name].map(mapping)
+    input_data = CleaningPipeline(input_data).map_column(mapping, column_name).data
 
     print(f"Sauvegarde des données avec mapping dans {output_file}...")
-    input_data.to_csv(output_file, index=False)
+    write_table(input_data, output_file)
 
 
+@instrumented
 def drop_column(input_file, output_file, important_features):
     """
     Réduit un fichier CSV en conservant uniquement des colonnes spécifiques.
@@ -66,14 +75,15 @@ def drop_column(input_file, output_file, important_features):
         important_features (list): Liste des colonnes à conserver.
     """
     print(f"Lecture des données depuis {input_file}...")
-    input_data = pd.read_csv(input_file)
+    input_data = read_table(input_file)
 
     print("Filtrage des colonnes importantes...")
-    reduced_data = input_data[important_features]
+    reduced_data = CleaningPipeline(input_data).keep_columns(important_features).data
 
     print(f"Sauvegarde des données réduites dans {output_file}...")
-    reduced_data.to_csv(output_file, index=False)
+    write_table(reduced_data, output_file)
 
+@instrumented
 def normalize_humidity(input_file, output_file):
     """
     Normalise la colonne 'humidite' en divisant les valeurs par 100 pour les ramener à une échelle de 0 à 1.
@@ -83,19 +93,20 @@ def normalize_humidity(input_file, output_file):
         output_file (str): Chemin du fichier de sortie.
     """
     print(f"Chargement des données depuis {input_file}...")
-    data = pd.read_csv(input_file)
+    data = read_table(input_file)
 
     if 'humidite' in data.columns:
         print("Normalisation de la colonne 'humidite' (division par 100)...")
-        data['humidite'] = data['humidite'] / 100
+        data = CleaningPipeline(data).normalize_humidity().data
     else:
         print("La colonne 'humidite' est introuvable dans les données.")
         return
 
     print(f"Sauvegarde des données normalisées dans {output_file}...")
-    data.to_csv(output_file, index=False)
+    write_table(data, output_file)
     print("Normalisation terminée avec succès.")
 
+@instrumented
 def normalize_data(input_file, output_file, Class='catastrophe'):
     """
     Normalise les données numériques d'un fichier CSV (exclut les colonnes non numériques).
@@ -106,7 +117,7 @@ def normalize_data(input_file, output_file, Class='catastrophe'):
         Class (str): Nom de la colonne cible à exclure de la normalisation.
     """
     print(f"Chargement des données depuis {input_file}...")
-    data = pd.read_csv(input_file)
+    data = read_table(input_file)
 
     print(f"Identification des colonnes numériques à normaliser (excluant '{Class}' et 'date')...")
     # Séparer les colonnes numériques à normaliser
@@ -115,40 +126,49 @@ def normalize_data(input_file, output_file, Class='catastrophe'):
 
     # Appliquer la normalisation uniquement sur les colonnes numériques
     print("Application de la normalisation sur les colonnes numériques...")
+    from sklearn.preprocessing import StandardScaler  # Import local : scikit-learn n'est utile qu'ici
+
     scaler = StandardScaler()
     scaled_features = pd.DataFrame(scaler.fit_transform(features), columns=features.columns)
 
     print("Réintégration de la colonne cible et sauvegarde des données normalisées...")
     scaled_data = pd.concat([scaled_features, target, data['date']], axis=1)  # Réintégrer 'date' et 'Class'
-    scaled_data.to_csv(output_file, index=False)
+    write_table(scaled_data, output_file)
 
     print(f"Données normalisées sauvegardées dans {output_file}.")
 
-def compute_statistics(input_file, output_file):
+@instrumented
+def compute_statistics(input_file, output_file, chunksize=None):
     """
     Calcule les statistiques descriptives essentielles d'un fichier CSV en excluant les colonnes non numériques.
 
     Parameters:
         input_file (str): Chemin du fichier d'entrée.
         output_file (str): Chemin du fichier de sortie.
+        chunksize (int): Si renseigné, lit le fichier par blocs de `chunksize` lignes et cumule les
+            statistiques avec un `StatisticsAccumulator` (mémoire bornée, quantiles approchés au-delà
+            de la capacité de l'accumulateur).
     """
-    print(f"Chargement des données depuis {input_file}...")
-    data = pd.read_csv(input_file)
-
-    print("Exclusion des colonnes non numériques...")
-    numeric_data = data.select_dtypes(include=[np.number])  # Sélectionner uniquement les colonnes numériques
+    if chunksize:
+        print(f"Lecture de {input_file} par blocs de {chunksize} lignes...")
+        accumulator = StatisticsAccumulator()
+        for chunk in iter_table(input_file, chunksize, columns=numeric_columns(input_file)):
+            accumulator.update(chunk)
+        stats = accumulator.result()
+    else:
+        print(f"Chargement des colonnes numériques de {input_file}...")
+        data = read_table(input_file, columns=numeric_columns(input_file))
 
-    print("Calcul des statistiques descriptives pour les colonnes numériques...")
-    stats = numeric_data.describe().T
-    stats['median'] = numeric_data.median()
-    stats['IQR'] = stats['75%'] - stats['25%']
+        print("Calcul des statistiques descriptives pour les colonnes numériques...")
+        stats = CleaningPipeline(data).statistics()
 
     print(f"Sauvegarde des statistiques dans {output_file}...")
-    stats.to_csv(output_file)
+    write_table(stats, output_file, index=True)
 
     print("Statistiques descriptives calculées et sauvegardées avec succès.")
 
-def correlation_matrix(input_file, output_file, Class='catastrophe', threshold=0.05):
+@instrumented
+def correlation_matrix(input_file, output_file, Class='catastrophe', threshold=0.05, selection_file=None):
     """
     Calcule la matrice de corrélation et identifie les colonnes pertinentes.
 
@@ -157,42 +177,23 @@ def correlation_matrix(input_file, output_file, Class='catastrophe', threshold=0
         output_file (str): Chemin du fichier de sortie.
         Class (str): Colonne cible pour la corrélation.
         threshold (float): Seuil pour sélectionner les colonnes importantes.
+        selection_file (str): Chemin où sauvegarder les colonnes sélectionnées (JSON, optionnel).
     """
     print(f"Chargement des données depuis {input_file}...")
-    data = pd.read_csv(input_file)
-
-    # Sauvegarder la colonne 'date' pour la réintégrer plus tard
-    if 'date' in data.columns:
-        date_column = data[['date']]
-    else:
-        date_column = None
+    data = read_table(input_file)
 
-    # Filtrer uniquement les colonnes numériques
-    data_numeric = data.select_dtypes(include=[np.number])
-
-    # Vérification des colonnes utilisées
-    print(f"Colonnes numériques utilisées pour la corrélation : {data_numeric.columns}")
-
-    print(f"Calcul de la matrice de corrélation avec '{Class}'...")
-    correlation_matrix = data_numeric.corr()
-    correlations_with_class = correlation_matrix[Class].sort_values(ascending=False)
-
-    print("Sélection des colonnes ayant une corrélation significative...")
-    important_features = correlations_with_class[abs(correlations_with_class) > threshold].index.tolist()
-
-    # Conserver uniquement les colonnes importantes
-    reduced_data = data[important_features]
-
-    # Réintégrer la colonne 'date' si elle existe
-    if date_column is not None:
-        reduced_data = pd.concat([date_column, reduced_data], axis=1)
+    pipeline = CleaningPipeline(data).reduce_by_correlation(Class, threshold)
+    reduced_data = pipeline.data
+    if selection_file is not None:
+        pipeline.selection.save(selection_file)
 
     print(f"Sauvegarde des données réduites dans {output_file}...")
-    reduced_data.to_csv(output_file, index=False)
+    write_table(reduced_data, output_file)
 
     print(f"Colonnes importantes identifiées (avec 'date') : {reduced_data.columns.tolist()}")
 
 
+@instrumented
 def isolate_random_row(data_file, output_data_file, isolated_row_file, target_column='Class'):
     """
     Isoler une ligne aléatoire pour prédiction et sauvegarder le reste.
@@ -204,7 +205,7 @@ def isolate_random_row(data_file, output_data_file, isolated_row_file, target_co
         target_column (str): Nom de la colonne cible.
     """
     print(f"Chargement des données depuis {data_file}...")
-    data = pd.read_csv(data_file)
+    data = read_table(data_file)
 
     if data.empty:
         raise ValueError("Le dataset est vide. Veuillez vérifier le fichier source.")
@@ -218,8 +219,403 @@ def isolate_random_row(data_file, output_data_file, isolated_row_file, target_co
     print(f"Ligne isolée : \n{isolated_row}")
 
     print("Sauvegarde des résultats...")
-    isolated_row.to_csv(isolated_row_file, index=False)
-    data.to_csv(output_data_file, index=False)
+    write_table(isolated_row, isolated_row_file)
+    write_table(data, output_data_file)
 
     print(f"Dataset sans la ligne isolée sauvegardé sous : {output_data_file}")
     print(f"Ligne isolée sauvegardée sous : {isolated_row_file}")
+
+
+class CleaningPipeline:
+    """
+    Pipeline de nettoyage en mémoire : enchaîne les transformations de l'étape 1 sur un seul DataFrame
+    et n'écrit les fichiers qu'à la fin, au lieu de relire et réécrire le CSV à chaque transformation.
+
+    Chaque méthode de transformation renvoie le pipeline lui-même pour pouvoir les chaîner :
+
+        pipeline = CleaningPipeline.from_raw_csv('data/catastrophes_naturelles.csv')
+        pipeline.map_column(mapping_cata, 'catastrophe').map_column(mapping_zone, 'quartier').normalize_humidity()
+        pipeline_iot = pipeline.branch().keep_columns(important_features)
+        pipeline.reduce_by_correlation().save('data/clean.csv', statistics_file='data/statistics.csv')
+
+    Parameters:
+        data (pd.DataFrame): Données à transformer.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.selection = None
+        self._correlations = None
+
+    @classmethod
+    @instrumented
+    def from_raw_csv(cls, input_file):
+        """
+        Charge le CSV brut en appliquant le nettoyage de `debug_ligne` en mémoire (sans fichier intermédiaire).
+
+        Parameters:
+            input_file (str): Chemin du fichier brut.
+
+        Returns:
+            CleaningPipeline: Pipeline initialisé avec les données nettoyées.
+        """
+        print(f"Lecture et nettoyage des lignes de {input_file}...")
+        with open(input_file, 'r', encoding='utf-8') as f:
+            cleaned_text = ''.join(clean_line(line) for line in f)
+        return cls(pd.read_csv(StringIO(cleaned_text)))
+
+    @classmethod
+    @instrumented
+    def from_csv(cls, input_file):
+        """
+        Charge un CSV déjà nettoyé.
+
+        Parameters:
+            input_file (str): Chemin du fichier d'entrée.
+
+        Returns:
+            CleaningPipeline: Pipeline initialisé avec les données du fichier.
+        """
+        print(f"Chargement des données depuis {input_file}...")
+        return cls(read_table(input_file))
+
+    def branch(self):
+        """
+        Crée un pipeline indépendant à partir de l'état courant (ex : dataset IoT dérivé du dataset complet).
+
+        Returns:
+            CleaningPipeline: Nouveau pipeline travaillant sur une copie des données.
+        """
+        return CleaningPipeline(self.data.copy())
+
+    def map_column(self, mapping, column_name):
+        """
+        Applique un mapping à une colonne (équivalent de `column_mapping`).
+
+        Parameters:
+            mapping (dict): Dictionnaire de correspondance pour la colonne.
+            column_name (str): Nom de la colonne à mapper.
+        """
+        self.data[column_name] = self.data[column_name].map(mapping)
+        self._correlations = None
+        return self
+
+    def normalize_humidity(self):
+        """
+        Divise la colonne 'humidite' par 100 si elle existe (équivalent de `normalize_humidity`).
+        """
+        if 'humidite' in self.data.columns:
+            self.data['humidite'] = self.data['humidite'] / 100
+            self._correlations = None
+        else:
+            print("La colonne 'humidite' est introuvable dans les données.")
+        return self
+
+    def keep_columns(self, important_features):
+        """
+        Conserve uniquement les colonnes indiquées (équivalent de `drop_column`).
+
+        Parameters:
+            important_features (list): Liste des colonnes à conserver.
+        """
+        self.data = self.data[important_features]
+        if self._correlations is not None:
+            self._correlations = self._correlations.subset(important_features)
+        return self
+
+    def correlations(self, Class='catastrophe', scores=False):
+        """
+        Matrice de corrélation des colonnes numériques, calculée une seule fois (float32, par blocs) et partagée
+        entre la sélection des colonnes et les heatmaps. Elle est recalculée seulement si les données changent.
+
+        Parameters:
+            Class (str): Colonne cible.
+            scores (bool): Calculer aussi les scores de Spearman et d'information mutuelle avec la cible.
+
+        Returns:
+            CorrelationEngine: Moteur de corrélation (matrice dans `.matrix`).
+        """
+        if self._correlations is None or self._correlations.target != Class:
+            data_numeric = self.data.select_dtypes(include=[np.number])
+            print(f"Calcul de la matrice de corrélation ({len(data_numeric.columns)} colonnes numériques)...")
+            self._correlations = CorrelationEngine(Class).fit(data_numeric)
+        if scores and not self._correlations.extra_scores:
+            self._correlations.add_scores(self.data)
+        return self._correlations
+
+    def reduce_by_correlation(self, Class='catastrophe', threshold=0.05, score='pearson'):
+        """
+        Conserve les colonnes dont la corrélation avec la cible dépasse le seuil, plus la colonne 'date'
+        (équivalent de `correlation_matrix`). La sélection est gardée dans `self.selection`.
+
+        Parameters:
+            Class (str): Colonne cible pour la corrélation.
+            threshold (float): Seuil pour sélectionner les colonnes importantes.
+            score (str): Score utilisé pour la sélection ('pearson', 'spearman' ou 'mutual_info').
+        """
+        correlations = self.correlations(Class, scores=score != 'pearson')
+        print(f"Colonnes numériques utilisées pour la corrélation : {correlations.columns}")
+
+        print("Sélection des colonnes ayant une corrélation significative...")
+        keep = ('date',) if 'date' in self.data.columns else ()
+        self.selection = correlations.select(threshold, score=score, keep=keep)
+
+        self.data = self.selection.apply(self.data)
+        self._correlations = correlations.subset(self.data.columns)
+        return self
+
+    def statistics(self):
+        """
+        Calcule les statistiques descriptives des colonnes numériques (équivalent de `compute_statistics`).
+
+        Returns:
+            pd.DataFrame: Statistiques par colonne (describe, médiane et IQR).
+        """
+        numeric_data = self.data.select_dtypes(include=[np.number])
+        stats = numeric_data.describe().T
+        stats['median'] = numeric_data.median()
+        stats['IQR'] = stats['75%'] - stats['25%']
+        return stats
+
+    @instrumented
+    def save(self, output_file, statistics_file=None, selection_file=None):
+        """
+        Matérialise les données (et éventuellement leurs statistiques) sur disque.
+
+        Parameters:
+            output_file (str): Chemin du fichier de sortie.
+            statistics_file (str): Chemin du fichier de statistiques (optionnel).
+            selection_file (str): Chemin où sauvegarder les colonnes retenues par `reduce_by_correlation`
+                (JSON, optionnel).
+        """
+        print(f"Sauvegarde des données dans {output_file}...")
+        write_table(self.data, output_file)
+        if statistics_file is not None:
+            print(f"Sauvegarde des statistiques dans {statistics_file}...")
+            write_table(self.statistics(), statistics_file, index=True)
+        if selection_file is not None and self.selection is not None:
+            print(f"Sauvegarde des colonnes sélectionnées dans {selection_file}...")
+            self.selection.save(selection_file)
+        return self
+
+
+class _CleanedLineReader:
+    """
+    Objet fichier en lecture seule qui applique `clean_line` à la volée, pour que `pd.read_csv`
+    puisse lire le CSV brut par blocs sans fichier intermédiaire.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._buffer = ''
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._buffer + ''.join(clean_line(line) for line in self._f)
+            self._buffer = ''
+            return data
+        while len(self._buffer) < size:
+            line = self._f.readline()
+            if not line:
+                break
+            self._buffer += clean_line(line)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def __iter__(self):
+        return (clean_line(line) for line in self._f)
+
+
+def iter_raw_chunks(input_file, chunksize=100_000, dtype=None):
+    """
+    Lit le CSV brut par blocs en appliquant `clean_line` à la volée (guillemets et séparateurs des listes),
+    sans autre transformation.
+
+    Parameters:
+        input_file (str): Chemin du fichier brut.
+        chunksize (int): Nombre de lignes par bloc.
+        dtype: Types des colonnes passés à `pd.read_csv` (ex : str pour garder les valeurs telles quelles).
+
+    Yields:
+        pd.DataFrame: Bloc de lignes brutes.
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        yield from pd.read_csv(_CleanedLineReader(f), chunksize=chunksize, dtype=dtype)
+
+
+def iter_clean_chunks(input_file, mapping_cata, mapping_zone, chunksize=100_000):
+    """
+    Lit le CSV brut par blocs et applique à chaque bloc le nettoyage de l'étape 1 : suppression des guillemets,
+    séparateurs des listes, mappings 'catastrophe' / 'quartier' et normalisation de l'humidité.
+
+    Parameters:
+        input_file (str): Chemin du fichier brut.
+        mapping_cata (dict): Mapping de la colonne 'catastrophe'.
+        mapping_zone (dict): Mapping de la colonne 'quartier'.
+        chunksize (int): Nombre de lignes par bloc.
+
+    Yields:
+        pd.DataFrame: Bloc de données nettoyé.
+    """
+    for chunk in iter_raw_chunks(input_file, chunksize):
+        pipeline = CleaningPipeline(chunk)
+        pipeline.map_column(mapping_cata, 'catastrophe').map_column(mapping_zone, 'quartier').normalize_humidity()
+        yield pipeline.data
+
+
+@instrumented
+def stream_clean(input_file, output_file, mapping_cata, mapping_zone, chunksize=100_000, statistics_file=None,
+                 important_features=None, output_file_iot=None, statistics_file_iot=None):
+    """
+    Version en flux de l'étape 1 pour les fichiers plus gros que la mémoire : chaque bloc est nettoyé puis
+    ajouté aux fichiers de sortie, et les statistiques sont cumulées bloc par bloc.
+
+    La réduction par corrélation n'est pas appliquée ici car elle nécessite l'ensemble des données.
+    Les fichiers de données sont écrits en CSV (ajout bloc par bloc) et doivent avoir l'extension .csv ; les
+    statistiques suivent le format de leur extension (voir `scripts.storage_script`).
+
+    Parameters:
+        input_file (str): Chemin du fichier brut.
+        output_file (str): Chemin du fichier nettoyé.
+        mapping_cata (dict): Mapping de la colonne 'catastrophe'.
+        mapping_zone (dict): Mapping de la colonne 'quartier'.
+        chunksize (int): Nombre de lignes par bloc.
+        statistics_file (str): Chemin du fichier de statistiques (optionnel).
+        important_features (list): Colonnes du dataset IoT (optionnel).
+        output_file_iot (str): Chemin du dataset IoT (requis si `important_features` est renseigné).
+        statistics_file_iot (str): Chemin des statistiques du dataset IoT (optionnel).
+    """
+    for path in (output_file, output_file_iot):
+        if path is not None and os.path.splitext(path)[1].lower() != '.csv':
+            raise ValueError(f"Le nettoyage en flux écrit ses données en CSV : extension .csv attendue pour {path}.")
+
+    print(f"Nettoyage de {input_file} par blocs de {chunksize} lignes...")
+    accumulator = StatisticsAccumulator()
+    accumulator_iot = StatisticsAccumulator()
+    n_rows = 0
+
+    for i, chunk in enumerate(iter_clean_chunks(input_file, mapping_cata, mapping_zone, chunksize)):
+        mode, header = ('w', True) if i == 0 else ('a', False)
+        chunk.to_csv(output_file, index=False, mode=mode, header=header)
+        accumulator.update(chunk)
+        if important_features is not None:
+            chunk_iot = chunk[important_features]
+            chunk_iot.to_csv(output_file_iot, index=False, mode=mode, header=header)
+            accumulator_iot.update(chunk_iot)
+        n_rows += len(chunk)
+
+    print(f"{n_rows} lignes nettoyées et sauvegardées dans {output_file}.")
+    if statistics_file is not None:
+        write_table(accumulator.result(), statistics_file, index=True)
+    if statistics_file_iot is not None:
+        write_table(accumulator_iot.result(), statistics_file_iot, index=True)
+
+
+class StatisticsAccumulator:
+    """
+    Accumulateur fusionnable des statistiques de `compute_statistics` (count, mean, std, min, quartiles, max,
+    médiane, IQR), alimenté bloc par bloc.
+
+    Moyenne et écart-type sont exacts (formules de fusion de Chan et al.). Les quantiles sont calculés sur un
+    échantillon uniforme de taille `capacity` par colonne : ils sont exacts tant que le nombre de valeurs ne
+    dépasse pas cette capacité, approchés au-delà.
+
+    Parameters:
+        capacity (int): Taille maximale de l'échantillon conservé par colonne.
+        random_state (int): Graine du tirage de l'échantillon.
+    """
+
+    def __init__(self, capacity=100_000, random_state=42):
+        self.capacity = capacity
+        self._rng = np.random.default_rng(random_state)
+        self._columns = {}
+
+    def update(self, data):
+        """
+        Ajoute les colonnes numériques d'un bloc de données.
+
+        Parameters:
+            data (pd.DataFrame): Bloc de données.
+        """
+        for column in data.select_dtypes(include=[np.number]).columns:
+            values = data[column].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            state = {
+                'count': len(values),
+                'mean': values.mean() if len(values) else 0.0,
+                'm2': ((values - values.mean()) ** 2).sum() if len(values) else 0.0,
+                'min': values.min() if len(values) else np.nan,
+                'max': values.max() if len(values) else np.nan,
+                'sample': values[:self.capacity] if len(values) <= self.capacity
+                else self._rng.choice(values, self.capacity, replace=False),
+            }
+            self._columns[column] = self._merge_state(self._columns.get(column), state)
+        return self
+
+    def merge(self, other):
+        """
+        Fusionne un autre accumulateur (par exemple calculé sur un autre fichier ou un autre processus).
+
+        Parameters:
+            other (StatisticsAccumulator): Accumulateur à fusionner.
+        """
+        for column, state in other._columns.items():
+            self._columns[column] = self._merge_state(self._columns.get(column), state)
+        return self
+
+    def _merge_state(self, a, b):
+        if a is None or a['count'] == 0:
+            return b
+        if b['count'] == 0:
+            return a
+
+        count = a['count'] + b['count']
+        delta = b['mean'] - a['mean']
+        mean = a['mean'] + delta * b['count'] / count
+        m2 = a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / count
+
+        if len(a['sample']) + len(b['sample']) <= self.capacity:
+            sample = np.concatenate([a['sample'], b['sample']])
+        else:
+            # Chaque échantillon représente son nombre de valeurs : on tire proportionnellement à ces effectifs
+            n_a = self._rng.binomial(self.capacity, a['count'] / count)
+            n_a = int(np.clip(n_a, self.capacity - len(b['sample']), len(a['sample'])))
+            sample = np.concatenate([
+                self._rng.choice(a['sample'], n_a, replace=False),
+                self._rng.choice(b['sample'], self.capacity - n_a, replace=False),
+            ])
+
+        return {
+            'count': count,
+            'mean': mean,
+            'm2': m2,
+            'min': min(a['min'], b['min']),
+            'max': max(a['max'], b['max']),
+            'sample': sample,
+        }
+
+    def result(self):
+        """
+        Renvoie les statistiques au même format que `compute_statistics`.
+
+        Returns:
+            pd.DataFrame: Statistiques par colonne.
+        """
+        rows = {}
+        for column, state in self._columns.items():
+            count = state['count']
+            q25, q50, q75 = np.quantile(state['sample'], [0.25, 0.5, 0.75]) if count else (np.nan,) * 3
+            rows[column] = {
+                'count': float(count),
+                'mean': state['mean'] if count else np.nan,
+                'std': np.sqrt(state['m2'] / (count - 1)) if count > 1 else np.nan,
+                'min': state['min'],
+                '25%': q25,
+                '50%': q50,
+                '75%': q75,
+                'max': state['max'],
+                'median': q50,
+            }
+        stats = pd.DataFrame.from_dict(rows, orient='index')
+        stats['IQR'] = stats['75%'] - stats['25%']
+        return stats
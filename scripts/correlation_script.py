@@ -0,0 +1,215 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from scripts.instrumentation_script import instrumented
+
+
+class CorrelationEngine:
+    """
+    Matrice de corrélation calculée une seule fois et partagée par la sélection des colonnes et les heatmaps.
+
+    La corrélation de Pearson est calculée par blocs de lignes (produits matriciels en float64, valeurs
+    décalées par la moyenne du premier bloc) : le résultat est celui de `DataFrame.corr()` (observations
+    complètes par paire de colonnes) aux arrondis float64 près, y compris sur un fichier lu par morceaux qui ne
+    tient pas en mémoire. Les scores de Spearman
+    et d'information mutuelle avec la cible sont optionnels.
+
+    Parameters:
+        target (str): Colonne cible.
+        chunksize (int): Nombre de lignes par bloc de calcul.
+    """
+
+    def __init__(self, target='catastrophe', chunksize=100_000):
+        self.target = target
+        self.chunksize = chunksize
+        self.columns = None
+        self._shift = None
+        self._cross = None      # somme des x_i * x_j sur les lignes où x_i et x_j sont présents
+        self._sums = None       # somme des x_i sur les lignes où x_j est présent
+        self._squares = None    # somme des x_i² sur les lignes où x_j est présent
+        self._counts = None     # nombre de lignes où x_i et x_j sont présents
+        self._matrix = None
+        self.extra_scores = {}
+
+    def update(self, data):
+        """
+        Ajoute un bloc de lignes (seules les colonnes numériques sont utilisées).
+        """
+        numeric = data.select_dtypes(include=[np.number])
+        if self.columns is None:
+            self.columns = list(numeric.columns)
+        values = numeric[self.columns].to_numpy(dtype=np.float64)
+        for start in range(0, len(values), self.chunksize):
+            self._update_block(values[start:start + self.chunksize])
+        self._matrix = None
+        return self
+
+    def _update_block(self, values):
+        present = ~np.isnan(values)
+        if self._shift is None:
+            # Décalage par la moyenne du premier bloc : évite la perte de précision des sommes de grandes valeurs
+            with np.errstate(invalid='ignore'):
+                self._shift = np.nan_to_num(np.nanmean(values, axis=0))
+            n = values.shape[1]
+            self._cross, self._sums, self._squares, self._counts = (np.zeros((n, n)) for _ in range(4))
+
+        shifted = np.where(present, values - self._shift, 0.0)
+        mask = present.astype(np.float64)
+        self._cross += shifted.T @ shifted
+        self._sums += shifted.T @ mask
+        self._squares += (shifted * shifted).T @ mask
+        self._counts += mask.T @ mask
+
+    @instrumented
+    def fit(self, data):
+        """
+        Calcule la matrice sur un DataFrame en mémoire.
+        """
+        return self.update(data)
+
+    @instrumented
+    def fit_file(self, input_file, chunksize=None):
+        """
+        Calcule la matrice en lisant un fichier par morceaux (CSV, Parquet ou Arrow).
+        """
+        from scripts.storage_script import iter_table, numeric_columns
+
+        for chunk in iter_table(input_file, chunksize or self.chunksize, columns=numeric_columns(input_file)):
+            self.update(chunk)
+        return self
+
+    @property
+    def matrix(self):
+        """
+        Matrice de corrélation de Pearson (pd.DataFrame).
+        """
+        if self._matrix is None:
+            counts = self._counts
+            with np.errstate(invalid='ignore', divide='ignore'):
+                covariance = self._cross - self._sums * self._sums.T / counts
+                variance = self._squares - self._sums ** 2 / counts
+                matrix = covariance / np.sqrt(variance * variance.T)
+            matrix[counts < 2] = np.nan
+            self._matrix = pd.DataFrame(np.clip(matrix, -1, 1), index=self.columns, columns=self.columns)
+        return self._matrix
+
+    def subset(self, columns):
+        """
+        Restreint le moteur à certaines colonnes sans recalcul (les corrélations par paire ne changent pas).
+        """
+        columns = [column for column in self.columns if column in set(columns)]
+        positions = [self.columns.index(column) for column in columns]
+        engine = CorrelationEngine(self.target, self.chunksize)
+        engine.columns = columns
+        engine._shift = self._shift[positions]
+        grid = np.ix_(positions, positions)
+        engine._cross, engine._sums, engine._squares, engine._counts = (
+            self._cross[grid], self._sums[grid], self._squares[grid], self._counts[grid])
+        engine.extra_scores = {name: scores[scores.index.isin(columns)] for name, scores in self.extra_scores.items()}
+        return engine
+
+    @instrumented
+    def add_scores(self, data, spearman=True, mutual_info=True, sample_size=100_000, random_state=42):
+        """
+        Ajoute des scores de dépendance avec la cible, calculés en mémoire (sur un échantillon si les données
+        dépassent `sample_size` lignes) : corrélation de Spearman (relations monotones) et information mutuelle
+        (relations quelconques).
+        """
+        numeric = data[self.columns]
+        if len(numeric) > sample_size:
+            numeric = numeric.sample(n=sample_size, random_state=random_state)
+        if spearman:
+            ranks = CorrelationEngine(self.target, self.chunksize).fit(numeric.rank())
+            self.extra_scores['spearman'] = ranks.matrix[self.target]
+        if mutual_info:
+            from sklearn.feature_selection import mutual_info_classif
+
+            complete = numeric[numeric[self.target].notna()]
+            features = complete.fillna(complete.median())
+            scores = mutual_info_classif(features.to_numpy(dtype=np.float32), complete[self.target].astype(int),
+                                         random_state=random_state)
+            self.extra_scores['mutual_info'] = pd.Series(scores, index=self.columns)
+        return self
+
+    def target_scores(self):
+        """
+        Scores de chaque colonne avec la cible : Pearson, et Spearman / information mutuelle si calculés.
+        """
+        return pd.DataFrame({'pearson': self.matrix[self.target], **self.extra_scores})
+
+    def select(self, threshold=0.05, score='pearson', keep=('date',)):
+        """
+        Sélectionne les colonnes dont le score avec la cible dépasse le seuil (en valeur absolue).
+
+        Parameters:
+            threshold (float): Seuil de sélection.
+            score (str): Score utilisé ('pearson', 'spearman' ou 'mutual_info').
+            keep (tuple): Colonnes toujours conservées (placées en tête), même si elles ne sont pas numériques.
+
+        Returns:
+            FeatureSelection: Colonnes sélectionnées, triées par score décroissant.
+        """
+        scores = self.target_scores()[score].sort_values(ascending=False)
+        selected = scores[scores.abs() > threshold].index.tolist()
+        return FeatureSelection([*keep, *selected], self.target, threshold, score,
+                                {column: float(value) for column, value in scores.items()})
+
+
+class FeatureSelection:
+    """
+    Colonnes retenues par la sélection par corrélation, sauvegardées pour être réappliquées telles quelles
+    (entraînement, nouvelles données, prédiction) sans recalculer la matrice.
+
+    Parameters:
+        columns (list): Colonnes retenues, dans l'ordre.
+        target (str): Colonne cible.
+        threshold (float): Seuil utilisé.
+        score (str): Score utilisé.
+        scores (dict): Score de chaque colonne numérique.
+    """
+
+    def __init__(self, columns, target='catastrophe', threshold=None, score='pearson', scores=None):
+        self.columns = list(columns)
+        self.target = target
+        self.threshold = threshold
+        self.score = score
+        self.scores = dict(scores or {})
+
+    @property
+    def feature_columns(self):
+        """
+        Colonnes retenues hors cible et date.
+        """
+        return [column for column in self.columns if column not in (self.target, 'date')]
+
+    def apply(self, data):
+        """
+        Conserve les colonnes retenues présentes dans `data`.
+        """
+        return data[[column for column in self.columns if column in data.columns]]
+
+    def to_dict(self):
+        return {
+            'columns': self.columns,
+            'target': self.target,
+            'threshold': self.threshold,
+            'score': self.score,
+            'scores': self.scores,
+        }
+
+    def save(self, path):
+        """
+        Sauvegarde la sélection au format JSON.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge une sélection sauvegardée avec `save`.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
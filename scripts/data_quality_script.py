@@ -0,0 +1,293 @@
+"""
+Validation du fichier brut avant les étapes coûteuses (nettoyage, caractéristiques, entraînement) : schéma,
+plages de valeurs, libellés inconnus des mappings et doublons sur la clé (date, quartier).
+
+Le fichier est lu par blocs ; les doublons sont détectés avec un index des empreintes 64 bits des clés déjà vues
+(8 octets par clé distincte, quelle que soit la largeur des lignes). Les lignes valides sont recopiées telles
+quelles dans un CSV lu ensuite par l'étape 1, les lignes rejetées sont écrites dans un fichier de quarantaine
+avec leur numéro de ligne et leurs motifs, et un rapport JSON résume la validation.
+
+    schema = RawDataSchema.from_mappings(mapping_cata, mapping_zone)
+    report = validate_raw_data('data/catastrophes_naturelles.csv', 'data/validated.csv', 'data/quarantine.csv',
+                               'data/validation_report.json', schema)
+"""
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from scripts.cleanig_data_script import iter_raw_chunks
+from scripts.instrumentation_script import instrumented
+
+# Plages physiquement plausibles des mesures brutes (humidité en %, avant normalisation) ; None : pas de borne
+DEFAULT_VALUE_RANGES = {
+    'temperature': (-60.0, 60.0),
+    'humidite': (0.0, 100.0),
+    'force_moyenne_du_vecteur_de_vent': (0.0, None),
+    'force_du_vecteur_de_vent_max': (0.0, None),
+    'pluie_intensite_max': (0.0, None),
+    'sismicite': (0.0, None),
+    'concentration_gaz': (0.0, None),
+    'pluie_totale': (0.0, None),
+}
+
+# Nombre maximal de libellés inconnus distincts détaillés par colonne dans le rapport
+MAX_REPORTED_LABELS = 100
+
+
+def _parse_dates(values):
+    """
+    Dates converties de la même façon quel que soit le découpage en blocs : format ISO 8601, puis analyse valeur par
+    valeur des autres formats (pandas déduirait sinon un format unique du premier élément de chaque bloc).
+    """
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    other = dates.isna() & values.notna()
+    if other.any():
+        dates[other] = pd.to_datetime(values[other], errors='coerce', format='mixed')
+    return dates
+
+
+class RawDataSchema:
+    """
+    Schéma attendu du fichier brut.
+
+    Parameters:
+        value_ranges (dict): {colonne numérique: (minimum, maximum)}, bornes incluses (None : pas de borne).
+        categories (dict): {colonne: libellés acceptés} (ex : clés de `mapping_cata`).
+        key (tuple): Colonnes identifiant une ligne ; une seule ligne est gardée par clé.
+        date_column (str): Colonne de date de la clé.
+        required (tuple): Colonnes dont une valeur manquante rejette la ligne (les mesures manquantes sont
+            acceptées, XGBoost les gère).
+    """
+
+    def __init__(self, value_ranges, categories, key=('date', 'quartier'), date_column='date',
+                 required=('catastrophe',)):
+        self.value_ranges = dict(value_ranges)
+        self.categories = {column: set(labels) for column, labels in categories.items()}
+        self.key = tuple(key)
+        self.date_column = date_column
+        self.required = tuple(required)
+
+    @classmethod
+    def from_mappings(cls, mapping_cata, mapping_zone, value_ranges=None, **kwargs):
+        """
+        Schéma du fichier des catastrophes naturelles : libellés acceptés des mappings de l'étape 1.
+        """
+        return cls(value_ranges or DEFAULT_VALUE_RANGES, {'catastrophe': mapping_cata, 'quartier': mapping_zone},
+                   **kwargs)
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys([*self.key, *self.value_ranges, *self.categories, *self.required]))
+
+    def check_columns(self, columns):
+        """
+        Returns:
+            tuple: (colonnes attendues absentes, colonnes inattendues)
+        """
+        columns = [column for column in columns if not str(column).startswith('Unnamed: ')]
+        return [column for column in self.columns if column not in columns], \
+            [column for column in columns if column not in self.columns]
+
+    def check(self, chunk):
+        """
+        Contrôles ligne par ligne d'un bloc lu en texte (`dtype=str`).
+
+        Returns:
+            tuple: (erreurs, dates) — DataFrame booléen avec une colonne par motif ('invalid_type:<colonne>',
+                'out_of_range:<colonne>', 'unknown_label:<colonne>', 'missing_value:<colonne>',
+                'invalid_key:<colonne>'), et dates de la clé converties.
+        """
+        errors = {}
+        for column, (minimum, maximum) in self.value_ranges.items():
+            values = pd.to_numeric(chunk[column], errors='coerce')
+            errors[f'invalid_type:{column}'] = values.isna() & chunk[column].notna()
+            out_of_range = pd.Series(False, index=chunk.index)
+            if minimum is not None:
+                out_of_range |= values < minimum
+            if maximum is not None:
+                out_of_range |= values > maximum
+            errors[f'out_of_range:{column}'] = out_of_range
+
+        for column, labels in self.categories.items():
+            values = chunk[column].str.strip()
+            errors[f'unknown_label:{column}'] = values.notna() & ~values.isin(labels)
+        for column in self.required:
+            errors[f'missing_value:{column}'] = chunk[column].isna()
+
+        dates = _parse_dates(chunk[self.date_column])
+        for column in self.key:
+            errors[f'invalid_key:{column}'] = dates.isna() if column == self.date_column else chunk[column].isna()
+        return pd.DataFrame(errors, index=chunk.index), dates
+
+    def key_hashes(self, chunk, dates):
+        """
+        Empreinte 64 bits de la clé de chaque ligne (date normalisée, libellés sans espaces superflus).
+        """
+        keys = pd.DataFrame({column: dates.dt.normalize() if column == self.date_column else chunk[column].str.strip()
+                             for column in self.key})
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class KeyIndex:
+    """
+    Ensemble des empreintes de clés déjà vues, stocké en tableaux uint64 triés (8 octets par clé distincte).
+
+    Chaque bloc ajoute un tableau trié ; les tableaux de tailles voisines sont fusionnés, comme un compteur
+    binaire, pour garder un nombre logarithmique de tableaux à interroger.
+    """
+
+    def __init__(self):
+        self._runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def add(self, hashes):
+        """
+        Ajoute les empreintes d'un bloc.
+
+        Returns:
+            np.ndarray: True pour les lignes dont la clé a déjà été vue (dans un bloc précédent ou plus haut dans
+                ce bloc).
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        unique, first = np.unique(hashes, return_index=True)
+        duplicate = np.ones(len(hashes), dtype=bool)
+        duplicate[first] = False
+
+        seen = np.zeros(len(unique), dtype=bool)
+        for run in self._runs:
+            position = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            seen |= run[position] == unique
+        duplicate[first[seen]] = True
+
+        new = unique[~seen]
+        if len(new):
+            self._runs.append(new)
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                last = self._runs.pop()
+                self._runs[-1] = np.union1d(self._runs[-1], last)
+        return duplicate
+
+
+def _reasons(errors):
+    """
+    Motifs de rejet de chaque ligne, séparés par ';'.
+    """
+    reasons = pd.Series('', index=errors.index)
+    for column in errors.columns:
+        reasons = reasons.where(~errors[column], reasons + column + ';')
+    return reasons.str.rstrip(';')
+
+
+def _csv_header(columns):
+    # Colonne d'index sans nom du fichier brut : en-tête vide, comme dans le fichier d'origine
+    return ['' if str(column).startswith('Unnamed: ') else column for column in columns]
+
+
+@instrumented
+def validate_raw_data(input_file, output_file, quarantine_file, report_file, schema, chunksize=100_000,
+                      max_rejected_fraction=0.05):
+    """
+    Valide le fichier brut bloc par bloc : les lignes valides sont écrites dans `output_file` (CSV, valeurs
+    inchangées), les lignes rejetées dans `quarantine_file` avec les colonnes 'source_line' et 'reasons', et le
+    résumé dans `report_file`.
+
+    Une ligne est rejetée si une mesure n'est pas numérique ou sort de sa plage, si un libellé est absent du
+    mapping, si la cible manque, si sa clé est invalide ou si sa clé a déjà été vue (la première ligne valide de
+    chaque clé est gardée).
+
+    Parameters:
+        input_file (str): Chemin du fichier brut.
+        output_file (str): Chemin du CSV des lignes valides.
+        quarantine_file (str): Chemin du CSV des lignes rejetées.
+        report_file (str): Chemin du rapport JSON.
+        schema (RawDataSchema): Schéma attendu.
+        chunksize (int): Nombre de lignes par bloc.
+        max_rejected_fraction (float): Proportion maximale de lignes rejetées ; au-delà, la validation échoue.
+
+    Returns:
+        dict: Rapport de validation.
+
+    Raises:
+        ValueError: Colonnes attendues absentes, ou trop de lignes rejetées (le rapport est écrit avant).
+    """
+    print(f"Validation de {input_file} par blocs de {chunksize} lignes...")
+    start_time = time.perf_counter()
+    index = KeyIndex()
+    reasons, missing_values = Counter(), Counter()
+    unknown_labels = {column: Counter() for column in schema.categories}
+    report = {'input_file': input_file, 'rows': 0, 'valid_rows': 0, 'rejected_rows': 0,
+              'columns': {'missing': [], 'extra': []}}
+    line = 2  # Ligne 1 : en-tête
+
+    for i, chunk in enumerate(iter_raw_chunks(input_file, chunksize, dtype=str)):
+        if i == 0:
+            missing, extra = schema.check_columns(chunk.columns)
+            report['columns'] = {'missing': missing, 'extra': extra}
+            if missing:
+                _write_report(report, report_file)
+                raise ValueError(f"Colonnes absentes de {input_file} : {missing}")
+
+        errors, dates = schema.check(chunk)
+        # Seules les lignes sans autre erreur réservent leur clé
+        candidates = ~errors.any(axis=1).to_numpy()
+        duplicate = np.zeros(len(chunk), dtype=bool)
+        duplicate[candidates] = index.add(schema.key_hashes(chunk[candidates], dates[candidates]))
+        errors['duplicate_key'] = duplicate
+        rejected = errors.any(axis=1).to_numpy()
+
+        reasons.update({column: int(count) for column, count in errors.sum().items() if count})
+        missing_values.update({column: int(count) for column, count in chunk[list(schema.value_ranges)].isna().sum()
+                               .items() if count})
+        for column, counter in unknown_labels.items():
+            labels = chunk.loc[errors[f'unknown_label:{column}'], column].str.strip().value_counts()
+            for label, count in labels.items():
+                if label in counter or len(counter) < MAX_REPORTED_LABELS:
+                    counter[label] += int(count)
+
+        mode, header = ('w', True) if i == 0 else ('a', False)
+        chunk[~rejected].to_csv(output_file, index=False, mode=mode, header=_csv_header(chunk.columns) if header
+                                else False)
+        quarantine = chunk[rejected].assign(source_line=np.arange(line, line + len(chunk))[rejected],
+                                            reasons=_reasons(errors[rejected]))
+        quarantine.to_csv(quarantine_file, index=False, mode=mode,
+                          header=_csv_header(quarantine.columns) if header else False)
+
+        report['rows'] += len(chunk)
+        report['rejected_rows'] += int(rejected.sum())
+        line += len(chunk)
+
+    report['valid_rows'] = report['rows'] - report['rejected_rows']
+    report['rejected_fraction'] = report['rejected_rows'] / report['rows'] if report['rows'] else 0.0
+    report.update({
+        'duplicate_keys': reasons.get('duplicate_key', 0),
+        'distinct_keys': len(index),
+        'reasons': dict(reasons.most_common()),
+        'unknown_labels': {column: dict(counter.most_common()) for column, counter in unknown_labels.items()
+                           if counter},
+        'missing_values': dict(missing_values),
+        'max_rejected_fraction': max_rejected_fraction,
+        'passed': report['rows'] > 0 and report['rejected_fraction'] <= max_rejected_fraction,
+        'duration_seconds': time.perf_counter() - start_time,
+    })
+    _write_report(report, report_file)
+
+    print(f"{report['valid_rows']} lignes valides sur {report['rows']}, {report['rejected_rows']} en quarantaine "
+          f"({quarantine_file})")
+    for reason, count in report['reasons'].items():
+        print(f"  {reason} : {count}")
+    if not report['passed']:
+        raise ValueError(f"Validation de {input_file} échouée : {report['rejected_rows']} lignes rejetées sur "
+                         f"{report['rows']} (maximum {max_rejected_fraction:.0%}), voir {report_file}")
+    return report
+
+
+def _write_report(report, report_file):
+    os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
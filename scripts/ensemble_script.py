@@ -0,0 +1,270 @@
+"""
+Prédiction d'ensemble : le modèle de base et le modèle IoT évaluent le même lot en parallèle (un thread par
+modèle, XGBoost libère le GIL) et leurs probabilités sont combinées, par moyenne pondérée ou par une couche de
+stacking (régression logistique sur les log-probabilités des modèles) apprise sur les plis de validation.
+
+Une ligne à laquelle il manque une mesure propre au modèle de base (ex : 'pluie_totale', absente du modèle IoT)
+est prédite par le modèle IoT seul.
+
+    fit_ensemble({'base': 'models/ml_model.ubj', 'iot': 'models/ml_model_iot.ubj'}, 'models/ensemble.json')
+    with EnsemblePredictor.load('models/ensemble.json') as ensemble:
+        result = ensemble.predict_proba(rows)      # rows : colonnes des deux modèles
+"""
+import json
+import os
+import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import KFold, StratifiedKFold, cross_val_predict
+
+from scripts.feature_engineering_script import TemporalFeatures
+from scripts.feature_schema_script import load_feature_transformer
+from scripts.instrumentation_script import instrumented
+from scripts.model_io_script import archive_model, holdout_file_for, load_metadata, load_model
+from scripts.storage_script import read_table
+
+# Résultat de `EnsemblePredictor.predict_proba` : probabilités (lignes × classes), codes des classes et source de
+# chaque ligne ('ensemble' ou le nom du modèle de repli)
+EnsembleResult = namedtuple('EnsembleResult', ['probabilities', 'classes', 'sources'])
+
+# Plancher des probabilités avant le logarithme des entrées du stacking
+_EPSILON = 1e-7
+
+
+def _stacking_inputs(probabilities):
+    """
+    Entrées de la couche de stacking : log-probabilités des modèles, concaténées dans l'ordre des modèles.
+    """
+    return np.hstack([np.log(np.clip(p, _EPSILON, 1.0)) for p in probabilities])
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _primary_columns(columns):
+    """
+    Colonnes dont les autres sont dérivées (ex : 'pluie_totale' pour 'pluie_totale_lag1', 'pluie_totale_sum_3j').
+    """
+    return [column for column in columns
+            if not any(other != column and column.startswith(other + '_') for other in columns)]
+
+
+class EnsemblePredictor:
+    """
+    Combine les probabilités de plusieurs modèles évalués en parallèle sur le même lot.
+
+    Parameters:
+        model_files (dict): {nom: fichier du modèle}, ex : {'base': ..., 'iot': ...}. L'ordre est celui des entrées
+            de la couche de stacking.
+        weights (dict): Poids de chaque modèle pour la moyenne pondérée (poids égaux par défaut).
+        stacking (dict): Couche de stacking apprise par `fit_ensemble` ('coef', 'intercept') ; si renseignée et
+            `method` vaut 'stacking', elle remplace la moyenne pondérée.
+        method (str): 'stacking' ou 'weights' ('stacking' si la couche est disponible, par défaut).
+        fallback (str): Modèle utilisé seul quand une mesure propre aux autres modèles manque pour une ligne.
+        fallback_columns (list): Colonnes dont l'absence (colonne manquante ou valeur vide) entraîne le repli.
+            Par défaut, les mesures propres aux autres modèles (colonnes absentes du modèle de repli dont les autres
+            colonnes sont dérivées).
+        temporal_files (dict): {nom: état des caractéristiques temporelles du modèle} (voir `TemporalFeatures`) :
+            les caractéristiques temporelles absentes des lignes sont calculées avant la prédiction.
+    """
+
+    def __init__(self, model_files, weights=None, stacking=None, method=None, fallback='iot',
+                 fallback_columns=None, temporal_files=None):
+        self.model_files = dict(model_files)
+        self.names = list(self.model_files)
+        self.models = {name: load_model(path) for name, path in self.model_files.items()}
+        self.transformers = {name: load_feature_transformer(path, self.models[name])
+                             for name, path in self.model_files.items()}
+        self.temporal_features = {name: TemporalFeatures.load(path) for name, path in (temporal_files or {}).items()
+                                  if name in self.model_files and path and os.path.exists(path)}
+        self.classes = np.asarray(self.models[self.names[0]].classes_)
+        for name, model in self.models.items():
+            if not np.array_equal(model.classes_, self.classes):
+                raise ValueError(f"Les classes du modèle '{name}' diffèrent de celles de '{self.names[0]}'.")
+
+        total = sum((weights or {}).get(name, 1.0) for name in self.names)
+        self.weights = {name: (weights or {}).get(name, 1.0) / total for name in self.names}
+        self.stacking = stacking
+        self.method = method or ('stacking' if stacking else 'weights')
+        if self.method == 'stacking' and not stacking:
+            raise ValueError("Aucune couche de stacking : lancez `fit_ensemble` ou utilisez method='weights'.")
+
+        if fallback not in self.model_files:
+            raise ValueError(f"Modèle de repli inconnu : {fallback}")
+        self.fallback = fallback
+        if fallback_columns is None:
+            fallback_features = set(self.transformers[fallback].feature_columns)
+            extra = [column for name in self.names if name != fallback
+                     for column in self.transformers[name].feature_columns if column not in fallback_features]
+            fallback_columns = _primary_columns(list(dict.fromkeys(extra)))
+        self.fallback_columns = list(fallback_columns)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.names), thread_name_prefix='ensemble')
+
+    @classmethod
+    def load(cls, ensemble_file, **kwargs):
+        """
+        Charge un ensemble sauvegardé par `fit_ensemble` (les paramètres passés remplacent ceux du fichier).
+
+        Un avertissement est émis si un modèle a été remplacé depuis l'apprentissage de la couche de stacking
+        (date de création différente de celle enregistrée) : relancez alors `fit_ensemble`.
+        """
+        with open(ensemble_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        model_files = kwargs.get('model_files', config['model_files'])
+        for name, created_at in config.get('models', {}).items():
+            if name in model_files and load_metadata(model_files[name]).get('created_at') != created_at:
+                warnings.warn(f"Le modèle '{name}' ({model_files[name]}) a changé depuis l'apprentissage de "
+                              f"{ensemble_file} : la couche de stacking est périmée, relancez `fit_ensemble`.")
+        settings = {key: config[key] for key in ('model_files', 'weights', 'stacking', 'fallback', 'fallback_columns')
+                    if key in config}
+        return cls(**{**settings, **kwargs})
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _score(self, name, rows):
+        if name in self.temporal_features:
+            rows = self.temporal_features[name].complete(rows)
+        features = self.transformers[name].transform(rows, keep_rejected=True).features
+        return self.models[name].predict_proba(features)
+
+    def needs_fallback(self, rows):
+        """
+        Lignes auxquelles il manque une colonne de `fallback_columns`.
+        """
+        missing = pd.DataFrame({column: rows[column].isna() if column in rows.columns
+                                else pd.Series(True, index=rows.index) for column in self.fallback_columns},
+                               index=rows.index)
+        return missing.any(axis=1).to_numpy() if len(missing.columns) else np.zeros(len(rows), dtype=bool)
+
+    @instrumented
+    def predict_proba(self, rows):
+        """
+        Probabilités combinées de chaque classe.
+
+        Parameters:
+            rows (pd.DataFrame): Lignes à prédire, avec les colonnes de tous les modèles (colonnes supplémentaires
+                ignorées, colonnes manquantes traitées comme des valeurs manquantes).
+
+        Returns:
+            EnsembleResult: (probabilités, codes des classes, source de chaque ligne)
+        """
+        futures = [self._executor.submit(self._score, name, rows) for name in self.names]
+        probabilities = [future.result() for future in futures]
+
+        if self.method == 'stacking':
+            logits = _stacking_inputs(probabilities) @ np.asarray(self.stacking['coef']).T
+            combined = _softmax(logits + np.asarray(self.stacking['intercept']))
+        else:
+            combined = sum(self.weights[name] * p for name, p in zip(self.names, probabilities))
+
+        fallback = self.needs_fallback(rows)
+        combined[fallback] = probabilities[self.names.index(self.fallback)][fallback]
+        sources = np.where(fallback, self.fallback, 'ensemble')
+        return EnsembleResult(combined, self.classes, sources)
+
+    def predict(self, rows):
+        """
+        Classe la plus probable de chaque ligne.
+        """
+        result = self.predict_proba(rows)
+        return result.classes[result.probabilities.argmax(axis=1)]
+
+
+@instrumented
+def fit_ensemble(model_files, output_file, weights=None, fallback='iot', key_columns=('date', 'quartier'),
+                 target_column='catastrophe', random_state=42):
+    """
+    Apprend la couche de stacking sur les probabilités des modèles sur leur pli de validation final (écrites par
+    `train_ml_model`), jointes sur la clé des lignes, et sauvegarde la configuration de l'ensemble en JSON.
+
+    L'accuracy de chaque modèle, de la moyenne pondérée et du stacking (prédictions croisées sur 5 plis) est
+    enregistrée dans la configuration.
+
+    Parameters:
+        model_files (dict): {nom: fichier du modèle}.
+        output_file (str): Chemin de la configuration de l'ensemble (ex : models/ensemble.json).
+        weights (dict): Poids de la moyenne pondérée (poids égaux par défaut).
+        fallback (str): Modèle de repli (voir `EnsemblePredictor`).
+        key_columns (tuple): Colonnes qui identifient une ligne dans les deux datasets.
+        target_column (str): Colonne cible.
+
+    Returns:
+        dict: Configuration sauvegardée.
+    """
+    names = list(model_files)
+    joined = None
+    for name in names:
+        holdout = read_table(holdout_file_for(model_files[name]))
+        probabilities = holdout[[column for column in holdout.columns if column.startswith('proba_')]]
+        table = holdout[[*key_columns, target_column]].join(probabilities.add_prefix(f'{name}:'))
+        joined = table if joined is None else joined.merge(table.drop(columns=target_column), on=list(key_columns))
+    if joined is None or joined.empty:
+        raise ValueError("Aucune ligne commune aux plis de validation des modèles.")
+
+    y = joined[target_column].to_numpy()
+    probabilities = [joined[[column for column in joined.columns if column.startswith(f'{name}:')]].to_numpy()
+                     for name in names]
+    classes = np.array([int(column.split('_')[-1]) for column in joined.columns if column.startswith(f'{names[0]}:')])
+
+    total = sum((weights or {}).get(name, 1.0) for name in names)
+    normalized = {name: (weights or {}).get(name, 1.0) / total for name in names}
+    weighted = sum(normalized[name] * p for name, p in zip(names, probabilities))
+
+    # Les lignes sont dans l'ordre chronologique : les plis du stacking sont mélangés
+    X = _stacking_inputs(probabilities)
+    stacker = LogisticRegression(max_iter=1000)
+    try:
+        stacked = cross_val_predict(stacker, X, y, cv=StratifiedKFold(5, shuffle=True, random_state=random_state))
+    except ValueError:
+        # Classe trop rare pour la stratification : plis non stratifiés
+        stacked = cross_val_predict(stacker, X, y, cv=KFold(min(5, len(y)), shuffle=True, random_state=random_state))
+    stacker.fit(X, y)
+
+    # Coefficients alignés sur toutes les classes des modèles (une classe absente du pli reste à -inf)
+    coef = np.zeros((len(classes), X.shape[1]))
+    intercept = np.full(len(classes), -1e9)
+    rows = np.searchsorted(classes, stacker.classes_)
+    if len(stacker.classes_) == 2:
+        # Régression logistique binaire : une seule ligne de coefficients pour la seconde classe
+        coef[rows[1]], intercept[rows[0]], intercept[rows[1]] = stacker.coef_[0], 0.0, stacker.intercept_[0]
+    else:
+        coef[rows], intercept[rows] = stacker.coef_, stacker.intercept_
+
+    metrics = {f'{name}_accuracy': float(accuracy_score(y, classes[p.argmax(axis=1)]))
+               for name, p in zip(names, probabilities)}
+    metrics['weighted_accuracy'] = float(accuracy_score(y, classes[weighted.argmax(axis=1)]))
+    metrics['stacking_accuracy'] = float(accuracy_score(y, stacked))
+    config = {
+        'model_files': model_files,
+        'weights': normalized,
+        'stacking': {'coef': coef.tolist(), 'intercept': intercept.tolist(), 'classes': classes.tolist()},
+        'fallback': fallback,
+        'fallback_columns': None,
+        'training_rows': int(len(y)),
+        'metrics': metrics,
+        'models': {name: load_metadata(path).get('created_at') for name, path in model_files.items()},
+    }
+    # L'ensemble précédent est archivé comme une version de modèle (models/versions/ensemble/)
+    archive_model(output_file)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+    print(f"Ensemble sauvegardé sous : {output_file} ({len(y)} lignes de validation communes)")
+    print("Accuracy : " + ', '.join(f"{name} {value:.4f}" for name, value in metrics.items()))
+    return config
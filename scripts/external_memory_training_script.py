@@ -0,0 +1,228 @@
+"""
+Entraînement hors mémoire pour les datasets préparés plus gros que la RAM.
+
+Le dataset est lu par blocs (colonnes du modèle seulement) et transmis à XGBoost par un `xgb.DataIter` :
+`xgb.ExtMemQuantileDMatrix` quantifie les blocs et garde ses pages sur disque, sans jamais réunir les données
+d'entraînement dans un DataFrame. La validation porte sur les jours les plus récents (comme le dernier pli de
+`make_validation_splits`), dont un échantillon de taille bornée est gardé en mémoire pour la recherche Optuna,
+l'évaluation et les figures.
+
+    train_ml_model(..., external_memory=True, chunksize=200_000, validation_rows=50_000)
+"""
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from scripts.feature_schema_script import FeatureTransformer
+from scripts.instrumentation_script import instrumented
+from scripts.ML_model_training_script import (
+    TrainingMatrices,
+    refit_on_all_rows,
+    save_evaluated_model,
+    search_compute,
+    tune_hyperparameters,
+)
+from scripts.model_io_script import file_sha256
+from scripts.storage_script import iter_table, table_columns
+from scripts.visualisation_script import learning_curve_from_history
+
+
+def scan_prepared_data(data_file, target_column='catastrophe', date_column='date', chunksize=100_000):
+    """
+    Première lecture du dataset, limitée aux colonnes de date et de cible : jours distincts, classes et nombre
+    de lignes (mémoire proportionnelle au nombre de jours, pas au nombre de lignes).
+
+    Returns:
+        dict: 'rows', 'days' (jours distincts triés, datetime64) et 'classes'.
+    """
+    days, classes, rows = set(), set(), 0
+    for chunk in iter_table(data_file, chunksize, columns=[date_column, target_column]):
+        days.update(pd.to_datetime(chunk[date_column], errors='coerce').dropna().dt.normalize().unique())
+        classes.update(pd.unique(chunk[target_column].dropna()))
+        rows += len(chunk)
+    return {'rows': rows, 'days': np.sort(np.array(list(days), dtype='datetime64[ns]')),
+            'classes': sorted(int(code) for code in classes)}
+
+
+class PreparedDataIterator(xgb.DataIter):
+    """
+    Itérateur XGBoost sur les lignes d'entraînement d'un dataset préparé, bloc par bloc.
+
+    Parameters:
+        data_file (str): Dataset préparé (CSV, Parquet ou Arrow).
+        transformer (FeatureTransformer): Schéma des caractéristiques (colonnes et origine des dates).
+        cutoff (pd.Timestamp): Les lignes datées de ce jour ou après sont réservées à la validation (None : toutes
+            les lignes, pour le modèle de production).
+        target_column (str): Colonne cible.
+        date_column (str): Colonne de date.
+        chunksize (int): Nombre de lignes par bloc.
+        cache_prefix (str): Préfixe des pages de XGBoost sur disque.
+    """
+
+    def __init__(self, data_file, transformer, cutoff, target_column='catastrophe', date_column='date',
+                 chunksize=100_000, cache_prefix=None):
+        self.data_file = data_file
+        self.transformer = transformer
+        self.cutoff = cutoff
+        self.target_column = target_column
+        self.date_column = date_column
+        self.chunksize = chunksize
+        self.columns = list(dict.fromkeys([*transformer.feature_columns, target_column, date_column]))
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_table(self.data_file, self.chunksize, columns=self.columns)
+        for chunk in self._chunks:
+            if self.cutoff is not None:
+                chunk = chunk[pd.to_datetime(chunk[self.date_column], errors='coerce') < self.cutoff]
+            chunk = chunk[chunk[self.target_column].notna()]
+            if len(chunk):
+                features = self.transformer.transform(chunk, keep_rejected=True).features
+                input_data(data=features, label=chunk[self.target_column].to_numpy())
+                return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+
+def sample_validation_rows(data_file, columns, cutoff, n_rows, date_column='date', chunksize=100_000,
+                           random_state=42):
+    """
+    Échantillon aléatoire uniforme d'au plus `n_rows` lignes de validation (datées du jour `cutoff` ou après),
+    tiré bloc par bloc : chaque ligne reçoit une clé aléatoire et seules les `n_rows` plus petites clés sont
+    gardées.
+
+    Returns:
+        pd.DataFrame: Lignes échantillonnées, dans l'ordre du fichier.
+    """
+    rng = np.random.default_rng(random_state)
+    sample, keys = None, np.empty(0)
+    offset = 0
+    for chunk in iter_table(data_file, chunksize, columns=columns):
+        chunk.index = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        chunk = chunk[pd.to_datetime(chunk[date_column], errors='coerce') >= cutoff]
+        if not len(chunk):
+            continue
+        sample = chunk if sample is None else pd.concat([sample, chunk])
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        if len(sample) > n_rows:
+            kept = np.argpartition(keys, n_rows)[:n_rows]
+            sample, keys = sample.iloc[kept], keys[kept]
+    if sample is None:
+        raise ValueError(f"Aucune ligne de validation dans {data_file} à partir du {cutoff:%Y-%m-%d}.")
+    return sample.sort_index()
+
+
+@instrumented
+def train_ml_model_external_memory(prepared_data_file, output_roc_curve, output_learning_curve,
+                                   output_matrice_conf, target_column='catastrophe',
+                                   output_model_file='best_model_ML.ubj', n_trials=100, n_jobs=None, storage=None,
+                                   resume=True, feature_columns=None, class_names=None, n_splits=4,
+                                   chunksize=100_000, validation_rows=50_000, cache_dir=None, render=True,
+                                   html_file=None):
+    """
+    Train a model without loading the prepared dataset in memory (see the module docstring).
+
+    The most recent `1 / (n_splits + 1)` of the days is held out, like the last rolling-origin fold of
+    `train_ml_model`; a uniform sample of at most `validation_rows` held-out rows is kept in memory for the
+    Optuna objective, the reported metrics and the figures. The saved model is then refit on all rows, streamed
+    again. The other arguments are those of `train_ml_model`.
+
+    Parameters:
+        chunksize (int): Rows read per chunk.
+        validation_rows (int): Maximum size of the in-memory validation sample.
+        cache_dir (str): Directory of XGBoost's on-disk pages (a temporary directory by default).
+
+    Returns:
+        list: Report figures (see `scripts.report_script`).
+    """
+    date_column = 'date'
+    available_columns = table_columns(prepared_data_file)
+    if date_column not in available_columns:
+        raise ValueError("L'entraînement hors mémoire nécessite une colonne 'date' (validation sur les derniers jours).")
+    if feature_columns is None:
+        feature_columns = [column for column in available_columns if column not in (target_column, date_column)]
+    columns = [*feature_columns, target_column, date_column]
+    if 'quartier' in available_columns and 'quartier' not in columns:
+        columns.append('quartier')
+
+    print(f"Lecture de {prepared_data_file} par blocs de {chunksize} lignes (dates et cible)...")
+    scan = scan_prepared_data(prepared_data_file, target_column, date_column, chunksize)
+    days = scan['days']
+    if len(days) < n_splits + 1:
+        raise ValueError(f"Pas assez de jours distincts ({len(days)}) pour {n_splits} plis.")
+    cutoff = pd.Timestamp(days[-(len(days) // (n_splits + 1))])
+    n_classes = max(scan['classes']) + 1
+    print(f"{scan['rows']} lignes, {len(days)} jours ; validation à partir du {cutoff:%Y-%m-%d}")
+
+    print(f"Échantillonnage d'au plus {validation_rows} lignes de validation...")
+    valid = sample_validation_rows(prepared_data_file, columns, cutoff, validation_rows, date_column, chunksize)
+    valid = valid[valid[target_column].notna()]
+    first_chunk = next(iter_table(prepared_data_file, chunksize, columns=feature_columns))
+    transformer = FeatureTransformer().fit(first_chunk, dates=pd.Series(days[:1]))
+    X_valid = transformer.transform(valid, keep_rejected=True).features
+    y_valid = valid[target_column].to_numpy()
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(output_model_file) or '.', exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cache_dir) as pages_dir:
+        print("Construction de la matrice d'entraînement hors mémoire...")
+        iterator = PreparedDataIterator(prepared_data_file, transformer, cutoff, target_column, date_column,
+                                        chunksize, cache_prefix=os.path.join(pages_dir, 'train'))
+        matrices = TrainingMatrices(iterator, None, X_valid, y_valid, n_classes=n_classes)
+
+        # Recherche Optuna reprenable, dans ce processus : la matrice sur disque est partagée par les essais
+        study_name = f"{os.path.splitext(os.path.basename(output_model_file))[0]}_extmem"
+        if storage is None:
+            storage = f"sqlite:///{os.path.splitext(output_model_file)[0]}_optuna.db"
+        study = tune_hyperparameters(None, None, None, study_name, storage, n_trials=n_trials, n_jobs=n_jobs,
+                                     resume=resume, matrices=matrices, n_workers=1)
+        compute = search_compute(study, matrices.train_rows)
+        print("Meilleur essai: score {},\nparamètres {}".format(study.best_trial.value, study.best_trial.params))
+
+        print("Entraînement du modèle XGBoost avec les meilleurs paramètres...")
+        best_params = study.best_trial.params
+        evals_history = {}
+        booster = matrices.train({**best_params, 'random_state': 42}, n_threads=n_jobs, evals_result=evals_history)
+        evaluated_model = xgb.XGBClassifier(**best_params, random_state=42, n_jobs=n_jobs)
+        evaluated_model.load_model(bytearray(booster.save_raw('ubj')))
+        train_rows = matrices.train_rows[0]
+        # Les pages sur disque sont libérées par XGBoost avant la suppression du répertoire temporaire
+        del matrices, iterator
+
+        # Modèle de production : toutes les lignes, jours de validation compris
+        print("Réentraînement du modèle final sur toutes les données...")
+        iterator = PreparedDataIterator(prepared_data_file, transformer, None, target_column, date_column,
+                                        chunksize, cache_prefix=os.path.join(pages_dir, 'all'))
+        dall = xgb.ExtMemQuantileDMatrix(iterator)
+        production_model = refit_on_all_rows(dall, best_params, n_classes, n_jobs=n_jobs)
+        del dall, iterator
+
+    key_columns = [column for column in (date_column, 'quartier') if column in valid.columns]
+    return save_evaluated_model(
+        evaluated_model, production_model, X_valid, y_valid, valid[key_columns], transformer, output_model_file,
+        output_roc_curve, output_learning_curve, output_matrice_conf,
+        (*learning_curve_from_history(evals_history), "Boosting Iterations"),
+        target_column=target_column, class_names=class_names,
+        metrics={'best_trial_accuracy': study.best_trial.value},
+        metadata={
+            'validation': {
+                'scheme': 'external_memory_holdout_sample',
+                'n_splits': n_splits,
+                'holdout': [str(cutoff.date()), str(pd.Timestamp(days[-1]).date())],
+                'sample_rows': len(y_valid),
+                'final_fit': 'all_rows',
+            },
+            'params': best_params,
+            'search': {'method': 'optuna', **compute},
+            'training_data': {'file': prepared_data_file, 'sha256': file_sha256(prepared_data_file),
+                              'rows': scan['rows'], 'train_rows': train_rows, 'chunksize': chunksize},
+        },
+        render=render, html_file=html_file)
@@ -0,0 +1,249 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from scripts.instrumentation_script import instrumented
+
+
+class TemporalFeatures:
+    """
+    Caractéristiques temporelles par quartier : valeurs des jours précédents (lags), sommes/moyennes/maximums
+    glissants sur plusieurs fenêtres et nombre de jours depuis la dernière catastrophe.
+
+    Les calculs sont faits sur une grille jours × quartiers (une colonne par quartier, un jour par ligne,
+    jours manquants inclus) avec des opérations vectorisées pandas/NumPy : les décalages et fenêtres sont
+    donc exprimés en jours calendaires, même quand des jours manquent dans les données. Le coût est linéaire
+    en nombre de lignes.
+
+    Pour la prédiction, `fit` mémorise un petit état glissant (les derniers jours de chaque quartier et la date
+    de sa dernière catastrophe) : `transform` l'utilise comme historique des nouvelles lignes.
+
+        features = TemporalFeatures(['pluie_totale', 'sismicite'])
+        data = features.transform(data)           # dataset complet
+        features.fit(data).save('data/temporal_features.json')
+        new_rows = TemporalFeatures.load('data/temporal_features.json').transform(new_rows)
+
+    Parameters:
+        columns (list): Colonnes de capteurs à transformer (colonnes numériques hors date, quartier et cible
+            par défaut).
+        lags (tuple): Décalages en jours.
+        windows (tuple): Tailles des fenêtres glissantes en jours (jour courant inclus).
+        aggregations (tuple): Agrégations des fenêtres ('sum', 'mean', 'max', 'min', 'std').
+        group_column (str): Colonne de zone.
+        date_column (str): Colonne de date.
+        event_column (str): Colonne cible ; une valeur non nulle est une catastrophe.
+    """
+
+    def __init__(self, columns=None, lags=(1, 2, 3), windows=(3, 7, 14), aggregations=('sum', 'mean', 'max'),
+                 group_column='quartier', date_column='date', event_column='catastrophe'):
+        self.columns = list(columns) if columns is not None else None
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.aggregations = tuple(aggregations)
+        self.group_column = group_column
+        self.date_column = date_column
+        self.event_column = event_column
+        self.history = None
+        self.last_event = {}
+
+    @property
+    def span(self):
+        """
+        Nombre de jours d'historique nécessaires pour calculer les caractéristiques d'un jour.
+        """
+        return max(self.lags + self.windows, default=0)
+
+    def _source_columns(self, data):
+        if self.columns is not None:
+            return self.columns
+        excluded = {self.group_column, self.date_column, self.event_column}
+        return [column for column in data.select_dtypes(include='number').columns if column not in excluded]
+
+    def feature_names(self, data=None):
+        """
+        Noms des colonnes ajoutées par `transform`.
+        """
+        columns = self.columns if data is None else self._source_columns(data)
+        names = []
+        for column in columns:
+            names += [f'{column}_lag{lag}' for lag in self.lags]
+            names += [f'{column}_{aggregation}_{window}j' for window in self.windows
+                      for aggregation in self.aggregations]
+        names.append(f'jours_depuis_{self.event_column}')
+        return names
+
+    def _grid(self, frame, dates, columns):
+        """
+        Moyenne de chaque colonne par (jour, quartier), sur une grille de jours consécutifs.
+        """
+        valid = dates.notna().to_numpy()
+        grouped = frame.loc[valid, columns].groupby(
+            [dates[valid].to_numpy(), frame.loc[valid, self.group_column].to_numpy()]).mean()
+        calendar = pd.date_range(dates.min(), dates.max(), freq='D')
+        zones = grouped.index.get_level_values(1).unique()
+        return {column: grouped[column].unstack().reindex(index=calendar, columns=zones) for column in columns}, \
+            calendar, zones
+
+    @instrumented
+    def transform(self, data):
+        """
+        Ajoute les caractéristiques temporelles aux lignes.
+
+        Parameters:
+            data (pd.DataFrame): Lignes avec la colonne de date, de quartier et les colonnes de capteurs.
+
+        Returns:
+            pd.DataFrame: Copie de `data` avec les colonnes de `feature_names()` ajoutées.
+        """
+        columns = self._source_columns(data)
+        if self.columns is None:
+            self.columns = columns
+
+        frame = data
+        if self.history is not None:
+            # Les jours mémorisés servent d'historique aux nouvelles lignes
+            frame = pd.concat([self.history, data], ignore_index=True)
+        dates = pd.to_datetime(frame[self.date_column], errors='coerce').dt.normalize()
+        if dates.notna().sum() == 0:
+            return data.assign(**{name: np.nan for name in self.feature_names(data)})
+
+        event_columns = [self.event_column] if self.event_column in frame.columns else []
+        grids, calendar, zones = self._grid(frame, dates, columns + event_columns)
+
+        # Position de chaque ligne de `data` dans la grille
+        row_dates = pd.to_datetime(data[self.date_column], errors='coerce').dt.normalize()
+        day_index = calendar.get_indexer(row_dates)
+        zone_index = zones.get_indexer(data[self.group_column])
+        found = (day_index >= 0) & (zone_index >= 0)
+
+        def lookup(grid):
+            values = np.full(len(data), np.nan)
+            values[found] = np.asarray(grid, dtype=float)[day_index[found], zone_index[found]]
+            return values
+
+        features = {}
+        for column in columns:
+            grid = grids[column]
+            for lag in self.lags:
+                features[f'{column}_lag{lag}'] = lookup(grid.shift(lag))
+            for window in self.windows:
+                rolling = grid.rolling(window, min_periods=1)
+                for aggregation in self.aggregations:
+                    features[f'{column}_{aggregation}_{window}j'] = lookup(getattr(rolling, aggregation)())
+
+        # Jours depuis la dernière catastrophe du quartier, jour courant exclu (la cible du jour est inconnue)
+        if event_columns:
+            is_event = grids[self.event_column].fillna(0).to_numpy() > 0
+        else:
+            is_event = np.zeros((len(calendar), len(zones)), dtype=bool)
+        event_days = pd.DataFrame(np.where(is_event, calendar.to_numpy()[:, np.newaxis], np.datetime64('NaT')),
+                                  index=calendar, columns=zones).ffill().shift(1)
+        for zone, last in self.last_event.items():
+            if zone in event_days.columns:
+                event_days[zone] = event_days[zone].fillna(pd.Timestamp(last))
+        days_since = (calendar.to_numpy()[:, np.newaxis] - event_days.to_numpy(dtype='datetime64[ns]')) \
+            / np.timedelta64(1, 'D')
+        features[f'jours_depuis_{self.event_column}'] = lookup(days_since)
+
+        return pd.concat([data, pd.DataFrame(features, index=data.index).astype(np.float32)], axis=1)
+
+    def complete(self, data):
+        """
+        Ajoute les caractéristiques temporelles aux lignes brutes à prédire (mesures du jour), à partir de l'état
+        glissant. Les lignes qui ont déjà toutes les colonnes de `feature_names()` (lignes d'un dataset préparé)
+        sont renvoyées telles quelles.
+
+        Les colonnes nécessaires au calcul et absentes des lignes (capteur, date, quartier), ainsi que les mesures
+        non numériques, sont traitées comme des valeurs manquantes : les caractéristiques qui en dépendent valent
+        NaN, et la colonne absente ou la valeur invalide reste visible du schéma des caractéristiques du modèle.
+
+        Parameters:
+            data (pd.DataFrame): Lignes à prédire.
+
+        Returns:
+            pd.DataFrame: Lignes avec les colonnes de `feature_names()`.
+        """
+        names = self.feature_names(data)
+        if all(name in data.columns for name in names):
+            return data
+        data = data.drop(columns=[name for name in names if name in data.columns])
+        needed = [self.date_column, self.group_column, *self._source_columns(data)]
+        frame = data.reindex(columns=list(dict.fromkeys([*data.columns, *needed])))
+        sources = self._source_columns(data)
+        frame[sources] = frame[sources].apply(pd.to_numeric, errors='coerce')
+        return pd.concat([data, self.transform(frame)[names]], axis=1)
+
+    @instrumented
+    def fit(self, data):
+        """
+        Mémorise l'état glissant : les `span` derniers jours de chaque quartier et la date de sa dernière
+        catastrophe.
+
+        Parameters:
+            data (pd.DataFrame): Données les plus récentes (au moins les `span` derniers jours).
+        """
+        columns = self._source_columns(data)
+        if self.columns is None:
+            self.columns = columns
+        kept = [self.date_column, self.group_column, *columns]
+        if self.event_column in data.columns:
+            kept.append(self.event_column)
+
+        dates = pd.to_datetime(data[self.date_column], errors='coerce')
+        recent = dates > dates.max() - pd.Timedelta(days=self.span)
+        self.history = data.loc[recent, kept].assign(**{self.date_column: dates[recent]}).reset_index(drop=True)
+
+        if self.event_column in data.columns:
+            events = data[self.event_column].fillna(0).to_numpy() > 0
+            last = dates[events].groupby(data.loc[events, self.group_column]).max()
+            self.last_event = {zone: date.strftime('%Y-%m-%d') for zone, date in last.items()}
+        return self
+
+    def to_dict(self):
+        history = None
+        if self.history is not None:
+            history = self.history.assign(
+                **{self.date_column: self.history[self.date_column].dt.strftime('%Y-%m-%d')}).to_dict('list')
+        return {
+            'columns': self.columns,
+            'lags': list(self.lags),
+            'windows': list(self.windows),
+            'aggregations': list(self.aggregations),
+            'group_column': self.group_column,
+            'date_column': self.date_column,
+            'event_column': self.event_column,
+            'history': history,
+            'last_event': {str(zone): date for zone, date in self.last_event.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        history = data.pop('history', None)
+        last_event = data.pop('last_event', {})
+        features = cls(**data)
+        features.last_event = last_event
+        if history is not None:
+            features.history = pd.DataFrame(history)
+            features.history[features.date_column] = pd.to_datetime(features.history[features.date_column])
+            # Les clés JSON sont des chaînes : on retrouve le type des quartiers à partir de l'historique
+            zone_dtype = features.history[features.group_column].dtype
+            if zone_dtype.kind in 'iuf':
+                features.last_event = {zone_dtype.type(zone): date for zone, date in last_event.items()}
+        return features
+
+    def save(self, path):
+        """
+        Sauvegarde la configuration et l'état glissant au format JSON.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, default=lambda value: value.item())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge une configuration sauvegardée avec `save`.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
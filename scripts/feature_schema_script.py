@@ -0,0 +1,209 @@
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Résultat de `FeatureTransformer.transform`
+TransformResult = namedtuple('TransformResult', ['features', 'index', 'rejected'])
+
+
+def features_file_for(model_file):
+    """
+    Chemin du schéma des caractéristiques sauvegardé à côté d'un modèle (ex : models/ml_model.features.json).
+    """
+    return os.path.splitext(model_file)[0] + '.features.json'
+
+
+def _integer_bounds(dtype):
+    """
+    Bornes des valeurs d'un type entier ou booléen enregistré par `fit` (None pour les autres types).
+    """
+    if dtype is None:
+        return None
+    try:
+        dtype = pd.api.types.pandas_dtype(dtype)
+    except TypeError:
+        return None
+    if pd.api.types.is_bool_dtype(dtype):
+        return 0, 1
+    if pd.api.types.is_integer_dtype(dtype):
+        info = np.iinfo(getattr(dtype, 'numpy_dtype', dtype))
+        return info.min, info.max
+    return None
+
+
+class FeatureTransformer:
+    """
+    Schéma des caractéristiques appris à l'entraînement et sauvegardé avec le modèle : ordre et types des colonnes,
+    origine des dates. La transformation d'un lot ne dépend que de ce schéma (et non de la composition du lot),
+    et produit directement la matrice float32 attendue par XGBoost.
+
+    Parameters:
+        feature_columns (list): Colonnes utilisées par le modèle, dans l'ordre d'entraînement.
+        dtypes (dict): Types des colonnes à l'entraînement ; `transform` rejette les valeurs non entières (ou hors
+            bornes) des colonnes entières et booléennes.
+        date_column (str): Nom de la colonne de date.
+        date_origin (str): Date de référence (date minimale à l'entraînement) ; la colonne de date, si elle fait
+            partie des caractéristiques, est convertie en nombre de jours depuis cette date.
+    """
+
+    def __init__(self, feature_columns=None, dtypes=None, date_column='date', date_origin=None):
+        self.feature_columns = list(feature_columns) if feature_columns is not None else None
+        self.dtypes = dict(dtypes or {})
+        self.date_column = date_column
+        self.date_origin = date_origin
+        self._bounds = self._integer_columns()
+
+    def _integer_columns(self):
+        """
+        Positions et bornes des colonnes entières ou booléennes à l'entraînement (calculées une fois par schéma).
+        """
+        positions, bounds = [], []
+        for position, column in enumerate(self.feature_columns or []):
+            column_bounds = _integer_bounds(self.dtypes.get(column)) if column != self.date_column else None
+            if column_bounds is not None:
+                positions.append(position)
+                bounds.append(column_bounds)
+        bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
+        return np.array(positions, dtype=int), bounds[:, 0], bounds[:, 1]
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Schéma minimal déduit d'un modèle XGBoost entraîné sur un DataFrame (modèles sans schéma sauvegardé).
+        """
+        return cls(feature_columns=[str(column) for column in model.feature_names_in_])
+
+    def fit(self, X, dates=None):
+        """
+        Enregistre les colonnes, leurs types et l'origine des dates.
+
+        Parameters:
+            X (pd.DataFrame): Caractéristiques d'entraînement.
+            dates (pd.Series): Dates des lignes d'entraînement (colonne de date si absente de X).
+        """
+        self.feature_columns = [str(column) for column in X.columns]
+        self.dtypes = {str(column): str(dtype) for column, dtype in X.dtypes.items()}
+        self._bounds = self._integer_columns()
+        if dates is None and self.date_column in X.columns:
+            dates = X[self.date_column]
+        if dates is not None:
+            self.date_origin = pd.to_datetime(dates).min().strftime('%Y-%m-%d')
+        return self
+
+    def transform(self, data, keep_rejected=False):
+        """
+        Convertit un lot de lignes en matrice float32 contiguë, dans l'ordre des colonnes d'entraînement.
+
+        Une ligne est rejetée si une colonne attendue est absente, si une valeur n'est pas convertible en nombre,
+        si une valeur ne correspond pas au type de sa colonne à l'entraînement (ex : 1.5 ou 300 pour une colonne
+        entière int8) ou si elle n'a aucune valeur (ex : objet vide dans une requête). Les rejets sont renvoyés avec
+        leur motif au lieu d'être supprimés silencieusement.
+
+        Parameters:
+            data (pd.DataFrame): Lignes à transformer (colonnes supplémentaires ignorées).
+            keep_rejected (bool): Conserver les lignes rejetées dans la matrice (valeurs invalides ou de mauvais
+                type à NaN, traitées comme manquantes par XGBoost) au lieu de les retirer.
+
+        Returns:
+            TransformResult: (features, index des lignes de `features`, DataFrame des rejets avec leur motif)
+        """
+        if not isinstance(data, pd.DataFrame):
+            raise ValueError("L'entrée doit être un DataFrame.")
+
+        missing = [column for column in self.feature_columns if column not in data.columns]
+        columns = data.reindex(columns=self.feature_columns)
+
+        if self.date_column in self.feature_columns:
+            dates = pd.to_datetime(columns[self.date_column], errors='coerce')
+            columns[self.date_column] = (dates - pd.Timestamp(self.date_origin)).dt.days
+
+        # Conversion en une passe quand toutes les colonnes sont déjà numériques
+        if all(pd.api.types.is_numeric_dtype(dtype) for dtype in columns.dtypes):
+            converted = columns
+        else:
+            converted = columns.apply(pd.to_numeric, errors='coerce')
+        features = np.ascontiguousarray(converted.to_numpy(dtype=np.float32))
+
+        # Valeurs présentes dans l'entrée mais non convertibles, ou colonnes absentes
+        invalid = np.isnan(features) & columns.notna().to_numpy()
+        invalid |= np.isin(np.array(self.feature_columns), missing)[np.newaxis, :]
+        empty = np.isnan(features).all(axis=1) if len(self.feature_columns) else np.zeros(len(data), dtype=bool)
+
+        # Valeurs incompatibles avec le type de la colonne à l'entraînement (entiers, booléens), vérifiées sur les
+        # valeurs float32 que reçoit le modèle
+        mistyped = np.zeros_like(invalid)
+        positions, low, high = self._bounds
+        if len(positions):
+            values = features[:, positions]
+            with np.errstate(invalid='ignore'):
+                mistyped[:, positions] = ~np.isnan(values) & (
+                    (values != np.round(values)) | (values < low) | (values > high))
+        if mistyped.any():
+            features = np.where(mistyped, np.float32(np.nan), features)
+        rejected_mask = invalid.any(axis=1) | mistyped.any(axis=1) | empty
+
+        names = np.array(self.feature_columns)
+        reasons = []
+        for row_invalid, row_mistyped in zip(invalid[rejected_mask], mistyped[rejected_mask]):
+            parts = []
+            if row_invalid.any():
+                parts.append('valeurs invalides : ' + ', '.join(names[row_invalid]))
+            if row_mistyped.any():
+                parts.append('types invalides : ' + ', '.join(f'{column} ({self.dtypes[column]})'
+                                                             for column in names[row_mistyped]))
+            reasons.append(' ; '.join(parts) or 'aucune valeur')
+        rejected = pd.DataFrame({'reason': reasons}, index=data.index[rejected_mask])
+
+        if keep_rejected:
+            return TransformResult(features, data.index, rejected)
+        return TransformResult(features[~rejected_mask], data.index[~rejected_mask], rejected)
+
+    def to_dict(self):
+        return {
+            'feature_columns': self.feature_columns,
+            'dtypes': self.dtypes,
+            'date_column': self.date_column,
+            'date_origin': self.date_origin,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def save(self, path):
+        """
+        Sauvegarde le schéma au format JSON.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Charge un schéma sauvegardé avec `save`.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_feature_transformer(model_file, model=None):
+    """
+    Charge le schéma sauvegardé à côté du modèle, ou le déduit du modèle s'il n'existe pas (anciens modèles).
+
+    Parameters:
+        model_file (str): Chemin du modèle.
+        model: Modèle déjà chargé (utilisé si le schéma est absent).
+
+    Returns:
+        FeatureTransformer: Schéma des caractéristiques.
+    """
+    path = features_file_for(model_file)
+    if os.path.exists(path):
+        return FeatureTransformer.load(path)
+    if model is None:
+        raise FileNotFoundError(f"Schéma des caractéristiques introuvable : {path}")
+    return FeatureTransformer.from_model(model)
@@ -0,0 +1,167 @@
+"""
+Prévision par quartier et par jour : pour une plage de dates et une liste de quartiers, construit la grille
+complète jours × quartiers, calcule ses caractéristiques et l'évalue en un seul lot vectorisé avec chaque modèle.
+Le résultat est une table compacte des probabilités (modèle × jour × quartier, une colonne float32 par classe).
+
+Les mesures des capteurs d'un jour à venir sont inconnues : chaque case de la grille reçoit la valeur observée
+si le jour figure dans les données, sinon la moyenne saisonnière du quartier (même période de l'année, lissée
+sur quelques jours). Les caractéristiques temporelles (lags, fenêtres, jours depuis la dernière catastrophe)
+sont calculées sur cette grille, avec les jours observés qui précèdent la plage comme historique.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.feature_engineering_script import TemporalFeatures
+from scripts.feature_schema_script import load_feature_transformer
+from scripts.instrumentation_script import instrumented
+from scripts.model_io_script import load_metadata, load_model
+from scripts.storage_script import read_table, write_table
+
+
+def _seasonal_profile(values, day_of_year, zone_index, n_zones, smoothing):
+    """
+    Moyenne par (jour de l'année, quartier), lissée sur `smoothing` jours (calendrier circulaire), complétée par
+    la moyenne du quartier puis par la moyenne générale.
+
+    Returns:
+        np.ndarray: Profil de forme (366, n_zones).
+    """
+    flat = day_of_year * n_zones + zone_index
+    sums = np.bincount(flat, weights=values, minlength=366 * n_zones).reshape(366, n_zones)
+    counts = np.bincount(flat, minlength=366 * n_zones).reshape(366, n_zones).astype(float)
+
+    # Fenêtre glissante circulaire par sommes cumulées (fin décembre voisine de début janvier)
+    half = smoothing // 2
+    padded_sums = np.concatenate([sums[-half:], sums, sums[:half]]) if half else sums
+    padded_counts = np.concatenate([counts[-half:], counts, counts[:half]]) if half else counts
+    window = 2 * half + 1
+    cumulative_sums = np.vstack([np.zeros(n_zones), np.cumsum(padded_sums, axis=0)])
+    cumulative_counts = np.vstack([np.zeros(n_zones), np.cumsum(padded_counts, axis=0)])
+    window_sums = cumulative_sums[window:] - cumulative_sums[:-window]
+    window_counts = cumulative_counts[window:] - cumulative_counts[:-window]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = window_sums / window_counts
+        zone_mean = sums.sum(axis=0) / counts.sum(axis=0)
+    profile = np.where(np.isnan(profile), zone_mean, profile)
+    overall = values.mean() if len(values) else np.nan
+    return np.where(np.isnan(profile), overall, profile)
+
+
+def build_forecast_grid(data, start, end, zones, columns, date_column='date', group_column='quartier',
+                        smoothing=15):
+    """
+    Grille jours × quartiers des mesures des capteurs (une ligne par jour et par quartier, jour par jour).
+
+    Parameters:
+        data (pd.DataFrame): Données observées (date, quartier et colonnes de capteurs).
+        start, end (str): Première et dernière date de la plage (incluses).
+        zones (list): Codes des quartiers (ex : valeurs de `mapping_zone`).
+        columns (list): Colonnes de capteurs à remplir.
+        smoothing (int): Largeur en jours du lissage de la moyenne saisonnière.
+
+    Returns:
+        pd.DataFrame: Grille de `n_jours * n_quartiers` lignes.
+    """
+    calendar = pd.date_range(start, end, freq='D')
+    zones = pd.Index(list(zones))
+    n_days, n_zones = len(calendar), len(zones)
+
+    dates = pd.to_datetime(data[date_column], errors='coerce').dt.normalize()
+    zone_index = zones.get_indexer(data[group_column])
+    day_index = calendar.get_indexer(dates)
+    day_of_year = dates.dt.dayofyear.fillna(1).to_numpy(dtype=int) - 1
+    grid_day_of_year = calendar.dayofyear.to_numpy() - 1
+
+    grid = {date_column: np.repeat(calendar.to_numpy(), n_zones), group_column: np.tile(zones.to_numpy(), n_days)}
+    for column in columns:
+        values = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+        known = (zone_index >= 0) & dates.notna().to_numpy() & ~np.isnan(values)
+        cells = _seasonal_profile(values[known], day_of_year[known], zone_index[known], n_zones,
+                                  smoothing)[grid_day_of_year]
+
+        # Jours observés : moyenne des mesures du jour dans le quartier
+        observed = known & (day_index >= 0)
+        flat = day_index[observed] * n_zones + zone_index[observed]
+        sums = np.bincount(flat, weights=values[observed], minlength=n_days * n_zones).reshape(n_days, n_zones)
+        counts = np.bincount(flat, minlength=n_days * n_zones).reshape(n_days, n_zones)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cells = np.where(counts > 0, sums / counts, cells)
+        grid[column] = cells.ravel().astype(np.float32)
+    return pd.DataFrame(grid)
+
+
+@instrumented
+def forecast_probabilities(model_file, prepared_data_file, features_file, start, end, zones, smoothing=15):
+    """
+    Probabilités de chaque classe pour chaque jour et chaque quartier de la plage, avec un modèle.
+
+    Parameters:
+        model_file (str): Chemin du modèle.
+        prepared_data_file (str): Dataset préparé du modèle (mesures observées et historique).
+        features_file (str): Configuration des caractéristiques temporelles du dataset (voir `TemporalFeatures`).
+        start, end (str): Plage de dates (incluses).
+        zones (list): Codes des quartiers.
+
+    Returns:
+        pd.DataFrame: Colonnes date, quartier et une colonne de probabilité (float32) par classe.
+    """
+    model = load_model(model_file)
+    transformer = load_feature_transformer(model_file, model)
+    temporal_features = TemporalFeatures.load(features_file)
+    data = read_table(prepared_data_file)
+
+    grid = build_forecast_grid(data, start, end, zones, temporal_features.columns,
+                               date_column=temporal_features.date_column,
+                               group_column=temporal_features.group_column, smoothing=smoothing)
+
+    # Les jours observés avant la plage servent d'historique (lags, fenêtres, dernière catastrophe)
+    dates = pd.to_datetime(data[temporal_features.date_column], errors='coerce')
+    prior = data[dates < pd.Timestamp(start)]
+    temporal_features.history, temporal_features.last_event = None, {}
+    if len(prior):
+        temporal_features.fit(prior)
+    grid = temporal_features.transform(grid)
+
+    # Un seul appel vectorisé pour toute la grille
+    features = transformer.transform(grid, keep_rejected=True).features
+    probabilities = model.predict_proba(features).astype(np.float32)
+
+    class_names = load_metadata(model_file).get('classes', {})
+    columns = [class_names.get(str(code), str(code)) for code in model.classes_]
+    table = grid[[temporal_features.date_column, temporal_features.group_column]].reset_index(drop=True)
+    return pd.concat([table, pd.DataFrame(probabilities, columns=columns)], axis=1)
+
+
+@instrumented
+def forecast_grid(models, start, end, zones, output_file=None, smoothing=15):
+    """
+    Prévision de plusieurs modèles sur la même grille, réunie dans une seule table.
+
+    Parameters:
+        models (dict): {nom du modèle: (model_file, prepared_data_file, features_file)}.
+        start, end (str): Plage de dates (incluses).
+        zones (list): Codes des quartiers.
+        output_file (str): Fichier où écrire la table (CSV, Parquet ou Arrow, optionnel).
+
+    Returns:
+        pd.DataFrame: Colonnes modele, date, quartier et une colonne de probabilité par classe.
+    """
+    start_time = time.perf_counter()
+    tables = []
+    for name, (model_file, prepared_data_file, features_file) in models.items():
+        table = forecast_probabilities(model_file, prepared_data_file, features_file, start, end, zones, smoothing)
+        tables.append(table.assign(modele=name))
+    table = pd.concat(tables, ignore_index=True)
+    table['modele'] = table['modele'].astype('category')
+    table = table[['modele', *[column for column in table.columns if column != 'modele']]]
+
+    n_cells = len(table) // max(1, len(models))
+    print(f"Grille de {n_cells} cases (jours × quartiers) évaluée par {len(models)} modèle(s) en "
+          f"{time.perf_counter() - start_time:.2f} s")
+    if output_file is not None:
+        write_table(table, output_file)
+        print(f"Probabilités sauvegardées sous : {output_file}")
+    return table
@@ -0,0 +1,302 @@
+"""
+Mesures d'exécution du pipeline : temps réel, temps CPU, pic mémoire, lignes en entrée / sortie et octets lus /
+écrits de chaque étape de main.py et des points d'entrée de scripts/ décorés par `instrumented` (étapes de
+nettoyage, d'entraînement, de prédiction, lectures et écritures des tables), plus la durée de chaque essai Optuna.
+Les fonctions appelées ligne par ligne ou par requête ne sont pas instrumentées.
+
+Les octets sont ceux lus et écrits par le processus pendant l'appel (compteurs `rchar` / `wchar` de
+/proc/self/io : fichiers, sockets et pipes, tous threads du processus confondus ; hors Linux, non mesurés).
+
+Les mesures sont désactivées par défaut (les fonctions instrumentées sont alors appelées directement). Une fois
+activées avec `enable`, chaque appel ajoute une ligne JSON au fichier de mesures ; les processus enfants (pools
+de recherche Optuna, de rendu des figures) écrivent dans le même fichier. `write_prometheus` agrège ce fichier
+au format texte de Prometheus (node_exporter, collecteur « textfile »).
+
+    enable('metrics.jsonl')
+    with Measurement('train', kind='step'):
+        ...
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure du pic mémoire
+    resource = None
+
+# Transmis aux processus enfants : fichier de mesures et étape en cours
+METRICS_FILE_ENV = 'PANDAROUX_METRICS_FILE'
+METRICS_STEP_ENV = 'PANDAROUX_METRICS_STEP'
+
+_metrics_file = os.environ.get(METRICS_FILE_ENV) or None
+_write_lock = threading.Lock()
+_local = threading.local()
+
+if hasattr(os, 'register_at_fork'):
+    # Un processus enfant créé pendant une écriture hériterait d'un verrou pris
+    os.register_at_fork(after_in_child=lambda: globals().update(_write_lock=threading.Lock()))
+
+
+def enable(metrics_file):
+    """
+    Active les mesures : chaque appel instrumenté ajoute une ligne JSON à `metrics_file`.
+    """
+    global _metrics_file
+    os.makedirs(os.path.dirname(metrics_file) or '.', exist_ok=True)
+    _metrics_file = metrics_file
+    os.environ[METRICS_FILE_ENV] = metrics_file
+
+
+def disable():
+    global _metrics_file
+    _metrics_file = None
+    os.environ.pop(METRICS_FILE_ENV, None)
+
+
+def is_enabled():
+    return _metrics_file is not None
+
+
+def emit(record):
+    """
+    Ajoute un enregistrement au fichier de mesures (une ligne JSON, écrite d'un seul bloc).
+    """
+    if _metrics_file is None:
+        return
+    line = json.dumps({'timestamp': time.time(), 'pid': os.getpid(), **record}, default=str) + '\n'
+    with _write_lock, open(_metrics_file, 'a', encoding='utf-8') as f:
+        f.write(line)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en Kio sous Linux, en octets sous macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _rows(value):
+    """
+    Nombre de lignes d'un DataFrame, d'une Series, d'un tableau NumPy ou d'un objet qui en contient un
+    (ex : `CleaningPipeline.data`) ; None sinon.
+    """
+    for candidate in (value, getattr(value, 'data', None)):
+        shape = getattr(candidate, 'shape', None)
+        if isinstance(shape, tuple) and shape:
+            return shape[0]
+    return None
+
+
+def _io_counters():
+    """
+    Octets lus et écrits par le processus depuis son démarrage (appels système read / write, lectures servies
+    par le cache comprises) ; None si /proc/self/io n'est pas disponible.
+    """
+    try:
+        with open('/proc/self/io', 'rb') as f:
+            counters = dict(line.split(b':', 1) for line in f.read().splitlines())
+        return int(counters[b'rchar']), int(counters[b'wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _current_step():
+    steps = [name for name, kind in _stack() if kind == 'step']
+    return '/'.join(steps) or os.environ.get(METRICS_STEP_ENV)
+
+
+class Measurement:
+    """
+    Mesure un bloc de code (étape de main.py ou appel de fonction) et émet un enregistrement à la sortie.
+
+    Parameters:
+        name (str): Nom de l'étape ou de la fonction.
+        kind (str): 'step' pour une étape (transmise aux processus enfants), 'function' sinon.
+        inputs (list): Arguments de l'appel (lignes des DataFrames / tableaux en entrée).
+    """
+
+    def __init__(self, name, kind='function', inputs=()):
+        self.name = name
+        self.kind = kind
+        self.inputs = inputs
+        self.result = None
+
+    def __enter__(self):
+        if _metrics_file is None:
+            return self
+        self._parent = _stack()[-1][0] if _stack() else None
+        _stack().append((self.name, self.kind))
+        if self.kind == 'step':
+            self._previous_step = os.environ.get(METRICS_STEP_ENV)
+            os.environ[METRICS_STEP_ENV] = _current_step()
+        self._rows_in = sum(rows for rows in map(_rows, self.inputs) if rows is not None)
+        self._io = _io_counters()
+        self._peak_before = _peak_rss_mb()
+        self._cpu = time.process_time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if _metrics_file is None or not hasattr(self, '_start'):
+            return False
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        peak = _peak_rss_mb()
+        step = _current_step()
+        _stack().pop()
+        if self.kind == 'step':
+            if self._previous_step is None:
+                os.environ.pop(METRICS_STEP_ENV, None)
+            else:
+                os.environ[METRICS_STEP_ENV] = self._previous_step
+
+        io = _io_counters()
+        bytes_read, bytes_written = (None, None) if io is None or self._io is None \
+            else (io[0] - self._io[0], io[1] - self._io[1])
+
+        emit({
+            'kind': self.kind,
+            'name': self.name,
+            'step': step,
+            'parent': self._parent,
+            'thread': threading.current_thread().name,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'peak_rss_mb': peak,
+            'peak_rss_increase_mb': None if peak is None else peak - self._peak_before,
+            'rows_in': self._rows_in,
+            'rows_out': _rows(self.result[0] if isinstance(self.result, tuple) and self.result else self.result),
+            'bytes_read': bytes_read,
+            'bytes_written': bytes_written,
+            'error': exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+def instrumented(func):
+    """
+    Décorateur : mesure chaque appel de `func` quand les mesures sont activées, appel direct sinon.
+    """
+    name = f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _metrics_file is None:
+            return func(*args, **kwargs)
+        with Measurement(name, inputs=[*args, *kwargs.values()]) as measured:
+            measured.result = func(*args, **kwargs)
+        return measured.result
+
+    return wrapper
+
+
+def record_trials(study, since=None):
+    """
+    Émet un enregistrement par essai d'une étude Optuna (durée, état, score, paramètres).
+
+    Parameters:
+        study (optuna.Study): Étude.
+        since (datetime.datetime): Ne garder que les essais commencés après cette date (essais de l'exécution
+            en cours quand l'étude est reprise).
+    """
+    if _metrics_file is None:
+        return
+    for trial in study.trials:
+        if trial.datetime_start is None or (since is not None and trial.datetime_start < since):
+            continue
+        emit({
+            'kind': 'trial',
+            'name': study.study_name,
+            'step': _current_step(),
+            'number': trial.number,
+            'state': trial.state.name,
+            'wall_s': trial.duration.total_seconds() if trial.duration is not None else None,
+            'value': trial.value,
+            'params': trial.params,
+        })
+
+
+def read_metrics(metrics_file):
+    """
+    Lit un fichier de mesures.
+
+    Returns:
+        list: Enregistrements (dict), dans l'ordre d'écriture.
+    """
+    with open(metrics_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _labels(**labels):
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"') for key, value in labels.items()}
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped.items()) + '}'
+
+
+def write_prometheus(records, output_file, prefix='pandaroux'):
+    """
+    Agrège les enregistrements par (étape, fonction) et les écrit au format texte de Prometheus.
+
+    Parameters:
+        records (list): Enregistrements (voir `read_metrics`).
+        output_file (str): Fichier .prom à écrire (remplacé de façon atomique).
+        prefix (str): Préfixe des noms de métriques.
+    """
+    counters = {
+        'calls_total': ('counter', "Nombre d'appels", None),
+        'wall_seconds_total': ('counter', "Temps réel cumulé (s)", 'wall_s'),
+        'cpu_seconds_total': ('counter', "Temps CPU du processus cumulé (s)", 'cpu_s'),
+        'rows_in_total': ('counter', "Lignes en entrée", 'rows_in'),
+        'rows_out_total': ('counter', "Lignes en sortie", 'rows_out'),
+        'bytes_read_total': ('counter', "Octets lus par le processus pendant les appels (/proc/self/io)", 'bytes_read'),
+        'bytes_written_total': ('counter', "Octets écrits par le processus pendant les appels (/proc/self/io)",
+                                'bytes_written'),
+        'peak_rss_bytes': ('gauge', "Pic de mémoire résidente du processus", 'peak_rss_mb'),
+    }
+    functions = {}
+    trials = {}
+    for record in records:
+        if record['kind'] == 'trial':
+            key = (record['name'], record['state'])
+            count, seconds = trials.get(key, (0, 0.0))
+            trials[key] = (count + 1, seconds + (record['wall_s'] or 0.0))
+            continue
+        key = (record['kind'], record.get('step') or '', record['name'])
+        values = functions.setdefault(key, dict.fromkeys(counters, 0.0))
+        for metric, (_, _, field) in counters.items():
+            if field is None:
+                values[metric] += 1
+            elif metric == 'peak_rss_bytes':
+                values[metric] = max(values[metric], (record.get(field) or 0) * 1024 * 1024)
+            else:
+                values[metric] += record.get(field) or 0
+
+    lines = []
+    for metric, (metric_type, description, _) in counters.items():
+        lines += [f'# HELP {prefix}_{metric} {description}', f'# TYPE {prefix}_{metric} {metric_type}']
+        for (kind, step, name), values in sorted(functions.items()):
+            lines.append(f'{prefix}_{metric}{_labels(kind=kind, step=step, name=name)} {values[metric]:g}')
+    lines += [f'# HELP {prefix}_optuna_trials_total Essais Optuna',
+              f'# TYPE {prefix}_optuna_trials_total counter']
+    lines += [f'{prefix}_optuna_trials_total{_labels(study=study, state=state)} {count}'
+              for (study, state), (count, _) in sorted(trials.items())]
+    lines += [f'# HELP {prefix}_optuna_trial_seconds_total Durée cumulée des essais Optuna (s)',
+              f'# TYPE {prefix}_optuna_trial_seconds_total counter']
+    lines += [f'{prefix}_optuna_trial_seconds_total{_labels(study=study, state=state)} {seconds:g}'
+              for (study, state), (_, seconds) in sorted(trials.items())]
+
+    tmp = output_file + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp, output_file)
+    return output_file
@@ -0,0 +1,203 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import joblib
+import xgboost as xgb
+
+from scripts.feature_schema_script import features_file_for
+from scripts.instrumentation_script import instrumented
+
+
+# Formats natifs XGBoost : UBJSON binaire (compact, rapide à charger) et JSON (ex : model/xgboost_model.json)
+NATIVE_EXTENSIONS = ('.ubj', '.json')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def metadata_file_for(model_file):
+    """
+    Chemin des métadonnées sauvegardées à côté d'un modèle (ex : models/ml_model.meta.json).
+    """
+    return os.path.splitext(model_file)[0] + '.meta.json'
+
+
+def holdout_file_for(model_file):
+    """
+    Chemin des probabilités du modèle sur son pli de validation final (ex : models/ml_model.holdout.parquet),
+    utilisées pour apprendre la combinaison des modèles (voir `scripts.ensemble_script`).
+    """
+    return os.path.splitext(model_file)[0] + '.holdout.parquet'
+
+
+def file_sha256(path, block_size=1 << 20):
+    """
+    Empreinte SHA-256 d'un fichier, lu par blocs.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@instrumented
+def save_model(model, model_file, metadata=None):
+    """
+    Sauvegarde un modèle XGBoost au format natif (UBJSON si l'extension est '.ubj') et ses métadonnées
+    dans un fichier JSON à côté. Les fichiers '.joblib' restent supportés pour compatibilité.
+
+    Parameters:
+        model (xgb.XGBClassifier): Modèle entraîné.
+        model_file (str): Chemin du modèle ('.ubj', '.json' ou '.joblib').
+        metadata (dict): Métadonnées à sauvegarder (caractéristiques, classes, métriques, empreinte des données...).
+    """
+    if os.path.splitext(model_file)[1] in NATIVE_EXTENSIONS:
+        model.save_model(model_file)
+    else:
+        joblib.dump(model, model_file)
+
+    metadata = {
+        'model_file': os.path.basename(model_file),
+        'xgboost_version': xgb.__version__,
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        **(metadata or {}),
+    }
+    with open(metadata_file_for(model_file), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+
+def _read_model(model_file):
+    if os.path.splitext(model_file)[1] in NATIVE_EXTENSIONS:
+        model = xgb.XGBClassifier()
+        model.load_model(model_file)
+        return model
+    return joblib.load(model_file)
+
+
+def load_model(model_file, use_cache=True):
+    """
+    Charge un modèle ('.ubj', '.json' dont model/xgboost_model.json, ou '.joblib').
+
+    Les modèles chargés sont gardés en cache dans le processus ; le cache est invalidé quand le fichier change.
+
+    Parameters:
+        model_file (str): Chemin du modèle.
+        use_cache (bool): Utiliser le cache du processus.
+
+    Returns:
+        xgb.XGBClassifier: Modèle chargé.
+    """
+    if not use_cache:
+        return _read_model(model_file)
+
+    key = os.path.abspath(model_file)
+    mtime = os.stat(model_file).st_mtime_ns
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, _read_model(model_file))
+            _cache[key] = cached
+    return cached[1]
+
+
+def load_metadata(model_file):
+    """
+    Charge les métadonnées d'un modèle (dictionnaire vide si elles n'existent pas).
+    """
+    path = metadata_file_for(model_file)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def versions_dir_for(model_file):
+    """
+    Dossier des versions archivées d'un modèle (ex : models/versions/ml_model/).
+    """
+    stem = os.path.splitext(os.path.basename(model_file))[0]
+    return os.path.join(os.path.dirname(model_file), 'versions', stem)
+
+
+def _model_files(model_file):
+    # Modèle, métadonnées, schéma des caractéristiques et prédictions de validation forment une version
+    return [model_file, metadata_file_for(model_file), features_file_for(model_file), holdout_file_for(model_file)]
+
+
+def list_model_versions(model_file):
+    """
+    Liste les versions archivées d'un modèle, de la plus ancienne à la plus récente.
+
+    Returns:
+        list: Dictionnaires {'version', 'created_at', 'accuracy'} (métadonnées de chaque version).
+    """
+    versions_dir = versions_dir_for(model_file)
+    if not os.path.isdir(versions_dir):
+        return []
+    versions = []
+    for name in sorted(os.listdir(versions_dir)):
+        if not name.startswith('v'):
+            continue
+        metadata = load_metadata(os.path.join(versions_dir, name, os.path.basename(model_file)))
+        versions.append({
+            'version': int(name[1:]),
+            'created_at': metadata.get('created_at'),
+            'accuracy': metadata.get('metrics', {}).get('accuracy'),
+        })
+    return versions
+
+
+@instrumented
+def archive_model(model_file):
+    """
+    Archive le modèle courant (et ses fichiers associés) comme nouvelle version avant qu'il ne soit remplacé.
+
+    Returns:
+        int: Numéro de la version créée (None si le modèle n'existe pas).
+    """
+    if not os.path.exists(model_file):
+        return None
+    versions = list_model_versions(model_file)
+    version = versions[-1]['version'] + 1 if versions else 1
+    version_dir = os.path.join(versions_dir_for(model_file), f'v{version:04d}')
+    os.makedirs(version_dir)
+    for path in _model_files(model_file):
+        if os.path.exists(path):
+            shutil.copy2(path, version_dir)
+    return version
+
+
+@instrumented
+def rollback_model(model_file, version=None):
+    """
+    Remet en place une version archivée du modèle. Le modèle courant est lui-même archivé au préalable,
+    ce qui permet d'annuler le retour arrière.
+
+    Parameters:
+        model_file (str): Chemin du modèle courant.
+        version (int): Version à restaurer (la dernière version archivée par défaut).
+
+    Returns:
+        int: Numéro de la version restaurée.
+    """
+    versions = [entry['version'] for entry in list_model_versions(model_file)]
+    if not versions:
+        raise FileNotFoundError(f"Aucune version archivée pour {model_file}")
+    version = versions[-1] if version is None else version
+    if version not in versions:
+        raise ValueError(f"Version inconnue : {version} (disponibles : {versions})")
+
+    version_dir = os.path.join(versions_dir_for(model_file), f'v{version:04d}')
+    archive_model(model_file)
+    for path in _model_files(model_file):
+        archived = os.path.join(version_dir, os.path.basename(path))
+        if os.path.exists(archived):
+            shutil.copyfile(archived, path)
+        elif os.path.exists(path):
+            os.remove(path)
+    return version
@@ -0,0 +1,299 @@
+"""
+Entraînement en lot de plusieurs datasets (villes, sous-ensembles de capteurs) décrits dans un manifeste JSON.
+
+Chaque dataset indique son fichier brut, ses mappings et, s'il s'agit d'un sous-ensemble de capteurs, la liste
+des colonnes conservées (sinon les colonnes sont choisies par corrélation avec la cible). Les datasets issus
+du même fichier brut avec les mêmes mappings partagent un seul nettoyage. Les tâches (nettoyage, préparation,
+recherche Optuna et entraînement) sont ordonnancées sur un pool de processus, avec un nombre de tâches
+simultanées et un budget de cœurs configurables. Chaque dataset a son dossier de sortie (données préparées,
+modèle, étude Optuna, figures et `metrics.json`).
+
+    {
+        "output_dir": "runs",
+        "defaults": {"n_trials": 50, "correlation_threshold": 0.05},
+        "datasets": [
+            {"name": "toulouse", "raw_file": "data/catastrophes_naturelles.csv"},
+            {"name": "toulouse_iot", "raw_file": "data/catastrophes_naturelles.csv",
+             "features": ["date", "quartier", "humidite", "sismicite", "catastrophe"]}
+        ]
+    }
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from scripts.instrumentation_script import instrumented
+
+# Une tâche du lot : `depends` liste les noms des tâches qui doivent être terminées avant elle
+Job = namedtuple('Job', ['name', 'kind', 'func', 'kwargs', 'depends'])
+
+DEFAULT_SETTINGS = {
+    'features': None,
+    'correlation_threshold': 0.05,
+    'correlation_score': 'pearson',
+    'temporal': {'lags': [1, 2, 3], 'windows': [3, 7, 14], 'aggregations': ['sum', 'mean', 'max']},
+    'n_trials': 100,
+    'search': 'optuna',
+    'n_splits': 4,
+}
+
+
+def dataset_paths(output_dir, name):
+    """
+    Fichiers produits pour un dataset, dans `<output_dir>/<name>/`.
+    """
+    directory = os.path.join(output_dir, name)
+    return {
+        'dir': directory,
+        'clean': os.path.join(directory, 'clean.parquet'),
+        'statistics': os.path.join(directory, 'statistics.parquet'),
+        'selection': os.path.join(directory, 'selected_features.json'),
+        'featured': os.path.join(directory, 'featured.parquet'),
+        'temporal_features': os.path.join(directory, 'temporal_features.json'),
+        'prepared': os.path.join(directory, 'reformed.parquet'),
+        'random_row': os.path.join(directory, 'random_row.parquet'),
+        'model': os.path.join(directory, 'model.ubj'),
+        'study': os.path.join(directory, 'optuna.db'),
+        'roc_curve': os.path.join(directory, 'output_roc_curve.png'),
+        'learning_curve': os.path.join(directory, 'learning_curve.png'),
+        'confusion_matrix': os.path.join(directory, 'output_matrice_conf.png'),
+        'metrics': os.path.join(directory, 'metrics.json'),
+    }
+
+
+@instrumented
+def clean_source(raw_file, output_file, mapping_cata, mapping_zone):
+    """
+    Validation puis nettoyage partagé d'un fichier brut : lignes corrigées, colonnes mappées et humidité
+    normalisée, sans sélection de colonnes (faite ensuite par chaque dataset). Les lignes rejetées par la
+    validation sont écrites dans `quarantine.csv`, à côté des données nettoyées et de `validation_report.json`.
+    """
+    from scripts.cleanig_data_script import CleaningPipeline
+    from scripts.data_quality_script import RawDataSchema, validate_raw_data
+
+    directory = os.path.dirname(output_file)
+    os.makedirs(directory, exist_ok=True)
+    validated_file = os.path.join(directory, 'validated.csv')
+    report = validate_raw_data(raw_file, validated_file, os.path.join(directory, 'quarantine.csv'),
+                               os.path.join(directory, 'validation_report.json'),
+                               RawDataSchema.from_mappings(mapping_cata, mapping_zone))
+    pipeline = CleaningPipeline.from_raw_csv(validated_file)
+    pipeline.map_column(mapping_cata, 'catastrophe').map_column(mapping_zone, 'quartier').normalize_humidity()
+    pipeline.save(output_file)
+    return {'rows': len(pipeline.data), 'rejected_rows': report['rejected_rows']}
+
+
+@instrumented
+def prepare_dataset(clean_file, paths, features=None, correlation_threshold=0.05, correlation_score='pearson',
+                    temporal=None):
+    """
+    Prépare un dataset à partir du nettoyage partagé, comme les étapes 1, 1 bis et 2 de main.py : sélection des
+    colonnes, caractéristiques temporelles par quartier et séparation d'une ligne aléatoire.
+
+    Parameters:
+        clean_file (str): Données nettoyées de la source (voir `clean_source`).
+        paths (dict): Fichiers du dataset (voir `dataset_paths`).
+        features (list): Colonnes conservées ; si absent, sélection par corrélation avec la cible.
+        correlation_threshold (float): Seuil de la sélection par corrélation.
+        correlation_score (str): Score de la sélection ('pearson', 'spearman' ou 'mutual_info').
+        temporal (dict): Paramètres de `TemporalFeatures` (lags, windows, aggregations).
+    """
+    from scripts.cleanig_data_script import CleaningPipeline, isolate_random_row
+    from scripts.feature_engineering_script import TemporalFeatures
+    from scripts.storage_script import read_table, write_table
+
+    pipeline = CleaningPipeline.from_csv(clean_file)
+    if features:
+        pipeline.keep_columns(features)
+    else:
+        pipeline.reduce_by_correlation(threshold=correlation_threshold, score=correlation_score)
+    pipeline.save(paths['clean'], statistics_file=paths['statistics'], selection_file=paths['selection'])
+
+    data = read_table(paths['clean'])
+    temporal_features = TemporalFeatures(**(temporal or {}))
+    write_table(temporal_features.transform(data), paths['featured'])
+    temporal_features.fit(data).save(paths['temporal_features'])
+
+    isolate_random_row(paths['featured'], paths['prepared'], paths['random_row'])
+    return {'rows': len(data), 'columns': list(data.columns)}
+
+
+@instrumented
+def train_dataset(name, paths, n_trials=100, n_jobs=None, n_splits=4, class_names=None, search='optuna'):
+    """
+    Recherche Optuna et entraînement du modèle d'un dataset, puis écriture de ses métriques dans `metrics.json`.
+    """
+    from scripts.ML_model_training_script import train_ml_model
+    from scripts.model_io_script import load_metadata
+
+    train_ml_model(paths['prepared'], paths['roc_curve'], paths['learning_curve'], paths['confusion_matrix'],
+                   output_model_file=paths['model'], n_trials=n_trials, n_jobs=n_jobs,
+                   storage=f"sqlite:///{paths['study']}", class_names=class_names, n_splits=n_splits,
+                   search=search)
+
+    metadata = load_metadata(paths['model'])
+    metrics = {
+        'dataset': name,
+        'model': paths['model'],
+        'features': metadata['features'],
+        'params': metadata['params'],
+        'validation': metadata['validation'],
+        'training_rows': metadata['training_data']['rows'],
+        'search': metadata.get('search'),
+        **{key: value for key, value in metadata['metrics'].items() if key != 'classification_report'},
+    }
+    with open(paths['metrics'], 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+    return {'accuracy': metrics['accuracy']}
+
+
+def _timed(func, kwargs):
+    start = time.perf_counter()
+    result = func(**kwargs)
+    return result, time.perf_counter() - start
+
+
+class BatchOrchestrator:
+    """
+    Ordonnanceur des tâches d'un manifeste de datasets.
+
+    Parameters:
+        manifest (dict): Manifeste (voir l'exemple du module) : 'datasets', et optionnellement 'output_dir'
+            et 'defaults' (paramètres communs à tous les datasets).
+        defaults (dict): Paramètres par défaut, remplacés par ceux du manifeste (ex : mappings de main.py).
+        output_dir (str): Dossier de sortie (remplace celui du manifeste, 'runs' par défaut).
+        concurrency (int): Nombre maximal de tâches simultanées.
+        cores (int): Nombre total de cœurs, répartis entre les entraînements simultanés (tous par défaut).
+        n_trials (int): Nombre d'essais Optuna pour tous les datasets (remplace celui du manifeste).
+    """
+
+    def __init__(self, manifest, defaults=None, output_dir=None, concurrency=None, cores=None, n_trials=None):
+        self.output_dir = output_dir or manifest.get('output_dir', 'runs')
+        self.cores = cores or os.cpu_count() or 1
+        self.concurrency = max(1, min(concurrency or max(1, self.cores // 4), self.cores))
+        self.datasets = self._resolve(manifest, defaults or {}, n_trials)
+
+    @classmethod
+    def from_file(cls, manifest_file, **kwargs):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    @staticmethod
+    def _resolve(manifest, defaults, n_trials):
+        settings = {**DEFAULT_SETTINGS, **defaults, **manifest.get('defaults', {})}
+        datasets = []
+        for entry in manifest.get('datasets', []):
+            dataset = {**settings, **entry}
+            if n_trials is not None:
+                dataset['n_trials'] = n_trials
+            missing = [key for key in ('name', 'raw_file', 'mapping_cata', 'mapping_zone') if key not in dataset]
+            if missing:
+                raise ValueError(f"Dataset {entry.get('name', entry)} : paramètres manquants {missing}")
+            if not re.fullmatch(r'[\w.-]+', dataset['name']):
+                raise ValueError(f"Nom de dataset invalide (utilisé comme dossier) : {dataset['name']!r}")
+            datasets.append(dataset)
+
+        names = [dataset['name'] for dataset in datasets]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Noms de datasets en double dans le manifeste : {duplicates}")
+        if not datasets:
+            raise ValueError("Le manifeste ne contient aucun dataset.")
+        return datasets
+
+    def _source_key(self, dataset):
+        """
+        Identifiant du nettoyage partagé : même fichier brut et mêmes mappings.
+        """
+        content = json.dumps([os.path.abspath(dataset['raw_file']), dataset['mapping_cata'], dataset['mapping_zone']],
+                             sort_keys=True)
+        stem = os.path.splitext(os.path.basename(dataset['raw_file']))[0]
+        return f"{stem}_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:8]}"
+
+    def plan(self):
+        """
+        Liste des tâches dans l'ordre des dépendances : un nettoyage par source, puis une préparation et un
+        entraînement par dataset.
+
+        Returns:
+            list: Tâches (`Job`).
+        """
+        cores_per_training = max(1, self.cores // self.concurrency)
+        cleaning, preparation, training = {}, [], []
+        for dataset in self.datasets:
+            source = self._source_key(dataset)
+            clean_file = os.path.join(self.output_dir, '_sources', source, 'clean.parquet')
+            if source not in cleaning:
+                cleaning[source] = Job(f'clean:{source}', 'clean', clean_source,
+                                       dict(raw_file=dataset['raw_file'], output_file=clean_file,
+                                            mapping_cata=dataset['mapping_cata'],
+                                            mapping_zone=dataset['mapping_zone']), ())
+
+            name = dataset['name']
+            paths = dataset_paths(self.output_dir, name)
+            preparation.append(Job(f'prepare:{name}', 'prepare', prepare_dataset,
+                                   dict(clean_file=clean_file, paths=paths, features=dataset['features'],
+                                        correlation_threshold=dataset['correlation_threshold'],
+                                        correlation_score=dataset['correlation_score'],
+                                        temporal=dataset['temporal']), (f'clean:{source}',)))
+            training.append(Job(f'train:{name}', 'train', train_dataset,
+                                dict(name=name, paths=paths, n_trials=dataset['n_trials'], n_jobs=cores_per_training,
+                                     n_splits=dataset['n_splits'], class_names=dataset['mapping_cata'],
+                                     search=dataset['search']),
+                                (f'prepare:{name}',)))
+        return [*cleaning.values(), *preparation, *training]
+
+    @instrumented
+    def run(self):
+        """
+        Exécute toutes les tâches, au plus `concurrency` à la fois, dès que leurs dépendances sont terminées.
+        Une tâche en échec n'arrête pas le lot : les tâches qui en dépendent sont ignorées.
+
+        Returns:
+            dict: Résumé par tâche (état, durée, résultat ou erreur), aussi écrit dans `<output_dir>/summary.json`.
+        """
+        jobs = self.plan()
+        for dataset in self.datasets:
+            os.makedirs(dataset_paths(self.output_dir, dataset['name'])['dir'], exist_ok=True)
+        print(f"{len(self.datasets)} datasets, {len(jobs)} tâches : {self.concurrency} à la fois sur "
+              f"{self.cores} cœurs ({max(1, self.cores // self.concurrency)} par entraînement)")
+
+        summary = {}
+        pending = list(jobs)
+        running = {}
+        with ProcessPoolExecutor(max_workers=self.concurrency) as executor:
+            while pending or running:
+                for job in list(pending):
+                    if len(running) >= self.concurrency:
+                        break
+                    states = [summary.get(dependency, {}).get('status') for dependency in job.depends]
+                    if any(state in ('failed', 'skipped') for state in states):
+                        summary[job.name] = {'status': 'skipped'}
+                        pending.remove(job)
+                    elif all(state == 'done' for state in states):
+                        print(f"Lancement de {job.name}...")
+                        running[executor.submit(_timed, job.func, job.kwargs)] = job
+                        pending.remove(job)
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Dépendances introuvables : {[job.name for job in pending]}")
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        result, seconds = future.result()
+                        summary[job.name] = {'status': 'done', 'seconds': seconds, **result}
+                        print(f"{job.name} terminé en {seconds:.1f} s")
+                    except Exception as error:
+                        summary[job.name] = {'status': 'failed', 'error': repr(error)}
+                        print(f"{job.name} en échec : {error!r}")
+
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        return summary
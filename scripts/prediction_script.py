@@ -1,66 +1,126 @@
+import os
 import pandas as pd
-import xgboost as xgb
-import joblib
 from io import StringIO  # Importer StringIO depuis io
+from scripts.storage_script import read_table
+from scripts.feature_engineering_script import TemporalFeatures
+from scripts.feature_schema_script import load_feature_transformer
+from scripts.model_io_script import load_model
+from scripts.instrumentation_script import instrumented
 
 # Fonction pour pré-traiter les données avant la prédiction
-def preprocess_data(df):
-    # Vérifier si df est un DataFrame
-    if isinstance(df, pd.DataFrame):
-        # Conversion de la colonne 'date' en un format numérique (nombre de jours depuis la date min)
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
-            df['date'] = (df['date'] - df['date'].min()).dt.days  # Convertir en nombre de jours depuis la date min
+def preprocess_data(df, transformer):
+    """
+    Convertit un lot de lignes en matrice float32 avec le schéma des caractéristiques sauvegardé à l'entraînement
+    (ordre des colonnes, origine des dates). Le résultat ne dépend pas de la composition du lot.
 
-        # Convertir toutes les colonnes en numériques, forcer les erreurs en NaN
-        df = df.apply(pd.to_numeric, errors='coerce')  # Cela convertit toutes les colonnes en numérique, les autres en NaN
+    Parameters:
+        df (pd.DataFrame): Lignes à prédire.
+        transformer (FeatureTransformer): Schéma des caractéristiques du modèle.
 
-        # Supprimer les lignes avec des valeurs manquantes après la conversion
-        df = df.dropna()
+    Returns:
+        TransformResult: (features, index des lignes conservées, rejets avec leur motif)
+    """
+    result = transformer.transform(df)
+    if len(result.rejected):
+        print(f"{len(result.rejected)} ligne(s) rejetée(s) :\n{result.rejected}")
+    return result
 
-        return df
-    else:
-        raise ValueError("L'entrée doit être un DataFrame.")
+def _read_rows(rows, name='rows'):
+    """
+    Lignes à prédire : DataFrame, chemin d'un fichier (CSV, Parquet ou Arrow) ou texte CSV.
+    """
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    if not isinstance(rows, str):
+        raise ValueError(f"{name} doit être un DataFrame, un chemin de fichier ou un texte CSV.")
+    if os.path.exists(rows):
+        # Chemin de fichier (CSV, Parquet ou Arrow)
+        return read_table(rows)
+    try:
+        # Chaîne de caractères lue comme un CSV
+        return pd.read_csv(StringIO(rows))
+    except Exception as e:
+        raise ValueError(f"Erreur lors de la lecture de {name} : {e}")
+
+def _add_temporal_features(rows, temporal_features_file):
+    """
+    Calcule les caractéristiques temporelles des lignes brutes à partir de l'état glissant sauvegardé par l'étape
+    1 bis (les lignes d'un dataset préparé les ont déjà et sont renvoyées telles quelles).
+    """
+    if temporal_features_file is None or not os.path.exists(temporal_features_file):
+        return rows
+    return TemporalFeatures.load(temporal_features_file).complete(rows)
 
 # Fonction de prédiction avec le modèle ML
-def perform_prediction(random_row, random_row_iot, ml_model_file, ml_model_file_iot):
-    # Assurer que random_row est un DataFrame
-    if isinstance(random_row, str):
-        # Si random_row est une chaîne de caractères, la convertir en DataFrame
-        try:
-            random_row = pd.read_csv(StringIO(random_row))  # Utiliser StringIO pour lire la chaîne comme un CSV
-        except Exception as e:
-            raise ValueError(f"Erreur lors de la lecture de random_row : {e}")
-
-    if isinstance(random_row_iot, str):
-        # Si random_row_iot est une chaîne de caractères, la convertir en DataFrame
-        try:
-            random_row_iot = pd.read_csv(StringIO(random_row_iot))  # Utiliser StringIO pour lire la chaîne comme un CSV
-        except Exception as e:
-            raise ValueError(f"Erreur lors de la lecture de random_row_iot : {e}")
-
-    # Assurer que random_row est un DataFrame à ce point
-    if not isinstance(random_row, pd.DataFrame) or not isinstance(random_row_iot, pd.DataFrame):
-        raise ValueError("random_row et random_row_iot doivent être des DataFrame.")
-
-    # Charger le modèle de base avec joblib (si enregistré avec joblib)
-    base_ml_model = joblib.load(ml_model_file)
-
-    # Pré-traiter la ligne isolée (random_row)
-    random_row = preprocess_data(random_row)
-
-    # Pré-traiter la ligne isolée (random_row_iot)
-    random_row_iot = preprocess_data(random_row_iot)
+@instrumented
+def perform_prediction(random_row, random_row_iot, ml_model_file, ml_model_file_iot, temporal_features_file=None,
+                       temporal_features_file_iot=None):
+    # Lignes à prédire : DataFrame, chemin de fichier ou texte CSV
+    random_row = _add_temporal_features(_read_rows(random_row, 'random_row'), temporal_features_file)
+    random_row_iot = _add_temporal_features(_read_rows(random_row_iot, 'random_row_iot'), temporal_features_file_iot)
+
+    # Charger le modèle de base (format natif '.ubj'/'.json' ou '.joblib', gardé en cache dans le processus)
+    base_ml_model = load_model(ml_model_file)
+
+    # Pré-traiter la ligne isolée (random_row) avec le schéma sauvegardé à l'entraînement
+    random_row = preprocess_data(random_row, load_feature_transformer(ml_model_file, base_ml_model))
+    if not len(random_row.features):
+        raise ValueError("Aucune ligne valide à prédire pour le modèle de base.")
 
     # Prédiction avec le modèle de base
-    base_ml_prediction = base_ml_model.predict(random_row)[0]
+    base_ml_prediction = base_ml_model.predict(random_row.features)[0]
     print(f"Prédiction avec le modèle ML de base : {base_ml_prediction}")
 
     # Charger et pré-traiter les données IoT
-    iot_model = joblib.load(ml_model_file_iot)
+    iot_model = load_model(ml_model_file_iot)
+    random_row_iot = preprocess_data(random_row_iot, load_feature_transformer(ml_model_file_iot, iot_model))
+    if not len(random_row_iot.features):
+        raise ValueError("Aucune ligne valide à prédire pour le modèle IoT.")
 
     # Prédiction avec le modèle IoT
-    iot_ml_prediction = iot_model.predict(random_row_iot)[0]
+    iot_ml_prediction = iot_model.predict(random_row_iot.features)[0]
     print(f"Prédiction avec le modèle IoT : {iot_ml_prediction}")
 
     return base_ml_prediction, iot_ml_prediction
+
+
+@instrumented
+def perform_ensemble_prediction(rows, rows_iot, ensemble_file, weights=None, key_columns=('date', 'quartier'),
+                                temporal_files=None):
+    """
+    Prédiction d'ensemble : les lignes des deux datasets sont réunies sur (date, quartier), puis évaluées en
+    parallèle par le modèle de base et le modèle IoT, dont les probabilités sont combinées (voir
+    `scripts.ensemble_script`). Les lignes sans les mesures du modèle de base sont prédites par le modèle IoT.
+
+    Parameters:
+        rows: Lignes du dataset de base (DataFrame, fichier ou texte CSV).
+        rows_iot: Lignes du dataset IoT (même format, optionnel si `rows` contient déjà leurs colonnes).
+        ensemble_file (str): Configuration de l'ensemble (voir `fit_ensemble`).
+        weights (dict): Poids {'base': ..., 'iot': ...} : moyenne pondérée au lieu de la couche de stacking.
+        temporal_files (dict): État des caractéristiques temporelles de chaque modèle {'base': ..., 'iot': ...},
+            utilisé pour les lignes brutes (voir `TemporalFeatures.complete`).
+
+    Returns:
+        EnsembleResult: (probabilités, codes des classes, source de chaque ligne)
+    """
+    # Import local : la prédiction simple n'a pas besoin de scikit-learn (couche de stacking)
+    from scripts.ensemble_script import EnsemblePredictor
+
+    rows = _read_rows(rows)
+    if rows_iot is not None:
+        rows_iot = _read_rows(rows_iot, 'rows_iot')
+        keys = [column for column in key_columns if column in rows.columns and column in rows_iot.columns]
+        extra = [column for column in rows_iot.columns if column not in rows.columns]
+        rows = rows.merge(rows_iot[[*keys, *extra]], on=keys, how='outer') if keys else rows.join(rows_iot[extra])
+
+    options = {'weights': weights, 'method': 'weights'} if weights else {}
+    if temporal_files:
+        options['temporal_files'] = temporal_files
+    with EnsemblePredictor.load(ensemble_file, **options) as ensemble:
+        result = ensemble.predict_proba(rows)
+
+    labels = result.classes[result.probabilities.argmax(axis=1)]
+    for label, source, probabilities in zip(labels, result.sources, result.probabilities):
+        details = ', '.join(f"{code}: {probability:.3f}" for code, probability in zip(result.classes, probabilities))
+        print(f"Prédiction de l'ensemble ({ensemble.method}, {source}) : {label} [{details}]")
+    return result
@@ -0,0 +1,335 @@
+"""
+Serveur de prédiction : garde les modèles de base et IoT chargés en mémoire, les recharge quand leur fichier
+change, et regroupe les requêtes concurrentes en un seul appel vectorisé à `predict_proba`.
+
+Usage (depuis la racine du projet) :
+    python -m scripts.prediction_server_script --port 8000
+    python -m scripts.prediction_server_script --unix-socket /tmp/prediction.sock
+
+Requête (mesures du jour : les caractéristiques temporelles sont calculées à partir de l'état glissant sauvegardé
+par l'étape 1 bis, data/temporal_features*.json) :
+    POST /predict/base  {"rows": [{"date": "2024-06-01", "quartier": 1, "humidite": 0.75, ...}, ...]}
+Réponse (null pour les lignes rejetées, 422 si aucune ligne n'est valide) :
+    {"model": "base", "classes": [0, 1, 2, 3], "probabilities": [[0.9, 0.05, 0.03, 0.02], null, ...],
+     "rejected": [{"row": 1, "reason": "valeurs invalides : humidite"}]}
+"""
+import argparse
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from scripts.feature_engineering_script import TemporalFeatures
+from scripts.feature_schema_script import features_file_for, load_feature_transformer
+from scripts.model_io_script import load_model
+
+# Modèle servi : modèle, schéma de ses caractéristiques et état des caractéristiques temporelles (None si le
+# fichier d'état n'existe pas)
+ServedModel = namedtuple('ServedModel', ['model', 'transformer', 'temporal_features'])
+
+
+class ModelRegistry:
+    """
+    Modèles, leur schéma de caractéristiques et l'état de leurs caractéristiques temporelles, chargés une seule
+    fois et rechargés ensemble quand l'un de ces fichiers est modifié. Si le rechargement échoue (ex : modèle
+    écrit avant son schéma), la version précédente reste servie jusqu'à la prochaine modification des fichiers.
+
+    Parameters:
+        model_files (dict): Correspondance {nom du modèle: chemin du fichier}.
+        temporal_files (dict): Correspondance {nom du modèle: état des caractéristiques temporelles}
+            (voir `TemporalFeatures`) ; les lignes d'un modèle sans état sont transformées telles quelles.
+    """
+
+    def __init__(self, model_files, temporal_files=None):
+        self.model_files = dict(model_files)
+        self.temporal_files = dict(temporal_files or {})
+        self._entries = {}
+        self._states = {}
+        self._lock = threading.Lock()
+        for name in self.model_files:
+            self.entry(name)
+
+    def _file_state(self, name):
+        path = self.model_files[name]
+        optional = [features_file_for(path), self.temporal_files.get(name)]
+        return (os.stat(path).st_mtime_ns,
+                *(os.stat(other).st_mtime_ns if other and os.path.exists(other) else None for other in optional))
+
+    def _load(self, name):
+        path = self.model_files[name]
+        model = load_model(path)
+        temporal_file = self.temporal_files.get(name)
+        temporal_features = TemporalFeatures.load(temporal_file) \
+            if temporal_file and os.path.exists(temporal_file) else None
+        return ServedModel(model, load_feature_transformer(path, model), temporal_features)
+
+    def entry(self, name):
+        """
+        Renvoie le modèle servi demandé (`ServedModel`), rechargé si l'un de ses fichiers a changé depuis le
+        dernier chargement.
+        """
+        state = self._file_state(name)
+        if self._states.get(name) != state:
+            with self._lock:
+                if self._states.get(name) != state:
+                    path = self.model_files[name]
+                    print(f"Chargement du modèle '{name}' depuis {path}...")
+                    try:
+                        entry = self._load(name)
+                    except Exception as e:
+                        if name not in self._entries:
+                            raise
+                        print(f"Échec du rechargement du modèle '{name}' ({e}), version précédente conservée.")
+                    else:
+                        self._entries[name] = entry
+                    # Un échec n'est pas retenté avant la prochaine modification des fichiers
+                    self._states[name] = state
+        return self._entries[name]
+
+    def get(self, name):
+        """
+        Renvoie le modèle demandé (voir `entry`).
+        """
+        return self.entry(name).model
+
+    def transformer(self, name):
+        """
+        Renvoie le schéma des caractéristiques du modèle demandé (voir `entry`).
+        """
+        return self.entry(name).transformer
+
+    def status(self):
+        return {name: {'file': path, 'mtime_ns': self._states.get(name, (None,))[0]}
+                for name, path in self.model_files.items()}
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes concurrentes adressées à un modèle : un thread attend jusqu'à `max_wait_ms`
+    (ou `max_batch_rows` lignes) puis exécute un seul `predict_proba` sur toutes les lignes reçues.
+
+    Chaque requête est soumise avec le modèle dont le schéma a construit ses lignes : un lot reçu pendant un
+    rechargement est prédit par groupes, chaque groupe avec son propre modèle.
+
+    Parameters:
+        max_batch_rows (int): Nombre maximal de lignes par lot.
+        max_wait_ms (float): Attente maximale pour compléter un lot.
+    """
+
+    def __init__(self, max_batch_rows=10_000, max_wait_ms=5):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, model, features):
+        """
+        Ajoute des lignes au prochain lot.
+
+        Parameters:
+            model: Modèle qui prédit ces lignes (celui du schéma qui les a transformées).
+            features (np.ndarray): Lignes à prédire, déjà transformées avec le schéma du modèle.
+
+        Returns:
+            Future: Résultat (probabilités de chaque classe pour ces lignes).
+        """
+        future = Future()
+        self._queue.put((model, features, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while n_rows < self.max_batch_rows:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            # Les lignes ne sont réunies qu'entre requêtes transformées par le même modèle
+            groups = {}
+            for model, features, future in self._next_batch():
+                groups.setdefault(id(model), (model, []))[1].append((features, future))
+            for model, requests in groups.values():
+                self._predict(model, requests)
+
+    def _predict(self, model, requests):
+        try:
+            probabilities = model.predict_proba(np.concatenate([features for features, _ in requests]))
+        except Exception as e:
+            # Une erreur sur le lot : chaque requête est rejouée seule pour isoler la requête fautive
+            if len(requests) > 1:
+                for features, future in requests:
+                    self._predict_single(model, features, future)
+            else:
+                requests[0][1].set_exception(e)
+            return
+
+        start = 0
+        for features, future in requests:
+            future.set_result(probabilities[start:start + len(features)])
+            start += len(features)
+
+    def _predict_single(self, model, features, future):
+        try:
+            future.set_result(model.predict_proba(features))
+        except Exception as e:
+            future.set_exception(e)
+
+
+class PredictionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Point d'accès HTTP : POST /predict/<modèle>, GET /health.
+    """
+    server_version = 'PredictionServer/1.0'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'models': self.server.registry.status()})
+        else:
+            self._send_json(404, {'error': f"Chemin inconnu : {self.path}"})
+
+    def do_POST(self):
+        prefix = '/predict/'
+        name = self.path[len(prefix):] if self.path.startswith(prefix) else None
+        if name not in self.server.batchers:
+            self._send_json(404, {'error': f"Modèle inconnu : {name}"})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            rows = pd.DataFrame(payload['rows'])
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            model, transformer, temporal_features = self.server.registry.entry(name)
+            if temporal_features is not None:
+                # Caractéristiques temporelles des lignes brutes, à partir des derniers jours de chaque quartier
+                rows = temporal_features.complete(rows)
+            # Les lignes rejetées ne sont pas prédites : elles sont signalées avec leur motif
+            result = transformer.transform(rows)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+
+        rejected = [{'row': int(row), 'reason': reason} for row, reason in result.rejected['reason'].items()]
+        if not len(result.features):
+            self._send_json(422, {'error': "Aucune ligne valide à prédire.", 'rejected': rejected})
+            return
+
+        try:
+            # Le modèle prédit les lignes construites par son propre schéma, même en cas de rechargement entre-temps
+            probabilities = self.server.batchers[name].submit(model, result.features).result()
+        except Exception as e:
+            # Les lignes sont déjà au format du schéma : une erreur de prédiction vient du serveur ; la connexion
+            # reçoit une réponse dans tous les cas
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+
+        # Une entrée par ligne reçue, dans l'ordre : null pour les lignes rejetées
+        by_row = [None] * len(rows)
+        for position, row_probabilities in zip(rows.index.get_indexer(result.index), probabilities.tolist()):
+            by_row[position] = row_probabilities
+        self._send_json(200, {
+            'model': name,
+            'classes': [int(c) for c in model.classes_],
+            'probabilities': by_row,
+            'rejected': rejected,
+        })
+
+    def address_string(self):
+        # Les clients d'un socket Unix n'ont pas d'adresse IP
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(model_files, host='127.0.0.1', port=8000, unix_socket=None, max_batch_rows=10_000,
+                  max_wait_ms=5, quiet=False, temporal_files=None):
+    """
+    Crée le serveur de prédiction (HTTP sur TCP ou sur socket Unix).
+
+    Parameters:
+        model_files (dict): Correspondance {nom du modèle: chemin du fichier}.
+        host (str): Adresse d'écoute TCP.
+        port (int): Port TCP.
+        unix_socket (str): Chemin d'un socket Unix (remplace l'écoute TCP si renseigné).
+        max_batch_rows (int): Nombre maximal de lignes par lot de prédiction.
+        max_wait_ms (float): Attente maximale pour regrouper les requêtes.
+        quiet (bool): Ne pas journaliser chaque requête.
+        temporal_files (dict): Correspondance {nom du modèle: état des caractéristiques temporelles}.
+
+    Returns:
+        socketserver.BaseServer: Serveur prêt à être lancé avec `serve_forever()`.
+    """
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, PredictionRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), PredictionRequestHandler)
+
+    server.registry = ModelRegistry(model_files, temporal_files)
+    server.batchers = {name: MicroBatcher(max_batch_rows, max_wait_ms) for name in model_files}
+    server.quiet = quiet
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-model', default='models/ml_model.ubj')
+    parser.add_argument('--iot-model', default='models/ml_model_iot.ubj')
+    parser.add_argument('--base-temporal-features', default='data/temporal_features.json')
+    parser.add_argument('--iot-temporal-features', default='data/temporal_features_iot.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix-socket')
+    parser.add_argument('--max-batch-rows', type=int, default=10_000)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+
+    server = create_server({'base': args.base_model, 'iot': args.iot_model}, args.host, args.port, args.unix_socket,
+                           args.max_batch_rows, args.max_wait_ms, args.quiet,
+                           {'base': args.base_temporal_features, 'iot': args.iot_temporal_features})
+    print(f"Serveur de prédiction démarré sur {args.unix_socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,271 @@
+"""
+Rendu des figures (matrices de confusion, courbes ROC, courbes d'apprentissage, heatmaps de corrélation)
+hors du thread d'entraînement : chaque figure est décrite par un dictionnaire de données (sérialisable),
+puis dessinée par un pool de processus avec le backend non interactif 'Agg', en PNG séparés ou dans un seul
+rapport HTML.
+
+    renderer = ReportRenderer(html_file='docs/report.html')
+    renderer.submit(confusion_matrix_figure(cm, labels, 'docs/output_matrice_conf.png', section='ml_model'))
+    renderer.close()
+"""
+import base64
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+# Jamais de fenêtre : les nœuds d'entraînement n'ont pas d'affichage
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from scripts.instrumentation_script import instrumented
+
+
+def confusion_matrix_figure(cm, labels, output_file, title='Matrice de confusion', section=None):
+    """
+    Description d'une matrice de confusion à dessiner.
+
+    Parameters:
+        cm (array): Matrice de confusion.
+        labels (list): Étiquettes des classes.
+        output_file (str): Chemin de l'image.
+        title (str): Titre de la figure.
+        section (str): Section du rapport HTML (ex : nom du modèle).
+    """
+    return {'kind': 'confusion_matrix', 'output_file': output_file, 'title': title, 'section': section,
+            'cm': np.asarray(cm), 'labels': list(labels)}
+
+
+def roc_figure(y_true, y_proba, classes, output_file, title='ROC Curve (One-vs-Rest)', max_points=1000,
+               section=None):
+    """
+    Description des courbes ROC (une par classe et moyenne micro) à dessiner. Les courbes sont calculées
+    au moment du rendu et sous-échantillonnées à `max_points` points pour les grands jeux de test ; les AUC
+    sont calculées sur les courbes complètes.
+
+    Parameters:
+        y_true (array): Classes réelles.
+        y_proba (array): Probabilités prédites pour chaque classe.
+        classes (list): Classes, dans l'ordre des colonnes de `y_proba`.
+        output_file (str): Chemin de l'image.
+        max_points (int): Nombre maximal de points tracés par courbe.
+    """
+    return {'kind': 'roc', 'output_file': output_file, 'title': title, 'section': section,
+            'y_true': np.asarray(y_true), 'y_proba': np.asarray(y_proba, dtype=np.float32),
+            'classes': list(classes), 'max_points': max_points}
+
+
+def learning_curve_figure(x_values, train_scores, valid_scores, output_file, title="Courbe d'apprentissage",
+                          x_label='Boosting Iterations', section=None):
+    """
+    Description d'une courbe d'apprentissage déjà calculée (voir `learning_curve_from_history` et
+    `compute_learning_curve`).
+    """
+    return {'kind': 'learning_curve', 'output_file': output_file, 'title': title, 'section': section,
+            'x_values': np.asarray(x_values), 'train_scores': np.asarray(train_scores),
+            'valid_scores': np.asarray(valid_scores), 'x_label': x_label}
+
+
+def correlation_figure(matrix, output_file, title='Matrice de corrélation des variables', section=None):
+    """
+    Description d'une heatmap de corrélation.
+
+    Parameters:
+        matrix (pd.DataFrame): Matrice de corrélation.
+    """
+    return {'kind': 'correlation', 'output_file': output_file, 'title': title, 'section': section,
+            'matrix': matrix}
+
+
+def downsample_curve(x, y, max_points):
+    """
+    Réduit une courbe à au plus `max_points` points répartis régulièrement, extrémités conservées.
+    """
+    if len(x) <= max_points:
+        return x, y
+    index = np.unique(np.linspace(0, len(x) - 1, max_points).round().astype(int))
+    return x[index], y[index]
+
+
+def _draw_confusion_matrix(figure):
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    ConfusionMatrixDisplay(figure['cm'], display_labels=figure['labels']).plot()
+    plt.title(figure['title'])
+
+
+def _draw_roc(figure):
+    from sklearn.metrics import roc_auc_score, roc_curve
+    from sklearn.preprocessing import label_binarize
+
+    y_true_bin = label_binarize(figure['y_true'], classes=figure['classes'])
+    y_proba = figure['y_proba']
+    max_points = figure['max_points']
+
+    plt.figure()
+    for i, class_label in enumerate(figure['classes']):
+        if y_true_bin[:, i].min() == y_true_bin[:, i].max():
+            # Classe absente (ou seule présente) du jeu de test : pas de courbe ROC définie
+            continue
+        fpr, tpr, _ = roc_curve(y_true_bin[:, i], y_proba[:, i])
+        auc_score = roc_auc_score(y_true_bin[:, i], y_proba[:, i])
+        plt.plot(*downsample_curve(fpr, tpr, max_points), label=f"Classe {class_label} (AUC={auc_score:.2f})")
+
+    # Moyenne micro
+    fpr_micro, tpr_micro, _ = roc_curve(y_true_bin.ravel(), y_proba.ravel())
+    auc_micro = roc_auc_score(y_true_bin, y_proba, average='micro')
+    plt.plot(*downsample_curve(fpr_micro, tpr_micro, max_points), linestyle='--',
+             label=f"Micro-average (AUC={auc_micro:.2f})")
+
+    plt.plot([0, 1], [0, 1], 'k--', label="Random Guess")
+    plt.xlabel("False Positive Rate")
+    plt.ylabel("True Positive Rate")
+    plt.title(figure['title'])
+    plt.legend()
+    plt.grid()
+
+
+def _draw_learning_curve(figure):
+    plt.figure()
+    plt.plot(figure['x_values'], figure['train_scores'], label="Training Accuracy")
+    plt.plot(figure['x_values'], figure['valid_scores'], label="Validation Accuracy")
+    plt.title(figure['title'])
+    plt.xlabel(figure['x_label'])
+    plt.ylabel("Accuracy")
+    plt.legend()
+    plt.grid()
+
+
+def _draw_correlation(figure):
+    import seaborn as sns
+
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(figure['matrix'], cmap='coolwarm', annot=False, fmt='.2f')
+    plt.title(figure['title'])
+
+
+_DRAW = {
+    'confusion_matrix': _draw_confusion_matrix,
+    'roc': _draw_roc,
+    'learning_curve': _draw_learning_curve,
+    'correlation': _draw_correlation,
+}
+
+
+@instrumented
+def render_figure(figure, to_bytes=False):
+    """
+    Dessine une figure et l'enregistre dans son fichier, ou renvoie l'image PNG en mémoire.
+
+    Parameters:
+        figure (dict): Description de la figure (voir `*_figure`).
+        to_bytes (bool): Renvoyer le PNG au lieu de l'écrire dans `figure['output_file']`.
+
+    Returns:
+        str | bytes: Chemin de l'image, ou contenu PNG.
+    """
+    try:
+        _DRAW[figure['kind']](figure)
+        if to_bytes:
+            buffer = io.BytesIO()
+            plt.savefig(buffer, format='png')
+            return buffer.getvalue()
+        plt.savefig(figure['output_file'])
+        return figure['output_file']
+    finally:
+        plt.close('all')
+
+
+class ReportRenderer:
+    """
+    Rend les figures en arrière-plan dans un pool de processus, pendant que le programme continue.
+
+    Parameters:
+        n_jobs (int): Nombre de processus de rendu (au plus un par figure, 4 par défaut).
+        html_file (str): Si renseigné, les figures sont regroupées dans ce rapport HTML (images intégrées)
+            au lieu d'être enregistrées en PNG séparés.
+        title (str): Titre du rapport HTML.
+    """
+
+    def __init__(self, n_jobs=None, html_file=None, title="Rapport d'entraînement"):
+        self.n_jobs = n_jobs or min(4, os.cpu_count() or 1)
+        self.html_file = html_file
+        self.title = title
+        self._executor = None
+        self._pending = []
+
+    def submit(self, figure):
+        """
+        Ajoute une figure à rendre.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_jobs)
+        future = self._executor.submit(render_figure, figure, self.html_file is not None)
+        self._pending.append((figure, future))
+        return future
+
+    def submit_all(self, figures):
+        for figure in figures:
+            self.submit(figure)
+
+    def close(self):
+        """
+        Attend la fin du rendu et écrit le rapport HTML si demandé.
+
+        Returns:
+            list: Fichiers écrits.
+        """
+        results = [(figure, future.result()) for figure, future in self._pending]
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._pending = []
+
+        if self.html_file is None:
+            for output_file in (result for _, result in results):
+                print(f"Figure sauvegardée sous : {output_file}")
+            return [result for _, result in results]
+
+        self._write_html(results)
+        print(f"Rapport sauvegardé sous : {self.html_file}")
+        return [self.html_file]
+
+    def _write_html(self, results):
+        parts = [f"<!DOCTYPE html>\n<html lang=\"fr\">\n<head><meta charset=\"utf-8\">"
+                 f"<title>{html.escape(self.title)}</title></head>\n<body>\n<h1>{html.escape(self.title)}</h1>"]
+        section = None
+        for figure, png in results:
+            if figure.get('section') != section:
+                section = figure.get('section')
+                if section:
+                    parts.append(f"<h2>{html.escape(section)}</h2>")
+            image = base64.b64encode(png).decode('ascii')
+            parts.append(f"<figure><img alt=\"{html.escape(figure['title'])}\" src=\"data:image/png;base64,{image}\">"
+                         f"<figcaption>{html.escape(figure['title'])}</figcaption></figure>")
+        parts.append("</body>\n</html>\n")
+        os.makedirs(os.path.dirname(self.html_file) or '.', exist_ok=True)
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(parts))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@instrumented
+def render_figures(figures, n_jobs=None, html_file=None):
+    """
+    Rend une liste de figures en parallèle (PNG séparés ou rapport HTML unique).
+
+    Returns:
+        list: Fichiers écrits.
+    """
+    renderer = ReportRenderer(n_jobs=n_jobs, html_file=html_file)
+    renderer.submit_all(figures)
+    return renderer.close()
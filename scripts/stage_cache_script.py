@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from scripts.instrumentation_script import instrumented
+from scripts.model_io_script import file_sha256
+
+
+class StageCache:
+    """
+    Cache des étapes du pipeline, indexé par le contenu de leurs entrées.
+
+    L'empreinte d'une étape combine le contenu de ses fichiers d'entrée, le code des modules dont elle dépend
+    et ses paramètres (mappings, colonnes conservées, seuils, nombre d'essais...). Si l'empreinte a déjà été
+    calculée, les fichiers de sortie sont restaurés depuis le cache au lieu de relancer l'étape. Les sorties
+    sont stockées par contenu dans `<cache_dir>/objects/`, ce qui permet de revenir à un jeu de paramètres
+    précédent sans recalcul. Seules les `max_entries` exécutions les plus récemment utilisées de chaque étape
+    sont gardées ; les objets qu'aucune exécution gardée ne référence sont supprimés.
+
+    Parameters:
+        cache_dir (str): Dossier du cache.
+        enabled (bool): Désactive le cache (les étapes sont toujours exécutées) si False.
+        max_entries (int): Nombre d'exécutions gardées par étape.
+    """
+
+    def __init__(self, cache_dir='.cache', enabled=True, max_entries=5):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._hashes_file = os.path.join(cache_dir, 'file_hashes.json')
+        self._hashes = None
+
+    def _objects_dir(self):
+        return os.path.join(self.cache_dir, 'objects')
+
+    def _manifest_file(self, stage):
+        return os.path.join(self.cache_dir, f'{stage}.json')
+
+    def _read_json(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    def file_hash(self, path):
+        """
+        Empreinte SHA-256 d'un fichier. Les empreintes sont mémorisées selon (taille, date de modification)
+        pour ne pas relire les gros fichiers inchangés à chaque exécution.
+        """
+        if self._hashes is None:
+            self._hashes = self._read_json(self._hashes_file)
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        cached = self._hashes.get(key)
+        if cached is not None and cached['signature'] == signature:
+            return cached['sha256']
+        sha256 = file_sha256(path)
+        self._hashes[key] = {'signature': signature, 'sha256': sha256}
+        return sha256
+
+    def fingerprint(self, stage, inputs=(), params=None, code_files=()):
+        """
+        Calcule l'empreinte d'une étape.
+
+        Parameters:
+            stage (str): Nom de l'étape.
+            inputs (list): Fichiers de données lus par l'étape.
+            params (dict): Paramètres de l'étape (doivent être sérialisables en JSON).
+            code_files (list): Fichiers source dont dépend l'étape.
+
+        Returns:
+            str: Empreinte hexadécimale.
+        """
+        description = {
+            'stage': stage,
+            'inputs': {path: self.file_hash(path) for path in inputs},
+            'code': {path: self.file_hash(path) for path in code_files},
+            'params': params or {},
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _restore(self, outputs):
+        """
+        Remet en place les sorties enregistrées ; renvoie False si l'une d'elles n'est plus disponible.
+        """
+        for path, sha256 in outputs.items():
+            if os.path.exists(path) and self.file_hash(path) == sha256:
+                continue
+            stored = os.path.join(self._objects_dir(), sha256)
+            if not os.path.exists(stored):
+                return False
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            shutil.copyfile(stored, path)
+        return True
+
+    def _store(self, outputs):
+        os.makedirs(self._objects_dir(), exist_ok=True)
+        hashes = {}
+        for path in outputs:
+            sha256 = self.file_hash(path)
+            stored = os.path.join(self._objects_dir(), sha256)
+            if not os.path.exists(stored):
+                shutil.copyfile(path, stored)
+            hashes[path] = sha256
+        return hashes
+
+    def _manifests(self):
+        """
+        Manifestes des étapes, indexés par nom d'étape.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return {}
+        return {name[:-len('.json')]: self._read_json(os.path.join(self.cache_dir, name))
+                for name in sorted(os.listdir(self.cache_dir))
+                if name.endswith('.json') and os.path.join(self.cache_dir, name) != self._hashes_file}
+
+    def prune(self):
+        """
+        Supprime les objets stockés qu'aucune exécution gardée ne référence plus.
+
+        Returns:
+            int: Nombre d'objets supprimés.
+        """
+        if not os.path.isdir(self._objects_dir()):
+            return 0
+        referenced = {sha256 for manifest in self._manifests().values() for entry in manifest.values()
+                      for sha256 in entry['outputs'].values()}
+        removed = 0
+        for name in os.listdir(self._objects_dir()):
+            if name not in referenced:
+                os.remove(os.path.join(self._objects_dir(), name))
+                removed += 1
+        return removed
+
+    def _evict(self, manifest):
+        """
+        Ne garde que les `max_entries` exécutions les plus récemment utilisées d'un manifeste.
+        """
+        recent = sorted(manifest, key=lambda key: manifest[key].get('used', 0), reverse=True)
+        return {key: manifest[key] for key in recent[:self.max_entries]}
+
+    @instrumented
+    def run(self, stage, func, inputs=(), outputs=(), params=None, code_files=()):
+        """
+        Exécute une étape, ou restaure ses sorties si elle a déjà été exécutée avec les mêmes entrées.
+
+        Parameters:
+            stage (str): Nom de l'étape.
+            func (callable): Fonction sans argument qui exécute l'étape et écrit `outputs`.
+            inputs (list): Fichiers de données lus par l'étape.
+            outputs (list): Fichiers écrits par l'étape.
+            params (dict): Paramètres de l'étape.
+            code_files (list): Fichiers source dont dépend l'étape.
+
+        Returns:
+            bool: True si les sorties ont été reprises du cache, False si l'étape a été exécutée.
+        """
+        if not self.enabled:
+            func()
+            return False
+
+        key = self.fingerprint(stage, inputs, params, code_files)
+        manifest = self._read_json(self._manifest_file(stage))
+        entry = manifest.get(key)
+        if entry is not None and self._restore(entry['outputs']):
+            print(f"Étape '{stage}' inchangée depuis la dernière exécution, sorties reprises du cache.")
+            entry['used'] = time.time()
+            self._write_json(self._manifest_file(stage), manifest)
+            self._write_json(self._hashes_file, self._hashes)
+            return True
+
+        func()
+
+        missing = [path for path in outputs if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Sorties attendues de l'étape '{stage}' introuvables : {', '.join(missing)}")
+        manifest[key] = {'outputs': self._store(outputs), 'used': time.time()}
+        self._write_json(self._manifest_file(stage), self._evict(manifest))
+        self._write_json(self._hashes_file, self._hashes)
+        self.prune()
+        return False
@@ -0,0 +1,241 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.instrumentation_script import instrumented
+
+
+# Colonnes converties en types compacts à l'écriture des fichiers colonnaires
+CATEGORICAL_COLUMNS = ['quartier']
+SMALL_INT_COLUMNS = ['catastrophe']
+DATE_COLUMNS = ['date']
+# Mesures des capteurs, stockées en float32 ainsi que les caractéristiques qui en sont dérivées (ex :
+# 'pluie_totale_lag1') ; les autres colonnes flottantes (statistiques, probabilités) gardent leur précision
+SENSOR_COLUMNS = [
+    'temperature',
+    'humidite',
+    'force_moyenne_du_vecteur_de_vent',
+    'force_du_vecteur_de_vent_max',
+    'pluie_intensite_max',
+    'sismicite',
+    'concentration_gaz',
+    'pluie_totale',
+]
+
+
+def _is_sensor_column(column):
+    return column in SENSOR_COLUMNS or any(str(column).startswith(sensor + '_') for sensor in SENSOR_COLUMNS)
+
+
+def compact_dtypes(data):
+    """
+    Convertit un DataFrame vers des types compacts : 'quartier' en catégorie, 'catastrophe' en petit entier,
+    'date' en datetime et les mesures des capteurs (`SENSOR_COLUMNS` et leurs caractéristiques dérivées) en
+    float32.
+
+    Parameters:
+        data (pd.DataFrame): Données à convertir.
+
+    Returns:
+        pd.DataFrame: Copie des données avec des types compacts.
+    """
+    data = data.copy()
+    for column in data.columns:
+        if column in CATEGORICAL_COLUMNS:
+            data[column] = data[column].astype('category')
+        elif column in SMALL_INT_COLUMNS and data[column].notna().all():
+            data[column] = pd.to_numeric(data[column], downcast='integer')
+        elif column in DATE_COLUMNS:
+            data[column] = pd.to_datetime(data[column])
+        elif _is_sensor_column(column) and data[column].dtype == np.float64:
+            data[column] = data[column].astype(np.float32)
+    return data
+
+
+def _restore_categories(data):
+    """
+    Remet les colonnes catégorielles à valeurs numériques (ex : 'quartier' après mapping) dans le type de leurs
+    catégories, pour que `select_dtypes(include=[np.number])` et XGBoost les traitent comme avant.
+    """
+    for column in data.columns:
+        dtype = data[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and pd.api.types.is_numeric_dtype(dtype.categories.dtype):
+            data[column] = data[column].astype(dtype.categories.dtype)
+    return data
+
+
+class CsvStorage:
+    """
+    Stockage CSV (format historique du projet).
+    """
+    extensions = ('.csv',)
+
+    def read(self, path, columns=None):
+        return pd.read_csv(path, usecols=columns)
+
+    def write(self, data, path, index=False):
+        data.to_csv(path, index=index)
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+    def columns(self, path):
+        return pd.read_csv(path, nrows=0).columns.tolist()
+
+    def numeric_columns(self, path):
+        # Le CSV n'a pas de schéma : on déduit les types à partir d'un échantillon de lignes
+        sample = pd.read_csv(path, nrows=1000)
+        return sample.select_dtypes(include=[np.number]).columns.tolist()
+
+
+class ParquetStorage:
+    """
+    Stockage Parquet : fichier colonnaire typé et compressé, lecture limitée aux colonnes demandées.
+    """
+    extensions = ('.parquet',)
+
+    def read(self, path, columns=None):
+        return _restore_categories(pd.read_parquet(path, columns=columns))
+
+    def write(self, data, path, index=False):
+        compact_dtypes(data).to_parquet(path, index=index)
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield _restore_categories(batch.to_pandas())
+
+    def _schema(self, path):
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path)
+
+    def columns(self, path):
+        return [name for name in self._schema(path).names if not name.startswith('__index_level_')]
+
+    def numeric_columns(self, path):
+        import pyarrow as pa
+
+        schema = self._schema(path)
+        return [
+            field.name for field in schema
+            if field.name in self.columns(path) and (
+                pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+                or (pa.types.is_dictionary(field.type) and pa.types.is_integer(field.type.value_type))
+            )
+        ]
+
+
+class ArrowStorage(ParquetStorage):
+    """
+    Stockage Arrow IPC (Feather v2) non compressé : le fichier est lu par memory-map, sans copie ni décodage.
+    """
+    extensions = ('.arrow', '.feather')
+
+    def read(self, path, columns=None):
+        import pyarrow.feather as feather
+
+        data = feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+        return _restore_categories(data)
+
+    def write(self, data, path, index=False):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        table = pa.Table.from_pandas(compact_dtypes(data), preserve_index=index)
+        feather.write_feather(table, path, compression='uncompressed')
+
+    def iter_chunks(self, path, chunksize, columns=None):
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        for batch in table.to_batches(max_chunksize=chunksize):
+            yield _restore_categories(batch.to_pandas())
+
+    def _schema(self, path):
+        import pyarrow as pa
+
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema
+
+
+STORAGES = [CsvStorage(), ParquetStorage(), ArrowStorage()]
+
+
+def get_storage(path):
+    """
+    Renvoie le backend de stockage correspondant à l'extension du fichier.
+
+    Parameters:
+        path (str): Chemin du fichier.
+
+    Returns:
+        CsvStorage | ParquetStorage | ArrowStorage: Backend de stockage.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for storage in STORAGES:
+        if extension in storage.extensions:
+            return storage
+    raise ValueError(f"Format de fichier non supporté : {path}")
+
+
+@instrumented
+def read_table(path, columns=None):
+    """
+    Lit un fichier de données (CSV, Parquet ou Arrow) en ne chargeant que les colonnes demandées.
+
+    Parameters:
+        path (str): Chemin du fichier.
+        columns (list): Colonnes à charger (toutes si None).
+
+    Returns:
+        pd.DataFrame: Données lues.
+    """
+    return get_storage(path).read(path, columns=columns)
+
+
+@instrumented
+def write_table(data, path, index=False):
+    """
+    Écrit un DataFrame dans le format indiqué par l'extension du fichier.
+
+    Parameters:
+        data (pd.DataFrame): Données à écrire.
+        path (str): Chemin du fichier de sortie.
+        index (bool): Conserver l'index (utile pour les tableaux de statistiques).
+    """
+    get_storage(path).write(data, path, index=index)
+
+
+def iter_table(path, chunksize, columns=None):
+    """
+    Lit un fichier de données par blocs de `chunksize` lignes.
+
+    Parameters:
+        path (str): Chemin du fichier.
+        chunksize (int): Nombre de lignes par bloc.
+        columns (list): Colonnes à charger (toutes si None).
+
+    Yields:
+        pd.DataFrame: Bloc de données.
+    """
+    yield from get_storage(path).iter_chunks(path, chunksize, columns=columns)
+
+
+def table_columns(path):
+    """
+    Renvoie la liste des colonnes d'un fichier sans charger les données.
+    """
+    return get_storage(path).columns(path)
+
+
+def numeric_columns(path):
+    """
+    Renvoie la liste des colonnes numériques d'un fichier (lue dans le schéma pour Parquet/Arrow).
+    """
+    return get_storage(path).numeric_columns(path)
@@ -0,0 +1,286 @@
+"""
+Inférence compilée des modèles XGBoost : les arbres du booster sont aplatis en tables de nœuds NumPy
+(caractéristique, seuil, fils gauche / droit, direction des valeurs manquantes, valeur des feuilles) et parcourus
+niveau par niveau pour toutes les lignes et tous les arbres à la fois. Une ligne seule est évaluée sans pandas ni
+DMatrix, en quelques dizaines de microsecondes.
+
+    forest = CompiledForest.load('models/ml_model.ubj')
+    probabilities = forest.predict_proba(features)                 # matrice float32 (lignes × caractéristiques)
+    probabilities = forest.predict_proba_row({'quartier': 3, 'humidite': 0.71, ...})
+"""
+import json
+
+import numpy as np
+
+from scripts.feature_schema_script import load_feature_transformer
+from scripts.instrumentation_script import instrumented
+from scripts.model_io_script import load_model
+
+SUPPORTED_OBJECTIVES = ('multi:softprob', 'multi:softmax', 'binary:logistic')
+
+
+def _parse_base_score(value):
+    """
+    `base_score` du modèle JSON : un nombre ('5E-1'), ou un vecteur par classe ('[7.08E-1,-2.33E-1,...]')
+    pour les modèles multi-classes des versions récentes d'XGBoost.
+    """
+    value = value.strip()
+    if value.startswith('['):
+        return np.array([float(item) for item in value.strip('[]').split(',')], dtype=np.float64)
+    return np.array([float(value)], dtype=np.float64)
+
+
+class CompiledForest:
+    """
+    Forêt d'arbres XGBoost ('gbtree', seuils numériques) stockée dans des tableaux NumPy contigus.
+
+    Les comparaisons sont faites en float32 comme dans XGBoost (`valeur < seuil` : fils gauche ; valeur
+    manquante : direction apprise à l'entraînement). Les feuilles bouclent sur elles-mêmes et les arbres sont
+    rangés du plus profond au moins profond : à chaque niveau, seuls les arbres encore assez profonds (un
+    préfixe des colonnes) sont avancés, ce qui évite de parcourir `max_depth` niveaux pour les petits arbres.
+
+    Parameters:
+        feature (np.ndarray): Caractéristique testée par chaque nœud (0 pour les feuilles).
+        threshold (np.ndarray): Seuil de chaque nœud (float32, +inf pour les feuilles).
+        children (np.ndarray): Fils gauche (position 2 * nœud) et droit (2 * nœud + 1), en indices globaux.
+        missing_right (np.ndarray): Valeur manquante envoyée vers le fils droit.
+        leaf_value (np.ndarray): Valeur de chaque feuille (0 pour les nœuds internes).
+        roots (np.ndarray): Racine de chaque arbre.
+        tree_class (np.ndarray): Classe à laquelle chaque arbre contribue.
+        tree_depth (np.ndarray): Profondeur de chaque arbre (décroissante).
+        n_classes (int): Nombre de classes.
+        base_margin (np.ndarray): Marge initiale (par classe ou unique).
+        objective (str): Objectif du modèle (voir `SUPPORTED_OBJECTIVES`).
+        feature_names (list): Noms des caractéristiques, dans l'ordre des colonnes attendues.
+    """
+
+    def __init__(self, feature, threshold, children, missing_right, leaf_value, roots, tree_class, tree_depth,
+                 n_classes, base_margin, objective, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_right = missing_right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.tree_class = tree_class
+        self.tree_depth = tree_depth
+        self.n_classes = n_classes
+        self.base_margin = base_margin
+        self.objective = objective
+        self.feature_names = feature_names
+        self.transformer = None
+        # Nombre d'arbres encore en cours de parcours à chaque niveau
+        self._active_trees = [int((tree_depth > level).sum()) for level in range(self.max_depth)]
+        # Somme des feuilles par classe en un produit matriciel (arbres × classes)
+        self._class_matrix = np.zeros((len(roots), max(n_classes, 1)))
+        self._class_matrix[np.arange(len(roots)), tree_class] = 1.0
+
+    @property
+    def max_depth(self):
+        return int(self.tree_depth.max(initial=0))
+
+    @classmethod
+    def from_json(cls, model):
+        """
+        Compile un modèle au format JSON d'XGBoost (dictionnaire de `Booster.save_raw('json')` ou contenu d'un
+        fichier '.json' comme model/xgboost_model.json).
+        """
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Objectif non pris en charge par l'inférence compilée : {objective}")
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Booster non pris en charge par l'inférence compilée : {booster['name']}")
+
+        trees = booster['model']['trees']
+        n_classes = int(learner['learner_model_param'].get('num_class', '0'))
+        tree_class = np.asarray(booster['model']['tree_info'], dtype=np.int64)
+
+        # Arbres retenus par l'arrêt anticipé, comme `predict_proba` (`best_iteration` dans les attributs)
+        best_iteration = learner.get('attributes', {}).get('best_iteration')
+        if best_iteration is not None:
+            per_round = max(n_classes, 1) * int(booster['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            n_trees = (int(best_iteration) + 1) * per_round
+            trees, tree_class = trees[:n_trees], tree_class[:n_trees]
+
+        features, thresholds, children, missing_right, leaves, roots, tree_depth = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            if any(tree.get('split_type', [])):
+                raise ValueError("Les divisions catégorielles ne sont pas prises en charge par l'inférence compilée.")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = left < 0
+            nodes = np.arange(len(left))
+
+            # Les feuilles bouclent sur elles-mêmes ; leur valeur est stockée dans `split_conditions`
+            features.append(np.where(is_leaf, 0, np.asarray(tree['split_indices'], dtype=np.int64)))
+            thresholds.append(np.where(is_leaf, np.float32(np.inf), conditions))
+            children.append(np.column_stack([np.where(is_leaf, nodes, left), np.where(is_leaf, nodes, right)]).ravel()
+                            + offset)
+            missing_right.append(~np.asarray(tree['default_left'], dtype=bool))
+            leaves.append(np.where(is_leaf, conditions, np.float32(0)))
+            roots.append(offset)
+
+            # Profondeur de l'arbre : les parents précèdent leurs fils dans la numérotation d'XGBoost
+            depth = np.zeros(len(left), dtype=np.int64)
+            for node in nodes[~is_leaf]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+            tree_depth.append(int(depth.max()))
+            offset += len(left)
+
+        base_margin = _parse_base_score(learner['learner_model_param']['base_score'])
+        if objective == 'binary:logistic':
+            # La marge initiale est stockée en probabilité pour la régression logistique
+            base_margin = np.log(base_margin / (1 - base_margin))
+
+        # Arbres du plus profond au moins profond (la somme des feuilles ne dépend pas de l'ordre)
+        tree_depth = np.asarray(tree_depth, dtype=np.int64)
+        order = np.argsort(-tree_depth, kind='stable')
+        if n_classes <= 1:
+            tree_class = np.zeros(len(roots), dtype=np.int64)
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            children=np.concatenate(children).astype(np.intp),
+            missing_right=np.concatenate(missing_right),
+            leaf_value=np.concatenate(leaves).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp)[order],
+            tree_class=tree_class[order],
+            tree_depth=tree_depth[order],
+            n_classes=n_classes,
+            base_margin=base_margin,
+            objective=objective,
+            feature_names=learner.get('feature_names') or None,
+        )
+
+    @classmethod
+    def from_booster(cls, booster):
+        """
+        Compile un `xgb.Booster` (ou un `XGBClassifier`).
+        """
+        if hasattr(booster, 'get_booster'):
+            booster = booster.get_booster()
+        return cls.from_json(json.loads(bytes(booster.save_raw('json'))))
+
+    @classmethod
+    @instrumented
+    def load(cls, model_file):
+        """
+        Compile un modèle sauvegardé ('.ubj', '.json' dont model/xgboost_model.json, ou '.joblib'), avec son
+        schéma des caractéristiques s'il existe (utilisé par `predict_proba_row` pour les dictionnaires).
+        """
+        model = load_model(model_file)
+        forest = cls.from_booster(model)
+        try:
+            forest.transformer = load_feature_transformer(model_file, model)
+        except (FileNotFoundError, AttributeError):
+            forest.transformer = None
+        return forest
+
+    def _step(self, node, values):
+        """
+        Fils atteint depuis chaque nœud pour les valeurs testées.
+        """
+        go_right = np.where(np.isnan(values), self.missing_right[node], values >= self.threshold[node])
+        return self.children[2 * node + go_right]
+
+    def _leaves(self, X):
+        """
+        Feuille atteinte par chaque ligne dans chaque arbre.
+
+        Returns:
+            np.ndarray: Indices des feuilles, de forme (lignes, arbres).
+        """
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        for active in self._active_trees:
+            current = node[:, :active]
+            node[:, :active] = self._step(current, flat[row_offsets + self.feature[current]])
+        return node
+
+    def predict_margin(self, X, chunk_rows=None):
+        """
+        Marges brutes (avant softmax / sigmoïde) d'un lot de lignes.
+
+        Parameters:
+            X (np.ndarray): Caractéristiques (lignes × caractéristiques), converties en float32.
+            chunk_rows (int): Lignes traitées à la fois (borne la mémoire des tableaux lignes × arbres).
+
+        Returns:
+            np.ndarray: Marges (lignes × classes), en float64.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        chunk_rows = chunk_rows or max(1, 2_000_000 // max(1, len(self.roots)))
+        margins = np.empty((len(X), self._class_matrix.shape[1]))
+        for start in range(0, len(X), chunk_rows):
+            leaves = self._leaves(X[start:start + chunk_rows])
+            margins[start:start + chunk_rows] = self.leaf_value[leaves].astype(np.float64) @ self._class_matrix
+        return margins + self.base_margin
+
+    def _probabilities(self, margins):
+        if self.objective == 'binary:logistic':
+            positive = 1 / (1 + np.exp(-margins[:, 0]))
+            return np.column_stack([1 - positive, positive]).astype(np.float32)
+        exp = np.exp(margins - margins.max(axis=1, keepdims=True))
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    @instrumented
+    def predict_proba(self, X, chunk_rows=None):
+        """
+        Probabilités de chaque classe pour un lot de lignes (mêmes colonnes que `XGBClassifier.predict_proba`).
+        """
+        return self._probabilities(self.predict_margin(X, chunk_rows))
+
+    def predict(self, X, chunk_rows=None):
+        """
+        Classe la plus probable de chaque ligne.
+        """
+        return self.predict_proba(X, chunk_rows).argmax(axis=1)
+
+    def row_vector(self, row):
+        """
+        Convertit une ligne (dictionnaire {caractéristique: valeur}, liste ou tableau dans l'ordre des
+        caractéristiques) en vecteur float32, sans pandas. Une caractéristique absente du dictionnaire est
+        traitée comme manquante.
+        """
+        if not isinstance(row, dict):
+            return np.asarray(row, dtype=np.float32)
+        if self.transformer is not None:
+            names = self.transformer.feature_columns
+        elif self.feature_names is not None:
+            names = self.feature_names
+        else:
+            raise ValueError("Noms des caractéristiques inconnus : passer la ligne sous forme de liste.")
+
+        values = [row.get(name, np.nan) for name in names]
+        if self.transformer is not None and self.transformer.date_column in names:
+            # Dates converties en jours depuis l'origine des dates d'entraînement, comme `FeatureTransformer`
+            position = names.index(self.transformer.date_column)
+            day = np.datetime64(str(values[position])[:10], 'D')
+            values[position] = (day - np.datetime64(self.transformer.date_origin, 'D')).astype(np.int64)
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+
+    def predict_proba_row(self, row):
+        """
+        Probabilités pour une seule ligne : parcours de tous les arbres sur des vecteurs NumPy 1-D.
+
+        Parameters:
+            row (dict | list | np.ndarray): Ligne à évaluer (voir `row_vector`).
+
+        Returns:
+            np.ndarray: Probabilité de chaque classe (float32).
+        """
+        x = self.row_vector(row)
+        node = self.roots.copy()
+        for active in self._active_trees:
+            current = node[:active]
+            node[:active] = self._step(current, x[self.feature[current]])
+        margins = self.leaf_value[node].astype(np.float64) @ self._class_matrix + self.base_margin
+        return self._probabilities(margins[np.newaxis, :])[0]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit, train_test_split
+
+from scripts.instrumentation_script import instrumented
+
+
+def rolling_origin_splits(dates, n_splits=4, gap=0, max_train_days=None):
+    """
+    Découpe temporelle à origine glissante (fenêtre d'entraînement croissante) sur les jours distincts.
+
+    Tous les quartiers d'un même jour sont toujours du même côté de la coupure : le modèle n'est jamais validé
+    sur un jour dont il a vu une autre zone, ni sur un jour antérieur à ses données d'entraînement. Les lignes
+    sans date valide ne peuvent pas être placées dans le temps et sont exclues des plis.
+
+    Parameters:
+        dates (array-like): Date de chaque ligne.
+        n_splits (int): Nombre de plis.
+        gap (int): Nombre de jours écartés entre la fin de l'entraînement et le début de la validation.
+        max_train_days (int): Taille maximale de la fenêtre d'entraînement en jours (fenêtre croissante si None).
+
+    Returns:
+        list: Liste de tuples (indices d'entraînement, indices de validation), positions dans `dates`,
+            du pli le plus ancien au plus récent.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce').to_numpy()
+    valid = ~pd.isna(dates)
+    unique_dates = np.unique(dates[valid])
+    if len(unique_dates) < n_splits + 1 + gap:
+        raise ValueError(f"Pas assez de jours distincts ({len(unique_dates)}) pour {n_splits} plis.")
+
+    splitter = TimeSeriesSplit(n_splits=n_splits, gap=gap, max_train_size=max_train_days)
+    splits = []
+    for train_days, test_days in splitter.split(unique_dates):
+        train = np.flatnonzero(valid & np.isin(dates, unique_dates[train_days]))
+        test = np.flatnonzero(valid & np.isin(dates, unique_dates[test_days]))
+        splits.append((train, test))
+    return splits
+
+
+@instrumented
+def make_validation_splits(data, date_column='date', n_splits=4, gap=0):
+    """
+    Plis de validation d'un dataset : découpe temporelle si la colonne de date est présente, sinon une seule
+    découpe aléatoire 80/20 (données sans dimension temporelle).
+
+    Parameters:
+        data (pd.DataFrame): Dataset complet.
+        date_column (str): Nom de la colonne de date.
+        n_splits (int): Nombre de plis temporels.
+        gap (int): Jours écartés entre entraînement et validation.
+
+    Returns:
+        list: Liste de tuples (indices d'entraînement, indices de validation).
+    """
+    if date_column not in data.columns:
+        train, test = train_test_split(np.arange(len(data)), test_size=0.2, random_state=42)
+        return [(np.sort(train), np.sort(test))]
+
+    splits = rolling_origin_splits(data[date_column], n_splits=n_splits, gap=gap)
+    excluded = int(data[date_column].isna().sum())
+    if excluded:
+        print(f"{excluded} lignes sans date exclues des plis de validation.")
+    for fold, (train, test) in enumerate(splits):
+        dates = data[date_column].iloc[test]
+        print(f"Pli {fold + 1} : {len(train)} lignes d'entraînement, {len(test)} lignes de validation "
+              f"({pd.Timestamp(dates.min()):%Y-%m-%d} → {pd.Timestamp(dates.max()):%Y-%m-%d})")
+    return splits
+
+
+def stratified_subsample(indices, labels, fraction, random_state=42):
+    """
+    Sous-échantillon stratifié par classe : la même proportion `fraction` de chaque classe (au moins une ligne par
+    classe). Avec la même graine, les sous-échantillons sont emboîtés : celui d'une fraction plus grande contient
+    celui d'une fraction plus petite.
+
+    Parameters:
+        indices (np.ndarray): Positions parmi lesquelles tirer (ex : indices d'entraînement d'un pli).
+        labels (array-like): Classe de chaque position de `indices`.
+        fraction (float): Proportion de lignes à garder (toutes si >= 1).
+        random_state (int): Graine du tirage.
+
+    Returns:
+        np.ndarray: Positions retenues, triées (l'ordre chronologique est conservé).
+    """
+    indices = np.asarray(indices)
+    if fraction >= 1:
+        return indices
+    labels = np.asarray(labels)
+    order = np.random.default_rng(random_state).permutation(len(indices))
+    kept = []
+    for label in np.unique(labels):
+        members = order[labels[order] == label]
+        kept.append(members[:max(1, int(np.ceil(fraction * len(members))))])
+    return np.sort(indices[np.concatenate(kept)])
+
+
+def accuracy_by_group(y_true, y_pred, groups):
+    """
+    Accuracy par groupe (ex : par quartier), pour repérer une zone mal prédite que la moyenne masquerait.
+
+    Returns:
+        dict: {groupe: accuracy}
+    """
+    correct = pd.Series(np.asarray(y_true) == np.asarray(y_pred), index=np.asarray(groups))
+    return {str(group): float(score) for group, score in correct.groupby(level=0).mean().items()}
@@ -1,21 +1,34 @@
-import seaborn as sns
-import matplotlib.pyplot as plt
+import os
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
+from scripts.storage_script import read_table
+from scripts.report_script import correlation_figure, learning_curve_figure, render_figure
+from scripts.instrumentation_script import instrumented
 
 # Fonction pour générer une matrice de corrélation
-def visualisation_correlation_matrix(data, output_image):
+@instrumented
+def visualisation_correlation_matrix(data, output_image, correlation_matrix=None):
     """
     Génère une matrice de corrélation à partir des colonnes numériques d'un DataFrame et sauvegarde l'image.
 
     Parameters:
-        data (str): Chemin du fichier CSV contenant les données.
+        data (str | pd.DataFrame): Chemin du fichier de données (CSV, Parquet ou Arrow), ou DataFrame déjà chargé.
         output_image (str): Chemin pour sauvegarder l'image de la matrice de corrélation.
+        correlation_matrix (pd.DataFrame): Matrice déjà calculée (ex : `CleaningPipeline.correlations().matrix`),
+            utilisée telle quelle au lieu d'être recalculée à partir de `data`.
     """
-    print("Chargement des données...")
-    data = pd.read_csv(data)
+    if correlation_matrix is not None:
+        render_figure(correlation_figure(correlation_matrix, output_image))
+        print(f"Matrice de corrélation sauvegardée sous : {output_image}")
+        return
+
+    if isinstance(data, str):
+        print("Chargement des données...")
+        data = read_table(data)
 
     # Afficher les colonnes disponibles pour debug
     print(f"Colonnes du DataFrame : {data.columns}")
@@ -26,21 +39,80 @@ def visualisation_correlation_matrix(data, output_image):
     # Afficher les colonnes retenues pour la corrélation
     print(f"Colonnes utilisées pour la corrélation : {data_numeric.columns}")
 
-    # Création de la figure et calcul de la matrice de corrélation
-    plt.figure(figsize=(12, 10))
-    correlation_matrix = data_numeric.corr()
-    sns.heatmap(correlation_matrix, cmap='coolwarm', annot=False, fmt='.2f')
-    plt.title('Matrice de corrélation des variables')
-
-    # Sauvegarde de l'image
-    plt.savefig(output_image)
+    render_figure(correlation_figure(data_numeric.corr(), output_image))
     print(f"Matrice de corrélation sauvegardée sous : {output_image}")
-    plt.show()
 
 
-def plot_learning_curve(estimator, X_train, y_train, title, output_file):
+def _fit_and_score(estimator, X_partial, y_partial, X_valid, y_valid):
+    """
+    Entraîne une copie de l'estimateur sur un sous-ensemble et renvoie ses scores d'entraînement et de validation.
+    """
+    estimator.fit(X_partial, y_partial)
+    return (accuracy_score(y_partial, estimator.predict(X_partial)),
+            accuracy_score(y_valid, estimator.predict(X_valid)))
+
+
+@instrumented
+def compute_learning_curve(estimator, X_train, y_train, X_valid, y_valid, train_sizes=None, n_jobs=None):
+    """
+    Calcule la courbe d'apprentissage en entraînant des copies (`clone`) de l'estimateur sur des sous-ensembles
+    croissants des données d'entraînement, en parallèle, et en les évaluant sur un jeu de validation séparé.
+    L'estimateur passé en paramètre n'est pas modifié.
+
+    Parameters:
+        estimator: Le modèle à évaluer (non modifié).
+        X_train, y_train: Données d'entraînement.
+        X_valid, y_valid: Données de validation, jamais utilisées pour l'entraînement.
+        train_sizes (array): Fractions des données d'entraînement à utiliser (10 tailles de 10 % à 100 % par défaut).
+        n_jobs (int): Nombre de cœurs à utiliser (tous par défaut).
+
+    Returns:
+        tuple: (train_sizes, scores d'entraînement, scores de validation)
+    """
+    if train_sizes is None:
+        train_sizes = np.linspace(0.1, 1.0, 10)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_parallel = min(n_jobs, len(train_sizes))
+
+    # Chaque copie utilise sa part des cœurs pour ne pas surcharger la machine
+    template = clone(estimator)
+    if 'n_jobs' in template.get_params():
+        template.set_params(n_jobs=max(1, n_jobs // n_parallel))
+
+    sizes = [int(train_size * len(X_train)) for train_size in train_sizes]
+    scores = Parallel(n_jobs=n_parallel)(
+        delayed(_fit_and_score)(clone(template), X_train[:size], y_train[:size], X_valid, y_valid)
+        for size in sizes
+    )
+    train_scores, valid_scores = zip(*scores)
+    return train_sizes, list(train_scores), list(valid_scores)
+
+
+def learning_curve_from_history(evals_result, metric='merror'):
+    """
+    Construit une courbe d'apprentissage à partir de l'historique par itération d'un seul entraînement XGBoost
+    (`evals_result` de `xgb.train` ou `XGBClassifier.evals_result()`), sans entraînement supplémentaire.
+
+    Parameters:
+        evals_result (dict): Historique {jeu de données: {métrique: [valeurs]}}, le premier jeu étant
+            l'entraînement et le dernier la validation.
+        metric (str): Métrique d'erreur enregistrée.
+
+    Returns:
+        tuple: (itérations, scores d'entraînement, scores de validation)
+    """
+    datasets = list(evals_result)
+    train_errors = np.asarray(evals_result[datasets[0]][metric])
+    valid_errors = np.asarray(evals_result[datasets[-1]][metric])
+    iterations = np.arange(1, len(train_errors) + 1)
+    return iterations, 1 - train_errors, 1 - valid_errors
+
+
+@instrumented
+def plot_learning_curve(estimator, X_train, y_train, title, output_file, X_valid=None, y_valid=None, n_jobs=None,
+                        evals_result=None):
     """
-    Trace la courbe d'apprentissage pour un modèle donné.
+    Trace la courbe d'apprentissage pour un modèle donné, sans modifier le modèle.
 
     Parameters:
         estimator: Le modèle à évaluer.
@@ -48,35 +120,25 @@ def plot_learning_curve(estimator, X_train, y_train, title, output_file):
         y_train: Labels des données d'entraînement.
         title: Titre pour le graphique.
         output_file: Chemin pour sauvegarder l'image de la courbe d'apprentissage.
+        X_valid, y_valid: Jeu de validation. Si absent, 20 % des données d'entraînement sont mises de côté.
+        n_jobs (int): Nombre de cœurs pour les entraînements en parallèle.
+        evals_result (dict): Historique d'un entraînement XGBoost. Si renseigné, la courbe est tracée en
+            fonction du nombre d'itérations de boosting à partir de cet historique, sans réentraîner.
     """
-    # Définir les tailles de jeu d'entraînement pour la courbe
-    train_sizes = np.linspace(0.1, 1.0, 10)
-    train_scores = []
-    test_scores = []
-
-    print("Calcul des scores pour différentes tailles d'entraînement...")
-    for train_size in train_sizes:
-        # Convertir la taille en entier pour sélectionner les données
-        size = int(train_size * len(X_train))
-        X_partial = X_train[:size]
-        y_partial = y_train[:size]
-
-        # Entraîner le modèle sur une partie des données
-        estimator.fit(X_partial, y_partial)
-        train_scores.append(accuracy_score(y_partial, estimator.predict(X_partial)))
-        test_scores.append(accuracy_score(y_train, estimator.predict(X_train)))
-
-    # Tracer les courbes d'apprentissage
-    plt.figure()
-    plt.plot(train_sizes, train_scores, label="Training Accuracy")
-    plt.plot(train_sizes, test_scores, label="Validation Accuracy")
-    plt.title(title)
-    plt.xlabel("Training Set Size")
-    plt.ylabel("Accuracy")
-    plt.legend()
-    plt.grid()
-
-    # Sauvegarde de l'image
-    plt.savefig(output_file)
+    if evals_result is not None:
+        print("Calcul des scores à partir de l'historique d'entraînement...")
+        x_values, train_scores, test_scores = learning_curve_from_history(evals_result)
+        x_label = "Boosting Iterations"
+    else:
+        if X_valid is None:
+            X_train, X_valid, y_train, y_valid = train_test_split(X_train, y_train, test_size=0.2, random_state=42)
+
+        print("Calcul des scores pour différentes tailles d'entraînement...")
+        x_values, train_scores, test_scores = compute_learning_curve(estimator, X_train, y_train, X_valid, y_valid,
+                                                                     n_jobs=n_jobs)
+        x_label = "Training Set Size"
+
+    # Tracer et sauvegarder les courbes d'apprentissage
+    render_figure(learning_curve_figure(x_values, train_scores, test_scores, output_file, title=title,
+                                        x_label=x_label))
     print(f"Courbe d'apprentissage sauvegardée sous : {output_file}")
-    plt.close()
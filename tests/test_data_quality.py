@@ -0,0 +1,116 @@
+"""
+Validation du fichier brut : dédoublonnage de `KeyIndex` d'un bloc à l'autre, lignes mises en quarantaine et
+compteurs du rapport.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.data_quality_script import DEFAULT_VALUE_RANGES, KeyIndex, RawDataSchema, validate_raw_data
+
+MAPPING_CATA = {'aucun': 0, 'seisme': 1}
+MAPPING_ZONE = {'Zone 1': 1, 'Zone 2': 2}
+
+
+def test_key_index_matches_a_set_across_chunks():
+    rng = np.random.default_rng(0)
+    index, seen = KeyIndex(), set()
+    # Blocs de tailles variées, clés tirées dans un petit ensemble : doublons dans un bloc et entre blocs
+    for size in rng.integers(1, 300, size=60):
+        hashes = rng.integers(0, 2_000, size=size).astype(np.uint64)
+        expected = []
+        for value in hashes.tolist():
+            expected.append(value in seen)
+            seen.add(value)
+        np.testing.assert_array_equal(index.add(hashes), expected)
+        assert len(index) == len(seen)
+
+
+def test_key_index_extreme_hashes():
+    index = KeyIndex()
+    extremes = np.array([0, 2 ** 64 - 1, 2 ** 63], dtype=np.uint64)
+    np.testing.assert_array_equal(index.add(extremes), [False, False, False])
+    np.testing.assert_array_equal(index.add(extremes[::-1]), [True, True, True])
+    np.testing.assert_array_equal(index.add(np.array([1, 2 ** 64 - 2], dtype=np.uint64)), [False, False])
+
+
+def _raw_row(date, zone, catastrophe='aucun', **measures):
+    row = {column: 1.0 for column in DEFAULT_VALUE_RANGES}
+    row.update(measures)
+    return {**row, 'date': date, 'quartier': zone, 'catastrophe': catastrophe}
+
+
+def _write_raw(path, rows):
+    # Même format que data/catastrophes_naturelles.csv : colonne d'index sans nom
+    pd.DataFrame(rows).to_csv(path)
+
+
+RAW_ROWS = [
+    _raw_row('2170-01-01', 'Zone 1'),                           # ligne 2 : valide
+    _raw_row('2170-01-01', 'Zone 2'),                           # ligne 3 : valide
+    _raw_row('2170-01-01', 'Zone 1'),                           # ligne 4 : doublon de la ligne 2 (bloc suivant)
+    _raw_row('2170-01-02', 'Zone 1', humidite=150.0),           # ligne 5 : hors plage, ne réserve pas sa clé
+    _raw_row('2170-01-02', 'Zone 1', catastrophe='seisme'),     # ligne 6 : valide
+    _raw_row('2170-01-02', 'Zone 3'),                           # ligne 7 : libellé inconnu
+    _raw_row('2170-01-02', ' Zone 1 '),                         # ligne 8 : doublon de la ligne 6 (espaces)
+    _raw_row('2170-01-03', 'Zone 2', catastrophe=None),         # ligne 9 : cible manquante
+    _raw_row('2170-01-03', 'Zone 2', temperature='abc'),        # ligne 10 : mesure non numérique
+    _raw_row('2170-01-03 00:00:00', 'Zone 2'),                  # ligne 11 : valide (clé normalisée)
+    _raw_row('2170-01-03', 'Zone 2'),                           # ligne 12 : doublon de la ligne 11
+]
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 3, 100])
+def test_validate_raw_data_quarantine_and_report(tmp_path, chunksize):
+    raw_file, valid_file = tmp_path / 'raw.csv', tmp_path / 'valid.csv'
+    quarantine_file, report_file = tmp_path / 'quarantine.csv', tmp_path / 'report.json'
+    _write_raw(raw_file, RAW_ROWS)
+
+    report = validate_raw_data(str(raw_file), str(valid_file), str(quarantine_file), str(report_file),
+                               RawDataSchema.from_mappings(MAPPING_CATA, MAPPING_ZONE), chunksize=chunksize,
+                               max_rejected_fraction=1.0)
+
+    valid = pd.read_csv(valid_file, dtype=str)
+    assert valid['date'].tolist() == ['2170-01-01', '2170-01-01', '2170-01-02', '2170-01-03 00:00:00']
+    assert valid['quartier'].tolist() == ['Zone 1', 'Zone 2', 'Zone 1', 'Zone 2']
+    # Valeurs recopiées telles quelles, colonne d'index comprise
+    assert valid.iloc[:, 0].tolist() == ['0', '1', '4', '9']
+
+    quarantine = pd.read_csv(quarantine_file, dtype={'reasons': str})
+    assert quarantine['source_line'].tolist() == [4, 5, 7, 8, 9, 10, 12]
+    assert quarantine['reasons'].tolist() == [
+        'duplicate_key', 'out_of_range:humidite', 'unknown_label:quartier', 'duplicate_key',
+        'missing_value:catastrophe', 'invalid_type:temperature', 'duplicate_key',
+    ]
+
+    assert report == json.loads(report_file.read_text(encoding='utf-8'))
+    assert (report['rows'], report['valid_rows'], report['rejected_rows']) == (11, 4, 7)
+    assert report['duplicate_keys'] == 3
+    assert report['distinct_keys'] == 4
+    assert report['reasons'] == {'duplicate_key': 3, 'out_of_range:humidite': 1, 'unknown_label:quartier': 1,
+                                 'missing_value:catastrophe': 1, 'invalid_type:temperature': 1}
+    assert report['unknown_labels'] == {'quartier': {'Zone 3': 1}}
+    assert report['passed']
+
+
+def test_validate_raw_data_fails_above_rejected_fraction(tmp_path):
+    raw_file, report_file = tmp_path / 'raw.csv', tmp_path / 'report.json'
+    _write_raw(raw_file, RAW_ROWS)
+
+    with pytest.raises(ValueError, match='échouée'):
+        validate_raw_data(str(raw_file), str(tmp_path / 'valid.csv'), str(tmp_path / 'quarantine.csv'),
+                          str(report_file), RawDataSchema.from_mappings(MAPPING_CATA, MAPPING_ZONE), chunksize=4,
+                          max_rejected_fraction=0.5)
+    report = json.loads(report_file.read_text(encoding='utf-8'))
+    assert report['rejected_rows'] == 7 and not report['passed']
+
+
+def test_validate_raw_data_missing_columns(tmp_path):
+    raw_file = tmp_path / 'raw.csv'
+    _write_raw(raw_file, [{key: value for key, value in RAW_ROWS[0].items() if key != 'sismicite'}])
+
+    with pytest.raises(ValueError, match='sismicite'):
+        validate_raw_data(str(raw_file), str(tmp_path / 'valid.csv'), str(tmp_path / 'quarantine.csv'),
+                          str(tmp_path / 'report.json'), RawDataSchema.from_mappings(MAPPING_CATA, MAPPING_ZONE))
@@ -0,0 +1,77 @@
+"""
+Statistiques par blocs : `StatisticsAccumulator` alimenté bloc par bloc puis fusionné, comparé à
+`DataFrame.describe()` sur les données complètes.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.cleanig_data_script import CleaningPipeline, StatisticsAccumulator, compute_statistics
+
+
+def _data(n_rows=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'temperature': rng.normal(25.0, 8.0, n_rows),
+        # Grande moyenne et faible dispersion : cas défavorable pour une variance calculée naïvement
+        'pression': 1e6 + rng.normal(0.0, 1e-2, n_rows),
+        'quartier': rng.integers(1, 6, n_rows),
+        'humidite': rng.uniform(0.0, 1.0, n_rows),
+        'vide': np.nan,
+        'libelle': rng.choice(['a', 'b'], n_rows),
+    })
+    # Valeurs manquantes, dont les 100 premières lignes d'une colonne (blocs entièrement vides)
+    data.loc[rng.random(n_rows) < 0.1, 'temperature'] = np.nan
+    data.loc[:99, 'humidite'] = np.nan
+    return data
+
+
+def _accumulate(data, chunksize, capacity=100_000):
+    accumulator = StatisticsAccumulator(capacity=capacity)
+    for start in range(0, len(data), chunksize):
+        accumulator.update(data.iloc[start:start + chunksize])
+    return accumulator
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100, 5_000])
+def test_chunked_statistics_match_describe(chunksize):
+    data = _data()
+    pd.testing.assert_frame_equal(_accumulate(data, chunksize).result(), CleaningPipeline(data).statistics(),
+                                  check_exact=False, rtol=1e-9)
+
+
+def test_merged_statistics_match_describe():
+    data = _data()
+    # Deux parties de tailles différentes, accumulées séparément (autre fichier, autre processus) puis fusionnées
+    accumulator = _accumulate(data.iloc[:300], 64).merge(_accumulate(data.iloc[300:], 250))
+    pd.testing.assert_frame_equal(accumulator.result(), CleaningPipeline(data).statistics(),
+                                  check_exact=False, rtol=1e-9)
+
+
+def test_sampled_quantiles_keep_exact_moments():
+    data = _data(n_rows=20_000)
+    expected = CleaningPipeline(data).statistics()
+    accumulator = _accumulate(data.iloc[:12_000], 1_000, capacity=500).merge(
+        _accumulate(data.iloc[12_000:], 3_000, capacity=500))
+    stats = accumulator.result()
+
+    # Effectifs, moyenne, écart-type et extrêmes restent exacts au-delà de la capacité
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    pd.testing.assert_frame_equal(stats[exact], expected[exact], check_exact=False, rtol=1e-9)
+    assert all(len(state['sample']) <= 500 for state in accumulator._columns.values())
+    # Quantiles approchés : erreur de l'ordre de quelques centièmes de l'étendue pour un échantillon de 500 valeurs
+    spread = (expected['max'] - expected['min']).drop('vide')
+    for column in ['25%', '50%', '75%']:
+        error = (stats[column] - expected[column]).drop('vide').abs()
+        assert (error <= 0.05 * spread).all(), column
+
+
+def test_compute_statistics_chunked_matches_in_memory(tmp_path):
+    data_file = tmp_path / 'data.csv'
+    _data().to_csv(data_file, index=False)
+
+    compute_statistics(str(data_file), str(tmp_path / 'stats.csv'))
+    compute_statistics(str(data_file), str(tmp_path / 'stats_chunked.csv'), chunksize=128)
+
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'stats_chunked.csv', index_col=0),
+                                  pd.read_csv(tmp_path / 'stats.csv', index_col=0), check_exact=False, rtol=1e-9)
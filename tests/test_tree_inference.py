@@ -0,0 +1,99 @@
+"""
+CompiledForest face à XGBoost : mêmes probabilités que `XGBClassifier.predict_proba`, valeurs manquantes et
+valeurs égales aux seuils comprises.
+"""
+import os
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from scripts.tree_inference_script import CompiledForest
+
+# Écart maximal toléré (probabilités en float32)
+ATOL = 1e-6
+LEGACY_MODEL = os.path.join(os.path.dirname(__file__), '..', 'model', 'xgboost_model.json')
+
+
+def _training_data(n_rows=2_000, n_features=6, n_classes=4, random_state=0):
+    rng = np.random.default_rng(random_state)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] + X[:, 2] > 0.5).astype(int)
+    y = y % n_classes
+    # Valeurs manquantes à l'entraînement : XGBoost apprend une direction par nœud
+    X[rng.random(X.shape) < 0.15] = np.nan
+    return X, y
+
+
+def _test_rows(forest, n_features, n_rows=500, random_state=1):
+    """
+    Lignes qui tombent sur les seuils du modèle (égalité comprise), de part et d'autre, ou manquantes.
+    """
+    rng = np.random.default_rng(random_state)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    internal = np.isfinite(forest.threshold)
+    for feature in range(n_features):
+        thresholds = forest.threshold[internal & (forest.feature == feature)]
+        if len(thresholds):
+            values = rng.choice(thresholds, n_rows)
+            offsets = rng.choice([-1, 0, 1], n_rows)
+            X[:, feature] = np.where(offsets == 0, values,
+                                     np.nextafter(values, np.where(offsets > 0, np.inf, -np.inf)))
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[::17] = np.nan
+    return X
+
+
+@pytest.mark.parametrize('n_classes, max_depth', [(4, 6), (4, 2), (2, 4)])
+def test_predict_proba_matches_xgboost(n_classes, max_depth):
+    X, y = _training_data(n_classes=n_classes)
+    model = xgb.XGBClassifier(n_estimators=40, max_depth=max_depth, learning_rate=0.3, random_state=0, n_jobs=1)
+    model.fit(X, y)
+    forest = CompiledForest.from_booster(model)
+
+    rows = _test_rows(forest, X.shape[1])
+    expected = model.predict_proba(rows)
+    np.testing.assert_allclose(forest.predict_proba(rows), expected, atol=ATOL)
+    np.testing.assert_allclose(forest.predict_proba(rows, chunk_rows=7), expected, atol=ATOL)
+    np.testing.assert_array_equal(forest.predict(rows), expected.argmax(axis=1))
+
+
+def test_single_row_path_matches_batch():
+    X, y = _training_data()
+    model = xgb.XGBClassifier(n_estimators=30, max_depth=5, random_state=0, n_jobs=1).fit(X, y)
+    forest = CompiledForest.from_booster(model)
+
+    rows = _test_rows(forest, X.shape[1], n_rows=50)
+    batch = forest.predict_proba(rows)
+    for row, expected in zip(rows, batch):
+        np.testing.assert_allclose(forest.predict_proba_row(row), expected, atol=ATOL)
+
+
+def test_saved_model_with_feature_names(tmp_path):
+    import pandas as pd
+
+    X, y = _training_data()
+    columns = [f'capteur_{i}' for i in range(X.shape[1])]
+    model = xgb.XGBClassifier(n_estimators=20, max_depth=4, random_state=0, n_jobs=1)
+    model.fit(pd.DataFrame(X, columns=columns), y)
+    model_file = str(tmp_path / 'model.ubj')
+    model.save_model(model_file)
+
+    forest = CompiledForest.load(model_file)
+    rows = _test_rows(forest, X.shape[1], n_rows=20)
+    expected = model.predict_proba(pd.DataFrame(rows, columns=columns))
+    np.testing.assert_allclose(forest.predict_proba(rows), expected, atol=ATOL)
+    # Dictionnaire incomplet : les caractéristiques absentes sont manquantes
+    row = {column: value for column, value in zip(columns, rows[0]) if column != 'capteur_0'}
+    np.testing.assert_allclose(forest.predict_proba_row(row), forest.predict_proba(
+        np.r_[np.nan, rows[0][1:]][np.newaxis, :])[0], atol=ATOL)
+
+
+def test_legacy_json_model():
+    forest = CompiledForest.load(LEGACY_MODEL)
+    booster = xgb.Booster()
+    booster.load_model(LEGACY_MODEL)
+
+    rows = _test_rows(forest, len(booster.feature_names))
+    expected = booster.predict(xgb.DMatrix(rows, feature_names=booster.feature_names))
+    np.testing.assert_allclose(forest.predict_proba(rows), expected, atol=ATOL)